@@ -5,7 +5,8 @@ import subprocess
 import time
 import json
 from typing import Optional, Dict, List
-from config import ADB_PATH, DEVICE_ID, TRUEGAMERS_PACKAGE, TRUEGAMERS_ACTIVITY, PIN_CODE
+from config import ADB_PATH, DEVICE_ID, TRUEGAMERS_PACKAGE, TRUEGAMERS_ACTIVITY, PIN_CODE, UI_DUMP_COMPRESSED
+from ui_dump import UiDumper
 
 
 class AndroidAutomation:
@@ -15,6 +16,10 @@ class AndroidAutomation:
         self.adb_path = ADB_PATH
         self.device_id = DEVICE_ID
         self.package = TRUEGAMERS_PACKAGE
+        # DeviceTracker: пока он работает, подключение проверяется по его таблице
+        self.presence = None
+        # UI dump в память одной командой exec-out; размер и длительность - в ui_dumper.stats
+        self.ui_dumper = UiDumper(self.exec_out, UI_DUMP_COMPRESSED)
         
     def _run_adb_command(self, command: List[str]) -> tuple:
         """Выполняет ADB команду"""
@@ -38,6 +43,8 @@ class AndroidAutomation:
     
     def check_device_connected(self) -> bool:
         """Проверяет подключение устройства"""
+        if self.presence is not None and self.presence.running:
+            return self.presence.is_online(self.device_id)
         stdout, stderr = self._run_adb_command(['devices'])
         devices = [line for line in stdout.split('\n') if '\tdevice' in line]
         return len(devices) > 0
@@ -109,49 +116,30 @@ class AndroidAutomation:
         stdout, stderr = self._run_adb_command(['shell', 'input', 'keyevent', keycode])
         return stderr == ""
     
+    def exec_out(self, command: str, timeout: float = 15) -> bytes:
+        """Двоичный stdout команды устройства (adb exec-out, без файлов); b'' - ошибка"""
+        full_command = [self.adb_path] + (['-s', self.device_id] if self.device_id else []) + ['exec-out', command]
+        try:
+            return subprocess.run(full_command, stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout).stdout
+        except (subprocess.TimeoutExpired, OSError) as e:
+            print(f"⚠️ Ошибка exec-out '{command.split(' ', 1)[0]}': {e}")
+            return b""
+    
     def get_ui_dump(self, save_to_file: bool = False) -> str:
-        """Получает XML дамп UI через UI Automator
+        """Получает XML дамп UI через UI Automator прямо в память (без файла на sdcard и adb pull)
         
         Args:
             save_to_file: Если True, сохраняет дамп в файл для отладки
         """
-        # Сохраняем дамп UI в файл на устройстве
-        stdout, stderr = self._run_adb_command([
-            'shell', 'uiautomator', 'dump', '/sdcard/ui_dump.xml'
-        ])
-        
-        if stderr:
-            print(f"⚠️ Ошибка при получении UI dump: {stderr}")
-            return ""
-        
-        # Скачиваем файл на компьютер
-        dump_file = 'ui_dump.xml'
-        stdout, stderr = self._run_adb_command([
-            'pull', '/sdcard/ui_dump.xml', dump_file
-        ])
-        
-        # ADB pull выводит информацию в stderr, но это не ошибка
-        # Проверяем реальные ошибки (не "file pulled" сообщения)
-        if stderr and 'error' in stderr.lower() and 'file pulled' not in stderr.lower():
-            print(f"⚠️ Ошибка при скачивании UI dump: {stderr}")
-            return ""
-        
-        # Проверяем, что файл действительно скачался
-        import os
-        if not os.path.exists(dump_file):
-            print(f"⚠️ Файл {dump_file} не найден после скачивания")
-            return ""
-        
-        # Читаем файл
-        try:
-            with open(dump_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if save_to_file:
-                    print(f"📄 UI dump сохранен в {dump_file}")
-                return content
-        except Exception as e:
-            print(f"⚠️ Ошибка при чтении UI dump: {e}")
+        content = self.ui_dumper.dump(timeout=20)
+        if not content:
+            print(f"⚠️ Ошибка при получении UI dump (способ {self.ui_dumper.mode})")
             return ""
+        if save_to_file:
+            with open('ui_dump.xml', 'w', encoding='utf-8') as f:
+                f.write(content)
+            print("📄 UI dump сохранен в ui_dump.xml")
+        return content
     
     def find_all_clickable_elements(self) -> List[Dict]:
         """Находит все кликабельные элементы на экране (для отладки)"""
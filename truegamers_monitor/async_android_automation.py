@@ -0,0 +1,208 @@
+"""
+Асинхронная автоматизация Android через ADB (asyncio.create_subprocess_exec вместо subprocess.run)
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import ADB_PATH, DEVICE_ID, TRUEGAMERS_PACKAGE, PIN_KEYPAD, UI_DUMP_COMPRESSED
+from ui_dump import DUMP_MODES, DumpStats, dump_command, extract_xml
+
+
+class AdbCommandError(Exception):
+    """ADB команда завершилась с ошибкой"""
+
+
+class AsyncAndroidAutomation:
+    """Асинхронный аналог AndroidAutomation.
+
+    Каждая команда - отдельный процесс adb, поэтому независимые операции
+    (например, скриншот во время UI dump) выполняются параллельно (gather_or_cancel).
+    При отмене задачи или таймауте процесс adb завершается, а CancelledError
+    пробрасывается дальше; если одна из параллельных операций упала,
+    остальные отменяются вместе со своими процессами adb.
+    """
+
+    def __init__(self, adb_path: str = ADB_PATH, device_id: str = DEVICE_ID,
+                 package: str = TRUEGAMERS_PACKAGE, timeout: float = 10.0):
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self.package = package
+        self.timeout = timeout
+        # Способы UI dump: первый сработавший запоминается
+        self.dump_modes = [m for m in DUMP_MODES if UI_DUMP_COMPRESSED or not m.startswith('compressed')]
+        self._dump_index = 0
+        self.dump_stats = DumpStats()
+
+    async def _run_adb(self, args: List[str], timeout: Optional[float] = None) -> Tuple[bytes, bytes, int]:
+        """Выполняет ADB команду: (stdout, stderr, код возврата) в байтах"""
+        command = [self.adb_path]
+        if self.device_id:
+            command.extend(['-s', self.device_id])
+        command.extend(args)
+        proc = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), self.timeout if timeout is None else timeout)
+        except BaseException:
+            # Таймаут или отмена: процесс adb не должен пережить задачу
+            if proc.returncode is None:
+                proc.kill()
+            try:
+                await asyncio.wait_for(asyncio.shield(proc.wait()), 2)
+            except asyncio.TimeoutError:
+                # wait() ждёт и закрытия каналов, а их может держать дочерний процесс
+                # (например, запущенный adb сервер): сам adb к этому времени уже завершён
+                pass
+            raise
+        return stdout, stderr, proc.returncode
+
+    async def shell(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """Shell команда на устройстве: (stdout, stderr, код возврата)"""
+        stdout, stderr, code = await self._run_adb(['shell', command], timeout)
+        return stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace'), code
+
+    async def exec_out(self, command: str, timeout: Optional[float] = None) -> bytes:
+        """Двоичный stdout команды (adb exec-out)"""
+        stdout, stderr, code = await self._run_adb(['exec-out', command], timeout)
+        if code != 0:
+            raise AdbCommandError(stderr.decode('utf-8', errors='replace').strip() or f"exit code {code}")
+        return stdout
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+    # ---------- устройство ----------
+    async def check_device_connected(self) -> bool:
+        """Проверяет подключение устройства"""
+        try:
+            stdout, _, _ = await self._run_adb(['devices'])
+        except (asyncio.TimeoutError, OSError):
+            return False
+        return any('\tdevice' in line for line in stdout.decode('utf-8', errors='replace').split('\n'))
+
+    async def get_device_info(self) -> Dict:
+        """Модель и версия Android (запросы выполняются параллельно)"""
+        (model, _, _), (version, _, _) = await asyncio.gather(
+            self.shell('getprop ro.product.model'),
+            self.shell('getprop ro.build.version.release'),
+        )
+        return {'model': model.strip(), 'android_version': version.strip()}
+
+    async def get_screen_size(self) -> tuple:
+        """Размер экрана"""
+        stdout, _, _ = await self.shell('wm size')
+        if 'Physical size:' in stdout:
+            width, height = stdout.split('Physical size:')[1].strip().split()[0].split('x')
+            return int(width), int(height)
+        return 1080, 2340
+
+    # ---------- ввод ----------
+    async def _input(self, args: str) -> bool:
+        _, stderr, code = await self.shell(f'input {args}')
+        return code == 0 and not stderr.strip()
+
+    async def tap(self, x: int, y: int) -> bool:
+        return await self._input(f'tap {int(x)} {int(y)}')
+
+    async def long_tap(self, x: int, y: int, duration: int = 500) -> bool:
+        return await self._input(f'swipe {int(x)} {int(y)} {int(x)} {int(y)} {int(duration)}')
+
+    async def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> bool:
+        return await self._input(f'swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration)}')
+
+    async def input_text(self, text: str) -> bool:
+        return await self._input(f"text '{text.replace(' ', '%s')}'")
+
+    async def input_key(self, keycode: str) -> bool:
+        return await self._input(f'keyevent {keycode}')
+
+    async def input_pin(self, pin: str, interval: float = 0.5) -> bool:
+        """Вводит PIN-код нажатиями по PIN_KEYPAD"""
+        for digit in pin:
+            if digit not in PIN_KEYPAD:
+                return False
+            await self.tap(*PIN_KEYPAD[digit])
+            await asyncio.sleep(interval)
+        return True
+
+    # ---------- приложение ----------
+    async def is_app_running(self) -> bool:
+        stdout, _, _ = await self.shell(f'pidof {self.package}')
+        return stdout.strip() != ""
+
+    async def close_app(self) -> bool:
+        await self.shell(f'am force-stop {self.package}')
+        return not await self.is_app_running()
+
+    async def launch_app(self) -> bool:
+        await self.shell(f'monkey -p {self.package} -c android.intent.category.LAUNCHER 1')
+        return await self.is_app_running()
+
+    # ---------- экран ----------
+    async def get_ui_dump(self, timeout: float = 20.0) -> str:
+        """XML дамп UI в памяти одной командой exec-out (способы - как у UiDumper).
+
+        Общих файлов нет, поэтому параллельные вызовы не перезаписывают
+        дампы друг друга. Размер и длительность дампов - в dump_stats.
+        """
+        started = time.perf_counter()
+        for index in range(self._dump_index, len(self.dump_modes)):
+            try:
+                xml = extract_xml(await self.exec_out(dump_command(self.dump_modes[index]), timeout))
+            except AdbCommandError:
+                continue
+            if xml:
+                self._dump_index = index
+                self.dump_stats.record(len(xml.encode('utf-8')), time.perf_counter() - started)
+                return xml
+        self.dump_stats.failures += 1
+        raise AdbCommandError("uiautomator dump не вернул XML")
+
+    async def get_screenshot_bytes(self, timeout: float = 15.0) -> bytes:
+        """PNG скриншот в памяти (exec-out screencap -p, без файла на sdcard)"""
+        png = await self.exec_out('screencap -p', timeout)
+        if not png.startswith(b'\x89PNG'):
+            raise AdbCommandError(f"screencap вернул не PNG ({len(png)} байт)")
+        return png
+
+    async def get_screenshot(self, save_path: str = 'screenshot.png') -> bool:
+        """Скриншот в файл (для кода, который работает с путями)"""
+        try:
+            png = await self.get_screenshot_bytes()
+        except (AdbCommandError, asyncio.TimeoutError, OSError) as e:
+            print(f"⚠️ Ошибка при создании скриншота: {e}")
+            return False
+        await asyncio.to_thread(_write_file, save_path, png)
+        return True
+
+    async def capture(self) -> Tuple[str, bytes]:
+        """UI dump и скриншот одновременно: (xml, png)"""
+        xml, png = await gather_or_cancel(self.get_ui_dump(), self.get_screenshot_bytes())
+        return xml, png
+
+
+async def gather_or_cancel(*aws) -> list:
+    """Как asyncio.gather, но при ошибке одной задачи остальные отменяются и дожидаются
+    завершения (их процессы adb убиты); при отмене самого вызова - тоже"""
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    # Ошибка упавшей задачи, а не CancelledError отменённых из-за неё
+    for task in tasks:
+        if not task.cancelled() and task.exception() is not None:
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+def _write_file(path: str, data: bytes) -> None:
+    with open(path, 'wb') as f:
+        f.write(data)
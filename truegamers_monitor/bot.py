@@ -15,7 +15,13 @@ from telegram.ext import (
     filters
 )
 from android_automation import AndroidAutomation
-from config import TELEGRAM_BOT_TOKEN, MONITOR_INTERVAL
+from device_tracker import DeviceTracker, TrackDevicesProcess, parse_devices
+from config import (
+    TELEGRAM_BOT_TOKEN, MONITOR_INTERVAL, PHOTO_MAX_SIDE, PHOTO_JPEG_QUALITY, DEVICE_TRACKER, DEVICE_POLL_INTERVAL,
+    BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, ALLOWED_UPDATES
+)
+from webhook import run_webhook
+from photo_pipeline import PhotoPipeline
 import os
 import glob
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
@@ -37,6 +43,14 @@ monitoring_active = False
 monitoring_task = None
 scheduler = None
 app_instance = None
+# Скриншоты отправляются сжатыми, альбомами, без повторной загрузки одинаковых кадров
+photos = PhotoPipeline(max_side=PHOTO_MAX_SIDE, quality=PHOTO_JPEG_QUALITY)
+# Подключение устройства отслеживается в фоне, check_device_connected не запускает adb
+device_tracker = DeviceTracker(
+    lambda: TrackDevicesProcess(android.adb_path),
+    lambda: parse_devices(android._run_adb_command(['devices'])[0]),
+    DEVICE_POLL_INTERVAL,
+) if DEVICE_TRACKER else None
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -191,22 +205,16 @@ async def open_places(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("📊 Анализирую места...")
         status = android.get_places_status()
         
-        # Отправляем скриншоты
+        # Отправляем скриншоты одним альбомом
         screenshots = [
             ('before_pin.png', '📸 До ввода PIN'),
             ('after_pin.png', '📸 После ввода PIN'),
             ('places_screen.png', '📸 Экран с местами')
         ]
-        
-        for screenshot_path, caption in screenshots:
-            if os.path.exists(screenshot_path):
-                try:
-                    await update.message.reply_photo(
-                        photo=open(screenshot_path, 'rb'),
-                        caption=caption
-                    )
-                except Exception as e:
-                    logger.error(f"Ошибка при отправке скриншота {screenshot_path}: {e}")
+        try:
+            await photos.send(context.bot, update.effective_chat.id, screenshots)
+        except Exception as e:
+            logger.error(f"Ошибка при отправке скриншотов: {e}")
         
         # Отправляем статистику мест
         if 'error' not in status:
@@ -353,17 +361,10 @@ async def monitor_places(context: ContextTypes.DEFAULT_TYPE):
     # Формируем сообщение со статусом
     if 'error' in status:
         message = f"❌ Ошибка при получении статуса: {status['error']}\n🕐 {timestamp}"
-        if 'screenshot' in status:
-            screenshot_path = status['screenshot']
-            if os.path.exists(screenshot_path):
-                await context.bot.send_photo(
-                    chat_id=context.job.chat_id,
-                    photo=open(screenshot_path, 'rb'),
-                    caption=message
-                )
-            else:
-                await context.bot.send_message(chat_id=context.job.chat_id, text=message)
-        else:
+        sent = 'screenshot' in status and await photos.send(
+            context.bot, context.job.chat_id, [(status['screenshot'], message)]
+        )
+        if not sent:
             await context.bot.send_message(chat_id=context.job.chat_id, text=message)
     else:
         # Формируем детальное сообщение о местах
@@ -392,23 +393,11 @@ async def monitor_places(context: ContextTypes.DEFAULT_TYPE):
 • 🔴 Занято: {occupied_tv}
 """
         
-        # Если есть скриншот, отправляем его
-        if 'screenshot' in status:
-            screenshot_path = status['screenshot']
-            if os.path.exists(screenshot_path):
-                await context.bot.send_photo(
-                    chat_id=context.job.chat_id,
-                    photo=open(screenshot_path, 'rb'),
-                    caption=message,
-                    parse_mode='Markdown'
-                )
-            else:
-                await context.bot.send_message(
-                    chat_id=context.job.chat_id, 
-                    text=message,
-                    parse_mode='Markdown'
-                )
-        else:
+        # Если есть скриншот, отправляем его (неизменившийся экран повторно не загружается)
+        sent = 'screenshot' in status and await photos.send(
+            context.bot, context.job.chat_id, [(status['screenshot'], message)], parse_mode='Markdown'
+        )
+        if not sent:
             await context.bot.send_message(
                 chat_id=context.job.chat_id, 
                 text=message,
@@ -476,10 +465,10 @@ async def screenshot(update: Update, context: ContextTypes.DEFAULT_TYPE):
     screenshot_path = 'current_screenshot.png'
     if android.get_screenshot(screenshot_path) and os.path.exists(screenshot_path):
         screen_size = android.get_screen_size()
-        await update.message.reply_photo(
-            photo=open(screenshot_path, 'rb'),
-            caption=f"📸 Текущий экран\n📐 Размер: {screen_size[0]}x{screen_size[1]}\n\n💡 Используйте этот скриншот для определения координат в config.py"
-        )
+        await photos.send(context.bot, update.effective_chat.id, [(
+            screenshot_path,
+            f"📸 Текущий экран\n📐 Размер: {screen_size[0]}x{screen_size[1]}\n\n💡 Используйте этот скриншот для определения координат в config.py"
+        )])
     else:
         await update.message.reply_text("❌ Не удалось сделать скриншот.")
 
@@ -505,15 +494,13 @@ async def test_pin(update: Update, context: ContextTypes.DEFAULT_TYPE):
     android.get_screenshot('test_after.png')
     
     # Отправляем скриншоты
-    for screenshot_path, caption in [('test_before.png', '📸 До ввода PIN'), ('test_after.png', '📸 После ввода PIN')]:
-        if os.path.exists(screenshot_path):
-            try:
-                await update.message.reply_photo(
-                    photo=open(screenshot_path, 'rb'),
-                    caption=caption
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при отправке скриншота: {e}")
+    try:
+        await photos.send(context.bot, update.effective_chat.id, [
+            ('test_before.png', '📸 До ввода PIN'),
+            ('test_after.png', '📸 После ввода PIN')
+        ])
+    except Exception as e:
+        logger.error(f"Ошибка при отправке скриншотов: {e}")
     
     if success:
         await update.message.reply_text("✅ PIN введен! Проверьте скриншоты выше.")
@@ -589,10 +576,7 @@ async def debug_clickable(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     # Отправляем скриншот и список
     try:
-        await update.message.reply_photo(
-            photo=open('debug_clickable.png', 'rb'),
-            caption="📸 Текущий экран"
-        )
+        await photos.send(context.bot, update.effective_chat.id, [('debug_clickable.png', "📸 Текущий экран")])
     except Exception as e:
         logger.error(f"Ошибка при отправке скриншота: {e}")
     
@@ -632,12 +616,10 @@ async def analyze_places(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     if 'error' in status:
         message = f"❌ Ошибка при анализе: {status['error']}"
-        if 'screenshot' in status and os.path.exists(status['screenshot']):
-            await update.message.reply_photo(
-                photo=open(status['screenshot'], 'rb'),
-                caption=message
-            )
-        else:
+        sent = 'screenshot' in status and await photos.send(
+            context.bot, update.effective_chat.id, [(status['screenshot'], message)]
+        )
+        if not sent:
             await update.message.reply_text(message)
         return
     
@@ -669,10 +651,8 @@ async def analyze_places(update: Update, context: ContextTypes.DEFAULT_TYPE):
     # Отправляем скриншот и статистику
     if 'screenshot' in status and os.path.exists(status['screenshot']):
         try:
-            await update.message.reply_photo(
-                photo=open(status['screenshot'], 'rb'),
-                caption=message,
-                parse_mode='Markdown'
+            await photos.send(
+                context.bot, update.effective_chat.id, [(status['screenshot'], message)], parse_mode='Markdown'
             )
         except Exception as e:
             logger.error(f"Ошибка при отправке скриншота: {e}")
@@ -751,15 +731,10 @@ async def test_tap(update: Update, context: ContextTypes.DEFAULT_TYPE):
     for screenshot_path in glob.glob('test_tap_after*.png'):
         screenshots.append((screenshot_path, f'📸 После нажатия'))
     
-    for screenshot_path, caption in screenshots:
-        if os.path.exists(screenshot_path):
-            try:
-                await update.message.reply_photo(
-                    photo=open(screenshot_path, 'rb'),
-                    caption=caption
-                )
-            except Exception as e:
-                logger.error(f"Ошибка при отправке скриншота: {e}")
+    try:
+        await photos.send(context.bot, update.effective_chat.id, screenshots)
+    except Exception as e:
+        logger.error(f"Ошибка при отправке скриншотов: {e}")
     
     if success:
         await update.message.reply_text(f"✅ Нажатие выполнено! Проверьте скриншоты выше.")
@@ -794,6 +769,40 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text(status_text, parse_mode='Markdown')
 
 
+async def on_device_change(serial: str, before: str, after: str):
+    """Сообщает в TARGET_CHAT_ID об отключении и повторном подключении устройства"""
+    from config import TARGET_CHAT_ID
+    
+    if android.device_id and serial != android.device_id:
+        return
+    if before == 'device' and after != 'device':
+        text = f"📴 Устройство {serial} отключено ({after or 'нет в списке adb'})"
+    elif after == 'device':
+        text = f"📱 Устройство {serial} подключено"
+    else:
+        return
+    logger.info(text)
+    if TARGET_CHAT_ID and app_instance:
+        try:
+            await app_instance.bot.send_message(chat_id=TARGET_CHAT_ID, text=text)
+        except Exception as e:
+            logger.warning(f"Не удалось сообщить об изменении устройства: {e}")
+
+
+async def on_startup(application: Application):
+    """Запускает фоновое отслеживание устройства в event loop бота"""
+    if device_tracker:
+        android.presence = device_tracker
+        device_tracker.add_listener(on_device_change)
+        await asyncio.to_thread(device_tracker.start, asyncio.get_running_loop())
+        logger.info(f"📱 Отслеживание устройства: {device_tracker.mode}")
+
+
+async def on_shutdown(application: Application):
+    if device_tracker:
+        await asyncio.to_thread(device_tracker.stop)
+
+
 def main():
     """Запускает бота"""
     global app_instance, scheduler
@@ -803,7 +812,7 @@ def main():
         return
     
     # Создаем приложение
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    application = Application.builder().token(TELEGRAM_BOT_TOKEN).post_init(on_startup).post_shutdown(on_shutdown).build()
     app_instance = application  # Сохраняем для использования в планировщике
     
     # Обработчик входа (conversation)
@@ -855,8 +864,15 @@ def main():
         scheduler = None
     
     # Запускаем бота
-    logger.info("Бот запущен...")
-    application.run_polling(allowed_updates=Update.ALL_TYPES)
+    if BOT_MODE == 'webhook':
+        if not WEBHOOK_URL:
+            logger.error("BOT_MODE=webhook, но WEBHOOK_URL не установлен!")
+            return
+        logger.info("Бот запущен (webhook)...")
+        run_webhook(application, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, ALLOWED_UPDATES)
+    else:
+        logger.info("Бот запущен...")
+        application.run_polling(allowed_updates=ALLOWED_UPDATES)
 
 
 if __name__ == '__main__':
@@ -31,9 +31,22 @@ except Exception as e:
 # Telegram Bot Token
 TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '')
 
+# Режим получения обновлений: 'polling' (long polling) или 'webhook' (локальный HTTP приёмник)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # Публичный https адрес, проксируемый на приёмник
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8082'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # Пусто - случайный токен при каждом запуске
+ALLOWED_UPDATES = ['message']  # Бот обрабатывает только сообщения и команды
+
 # ADB настройки
 ADB_PATH = os.getenv('ADB_PATH', 'adb')  # Путь к adb, если не в PATH
 DEVICE_ID = os.getenv('DEVICE_ID', '')  # ID устройства (можно оставить пустым для первого устройства)
+# Подключение отслеживается в фоне (adb track-devices): проверка в обработчиках без запуска adb
+DEVICE_TRACKER = os.getenv('DEVICE_TRACKER', '1').lower() in ('1', 'true', 'yes')
+DEVICE_POLL_INTERVAL = float(os.getenv('DEVICE_POLL_INTERVAL', '5'))  # Проверки adb devices, пока track-devices недоступен
+UI_DUMP_COMPRESSED = os.getenv('UI_DUMP_COMPRESSED', '1').lower() in ('1', 'true', 'yes')  # uiautomator dump --compressed
 
 # TrueGamers настройки
 TRUEGAMERS_PACKAGE = 'com.truegamers.true_gamers'  # Имя пакета приложения
@@ -45,6 +58,10 @@ TRUEGAMERS_ACTIVITY = os.getenv('TRUEGAMERS_ACTIVITY', '')  # По умолча
 # Настройки мониторинга
 MONITOR_INTERVAL = 60  # Интервал проверки в секундах
 
+# Скриншоты в Telegram: длинная сторона (px) и качество JPEG после сжатия
+PHOTO_MAX_SIDE = int(os.getenv('PHOTO_MAX_SIDE', '1280'))
+PHOTO_JPEG_QUALITY = int(os.getenv('PHOTO_JPEG_QUALITY', '80'))
+
 # ID чата для автоматической отправки посадки (если нужно, можно указать другой)
 # Если не указано, будет использоваться чат, откуда был запущен мониторинг
 TARGET_CHAT_ID_STR = os.getenv('TARGET_CHAT_ID', None)  # Можно указать например: -1001234567890
@@ -0,0 +1,121 @@
+"""
+Отправка скриншотов: сжатие в JPEG в памяти, альбомы и повторное использование file_id
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import os
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+from PIL import Image
+from telegram import InputMediaPhoto
+
+logger = logging.getLogger(__name__)
+
+# Telegram принимает в альбоме не больше 10 фото
+MEDIA_GROUP_LIMIT = 10
+
+
+class Frame:
+    """Подготовленный к отправке кадр: JPEG в памяти или уже загруженный file_id"""
+
+    __slots__ = ("digest", "caption", "data", "file_id")
+
+    def __init__(self, digest: str, caption: Optional[str], data: Optional[bytes], file_id: Optional[str]):
+        self.digest = digest
+        self.caption = caption
+        self.data = data
+        self.file_id = file_id
+
+    @property
+    def media(self):
+        return self.file_id or self.data
+
+
+class PhotoPipeline:
+    """Готовит скриншоты к отправке в Telegram.
+
+    PNG уменьшается до max_side по длинной стороне и кодируется в JPEG в
+    пуле потоков, не блокируя event loop. Одинаковые кадры (по хэшу файла)
+    не загружаются повторно: используется file_id из предыдущей отправки.
+    """
+
+    def __init__(self, max_side: int = 1280, quality: int = 80, cache_size: int = 64):
+        self.max_side = max_side
+        self.quality = quality
+        self.cache_size = cache_size
+        self._file_ids: "OrderedDict[str, str]" = OrderedDict()
+        self.uploaded = 0
+        self.reused = 0
+
+    def _encode(self, raw: bytes) -> bytes:
+        with Image.open(io.BytesIO(raw)) as img:
+            img = img.convert("RGB")
+            img.thumbnail((self.max_side, self.max_side))
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=self.quality, optimize=True)
+            return out.getvalue()
+
+    def _prepare(self, path: str, caption: Optional[str]) -> Optional[Frame]:
+        """Читает и сжимает файл (блокирующий вызов, выполняется в потоке)"""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            raw = f.read()
+        digest = hashlib.sha1(raw).hexdigest()
+        file_id = self._file_ids.get(digest)
+        if file_id:
+            return Frame(digest, caption, None, file_id)
+        return Frame(digest, caption, self._encode(raw), None)
+
+    async def prepare(self, photos: Sequence[Tuple[str, Optional[str]]]) -> List[Frame]:
+        """Готовит кадры параллельно; отсутствующие и повреждённые файлы пропускаются"""
+        results = await asyncio.gather(
+            *(asyncio.to_thread(self._prepare, path, caption) for path, caption in photos),
+            return_exceptions=True
+        )
+        frames = []
+        for (path, _), result in zip(photos, results):
+            if isinstance(result, Exception):
+                logger.error(f"Ошибка подготовки скриншота {path}: {result}")
+            elif result is not None:
+                frames.append(result)
+        return frames
+
+    def _remember(self, frame: Frame, message) -> None:
+        if frame.file_id:
+            self.reused += 1
+            self._file_ids.move_to_end(frame.digest)
+            return
+        if message is None or not message.photo:
+            return
+        self.uploaded += 1
+        self._file_ids[frame.digest] = message.photo[-1].file_id
+        while len(self._file_ids) > self.cache_size:
+            self._file_ids.popitem(last=False)
+
+    async def send(self, bot, chat_id: int, photos: Sequence[Tuple[str, Optional[str]]],
+                   parse_mode: Optional[str] = None) -> bool:
+        """Отправляет скриншоты одним сообщением (несколько - альбомом).
+
+        photos - список (путь, подпись). Возвращает False, если отправлять нечего.
+        """
+        frames = await self.prepare(photos)
+        if not frames:
+            return False
+        if len(frames) == 1:
+            frame = frames[0]
+            message = await bot.send_photo(
+                chat_id=chat_id, photo=frame.media, caption=frame.caption, parse_mode=parse_mode
+            )
+            self._remember(frame, message)
+            return True
+        for start in range(0, len(frames), MEDIA_GROUP_LIMIT):
+            chunk = frames[start:start + MEDIA_GROUP_LIMIT]
+            media = [InputMediaPhoto(media=f.media, caption=f.caption, parse_mode=parse_mode) for f in chunk]
+            messages = await bot.send_media_group(chat_id=chat_id, media=media)
+            for frame, message in zip(chunk, messages):
+                self._remember(frame, message)
+        return True
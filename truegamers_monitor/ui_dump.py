@@ -0,0 +1,130 @@
+"""
+UI dump прямо в память: XML приходит в stdout одной командой, без файла на sdcard, adb pull и локального файла
+
+Один и тот же файл в двух пакетах (modules/ui_dump.py объединённого бота и
+truegamers_monitor/ui_dump.py): пакеты разворачиваются по отдельности, поэтому
+копия намеренная - правки вносятся в обе (tests/test_shared_modules.py)
+"""
+import logging
+import statistics
+import time
+import uuid
+from collections import deque
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Способы дампа по порядку предпочтения:
+#   tty  - uiautomator пишет XML сразу в stdout через /dev/tty, без файлов;
+#   file - временный файл с уникальным именем читается и удаляется той же командой
+#          (для устройств, где /dev/tty без терминала недоступен).
+# --compressed убирает из иерархии служебные контейнеры, дамп меньше и быстрее.
+DUMP_MODES = ('compressed-tty', 'compressed-file', 'tty', 'file')
+# Предпочтительный способ меняется на следующий только после стольких неудач подряд:
+# разовая ошибка (например, "could not get idle state" на анимированном экране) его не понижает
+DEMOTE_AFTER = 3
+# Если на очередной способ остаётся меньше этого времени (с), дамп завершается неудачей
+MIN_ATTEMPT = 1.0
+
+_END = '</hierarchy>'
+
+
+def dump_command(mode: str) -> str:
+    """Shell команда дампа для способа из DUMP_MODES"""
+    flag = '--compressed ' if mode.startswith('compressed') else ''
+    if mode.endswith('tty'):
+        return f'uiautomator dump {flag}/dev/tty'
+    # У каждого вызова свой файл: параллельные дампы не перезаписывают друг друга
+    remote = f'/data/local/tmp/ui_dump_{uuid.uuid4().hex[:8]}.xml'
+    return f'uiautomator dump {flag}{remote} >/dev/null && cat {remote}; rm -f {remote}'
+
+
+def extract_xml(raw: bytes) -> str:
+    """XML из вывода uiautomator (без строки 'UI hierchary dumped to: ...'); '' - дампа нет"""
+    text = raw.decode('utf-8', errors='replace')
+    start = text.find('<?xml')
+    if start < 0:
+        start = text.find('<hierarchy')
+    end = text.rfind(_END)
+    if start < 0 or end < start:
+        return ''
+    return text[start:end + len(_END)]
+
+
+class DumpStats:
+    """Размер и длительность последних дампов"""
+
+    def __init__(self, window: int = 50):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.failures = 0
+
+    def record(self, size: int, seconds: float) -> None:
+        self.count += 1
+        self.samples.append((size, seconds))
+
+    def summary(self) -> str:
+        if not self.samples:
+            return f"UI dump: успешных нет, ошибок {self.failures}"
+        sizes = [size for size, _ in self.samples]
+        times = [seconds for _, seconds in self.samples]
+        return (f"UI dump: {self.count} шт., медиана {statistics.median(sizes) / 1024:.1f} КБ "
+                f"за {statistics.median(times):.2f} с (макс. {max(times):.2f} с), ошибок {self.failures}")
+
+
+class UiDumper:
+    """Дамп UI устройства через exec_out(command, timeout) -> bytes.
+
+    Каждый дамп начинается с предпочтительного способа из DUMP_MODES, при неудаче
+    пробуются следующие; предпочтительным становится другой способ, только если
+    текущий не сработал DEMOTE_AFTER раз подряд. Дамп не использует общих файлов,
+    поэтому безопасен при параллельных вызовах.
+
+    tty=False - способы через /dev/tty не пробуются: команды идут через постоянную
+    сессию adb shell без терминала, где /dev/tty не открывается никогда, и каждый
+    дамп до понижения способа (и после каждого перезапуска) тратил бы на них время.
+    """
+
+    def __init__(self, exec_out: Callable[[str, float], bytes], compressed: bool = True, tty: bool = True):
+        self.exec_out = exec_out
+        self.modes: List[str] = [m for m in DUMP_MODES
+                                 if (compressed or not m.startswith('compressed')) and (tty or not m.endswith('tty'))]
+        self.mode_index = 0
+        # Неудачи предпочтительного способа подряд (при успехе одного из следующих)
+        self.misses = 0
+        self.stats = DumpStats()
+
+    @property
+    def mode(self) -> str:
+        return self.modes[self.mode_index]
+
+    def dump(self, timeout: float = 20) -> str:
+        """XML дамп UI; '' - ни один способ не сработал.
+
+        timeout - общий бюджет на все способы: каждый следующий получает остаток.
+        """
+        started = time.perf_counter()
+        until = time.monotonic() + timeout
+        for index in range(self.mode_index, len(self.modes)):
+            remaining = until - time.monotonic()
+            if remaining < MIN_ATTEMPT:
+                break
+            xml = extract_xml(self.exec_out(dump_command(self.modes[index]), remaining))
+            if xml:
+                self._succeeded(index)
+                self.stats.record(len(xml.encode('utf-8')), time.perf_counter() - started)
+                return xml
+        self.stats.failures += 1
+        return ''
+
+    def _succeeded(self, index: int) -> None:
+        """Учёт способа, который сработал: понижение предпочтительного после DEMOTE_AFTER неудач подряд"""
+        if index == self.mode_index:
+            self.misses = 0
+            return
+        self.misses += 1
+        if self.misses >= DEMOTE_AFTER:
+            logger.info("UI dump: способ %s не сработал %s раз подряд, дальше - %s",
+                        self.mode, self.misses, self.modes[index])
+            self.mode_index = index
+            self.misses = 0
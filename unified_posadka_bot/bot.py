@@ -5,6 +5,7 @@ import os
 import re
 import csv
 import json
+import time
 import asyncio
 import logging
 from datetime import datetime, timedelta
@@ -20,14 +21,30 @@ from telegram.ext import (
     ContextTypes,
     filters,
 )
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 
 # Импортируем модули
-from modules.colizeum_api import compute_posadka_async, format_colizeum_message, save_stat as save_colizeum_stat, shift_summary as colizeum_shift_summary
+from modules.colizeum_api import compute_posadka_async, fetch_schema_async, format_colizeum_message, get_cached_posadka, posadka_state, save_stat as save_colizeum_stat, shift_summary as colizeum_shift_summary
 from modules.truegamers_automation import AndroidAutomation
+from modules.device_pool import DevicePool, NoDeviceAvailable, device_files_dir
+from modules.device_tracker import DeviceTracker, TrackDevicesProcess
+from modules.adb_protocol import AdbClient
+from modules.deadline import Deadline, DeadlineExceeded, freshness_note
+from modules.stage_timings import StageTimings
+from modules.webhook import run_webhook
+from modules.locks import SingleFlight, stats_lock
+from modules.outbox import Outbox, SubscriberStore
+from modules.live_board import LiveBoard
 from config import (
-    TELEGRAM_TOKEN, TARGET_CHAT_ID, STATS_FILE, MAX_DAYS, LOCAL_TZ,
-    COLIZEUM_DOMAIN, COLIZEUM_API_KEY, COLIZEUM_PROXY_URL, MAX_RETRIES, RETRY_DELAY, SCHEMA_CACHE_TTL
+    TELEGRAM_TOKEN, TARGET_CHAT_ID, STATS_FILE, MAX_DAYS, LOCAL_TZ, DEVICE_IDS, DEVICE_FAILURE_COOLDOWN,
+    TRUEGAMERS_VENUE, TRUEGAMERS_VENUES,
+    ADB_PATH, ADB_BACKEND, ADB_SERVER_HOST, ADB_SERVER_PORT, DEVICE_TRACKER, DEVICE_POLL_INTERVAL,
+    BROADCAST_CHAT_IDS, SUBSCRIBERS_FILE, ADMIN_USER_IDS, OUTBOX_CONCURRENCY, OUTBOX_GLOBAL_RATE, OUTBOX_CHAT_INTERVAL, OUTBOX_GROUP_INTERVAL,
+    LIVE_BOARD_ENABLED, LIVE_BOARD_INTERVAL, LIVE_BOARD_FILE,
+    CONCURRENT_UPDATES, BOT_MODE, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, ALLOWED_UPDATES,
+    COLIZEUM_DOMAIN, COLIZEUM_API_KEY, COLIZEUM_PROXY_URL, MAX_RETRIES, RETRY_DELAY, SCHEMA_CACHE_TTL,
+    COLIZEUM_DEADLINE, TRUEGAMERS_DEADLINE,
+    PREWARM_ENABLED, PREWARM_MIN_LEAD, PREWARM_MAX_LEAD, PREWARM_MARGIN, PREWARM_MAX_AGE, STAGE_TIMINGS_FILE
 )
 
 # Настройка логирования
@@ -41,16 +58,95 @@ root_logger.setLevel(logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Глобальные переменные
-android = AndroidAutomation()
 scheduler = None
 app_instance = None
+stage_timings = StageTimings(STAGE_TIMINGS_FILE)
+
+def build_device_pool(serials: list) -> DevicePool:
+    """Пул устройств TrueGamers по DEVICE_IDS (пусто - устройства TRUEGAMERS_VENUES или одно DEVICE_ID,
+    auto - все подключённые); площадка устройства - из TRUEGAMERS_VENUES, иначе TRUEGAMERS_VENUE
+    """
+    def make_device(serial: str) -> AndroidAutomation:
+        # Файлы каждого устройства в своей папке: параллельные захваты не перезаписывают скриншоты
+        return AndroidAutomation(serial, files_dir=device_files_dir(serial))
+    
+    options = dict(failure_cooldown=DEVICE_FAILURE_COOLDOWN, venues=TRUEGAMERS_VENUES, default_venue=TRUEGAMERS_VENUE)
+    serials = serials or list(TRUEGAMERS_VENUES)
+    if serials == ['auto']:
+        return DevicePool([], factory=make_device, probe=AndroidAutomation(''), **options)
+    if len(serials) > 1:
+        return DevicePool([make_device(serial) for serial in serials], **options)
+    return DevicePool([AndroidAutomation(serials[0] if serials else None)], **options)
+
+# Устройства выдаются сценариям по одному; у каждого своя площадка, кэш статуса и время прогрева
+device_pool = build_device_pool(DEVICE_IDS)
+
+def open_track_stream():
+    """Поток изменений списка устройств: сокет adb сервера (native) или процесс adb track-devices"""
+    if ADB_BACKEND == 'native':
+        return AdbClient(ADB_SERVER_HOST, ADB_SERVER_PORT).track_devices()
+    return TrackDevicesProcess(ADB_PATH)
+
+# Подключение устройств отслеживается в фоне: проверка перед захватом - чтение таблицы
+device_tracker = DeviceTracker(
+    open_track_stream, lambda: device_pool.probe.list_devices(), DEVICE_POLL_INTERVAL
+) if DEVICE_TRACKER else None
+
+# Блокировки ресурсов: обновления обрабатываются параллельно (concurrent_updates)
+colizeum_flight = SingleFlight()  # Одновременные запросы посадки COLIZEUM объединяются
+
+# Исходящие сообщения: отчёты рассылаются подписанным чатам через очередь с лимитами
+subscribers = SubscriberStore(SUBSCRIBERS_FILE, [TARGET_CHAT_ID, *BROADCAST_CHAT_IDS])
+outbox: Optional[Outbox] = None
+live_board: Optional[LiveBoard] = None  # Только при LIVE_BOARD_ENABLED
+
+# Бюджет на доставку запасного сообщения после исчерпания дедлайна
+FALLBACK_SEND_TIMEOUT = 15
+
+# ========== OUTBOX ==========
+def start_outbox(app):
+    """Запускает очередь исходящих сообщений (и живое табло) в event loop бота"""
+    global outbox, live_board
+    outbox = Outbox(
+        app.bot,
+        concurrency=OUTBOX_CONCURRENCY,
+        global_rate=OUTBOX_GLOBAL_RATE,
+        chat_interval=OUTBOX_CHAT_INTERVAL,
+        group_interval=OUTBOX_GROUP_INTERVAL,
+    )
+    outbox.start()
+    if LIVE_BOARD_ENABLED:
+        live_board = LiveBoard(outbox, LIVE_BOARD_FILE)
+
+async def broadcast_report(text: str, deadline: Optional[Deadline] = None, parse_mode: Optional[str] = "Markdown") -> int:
+    """Рассылает готовый текст отчёта всем подписчикам; возвращает число доставленных"""
+    chats = subscribers.all()
+    delivered = await outbox.broadcast(chats, text, deadline=deadline, parse_mode=parse_mode)
+    ok = sum(1 for message in delivered.values() if message is not None)
+    if ok < len(chats):
+        logger.warning("📮 Отчёт доставлен в %s из %s чатов", ok, len(chats))
+    return ok
+
+async def publish_report(venue: str, state: dict, render, deadline: Optional[Deadline] = None) -> int:
+    """Публикует отчёт площадки: правкой живого табло или новым сообщением всем подписчикам.
+
+    render() вызывается только если текст действительно нужен; возвращает число чатов с актуальным отчётом.
+    """
+    if live_board:
+        return await live_board.publish(venue, state, render, subscribers.all(), deadline)
+    return await broadcast_report(render(), deadline)
+
+async def notify_service(text: str) -> None:
+    """Служебные сообщения (ошибки, предупреждения) отправляются только в основной чат"""
+    if TARGET_CHAT_ID:
+        await outbox.send(TARGET_CHAT_ID, text)
 
 # ========== HELPERS ==========
 def safe_load(path):
     if not os.path.exists(path):
         return {}
     try:
-        with open(path, "r", encoding="utf-8") as f:
+        with stats_lock, open(path, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception as e:
         logger.exception("Ошибка чтения JSON %s: %s", path, e)
@@ -58,25 +154,26 @@ def safe_load(path):
 
 def safe_save(path, data):
     try:
-        with open(path, "w", encoding="utf-8") as f:
+        with stats_lock, open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
     except Exception as e:
         logger.exception("Ошибка записи JSON %s: %s", path, e)
 
 def prune_old_days(path, max_days=MAX_DAYS):
-    data = safe_load(path)
-    if not isinstance(data, dict):
-        return
-    cutoff = datetime.now().date() - timedelta(days=max_days - 1)
-    keep = {}
-    for day_str, arr in data.items():
-        try:
-            day_date = datetime.strptime(day_str, "%Y-%m-%d").date()
-            if day_date >= cutoff:
-                keep[day_str] = arr
-        except Exception:
-            continue
-    safe_save(path, keep)
+    with stats_lock:
+        data = safe_load(path)
+        if not isinstance(data, dict):
+            return
+        cutoff = datetime.now().date() - timedelta(days=max_days - 1)
+        keep = {}
+        for day_str, arr in data.items():
+            try:
+                day_date = datetime.strptime(day_str, "%Y-%m-%d").date()
+                if day_date >= cutoff:
+                    keep[day_str] = arr
+            except Exception:
+                continue
+        safe_save(path, keep)
 
 def get_last_busy() -> Optional[int]:
     """Получает последнее значение busy из статистики"""
@@ -99,37 +196,38 @@ def get_last_busy() -> Optional[int]:
                 continue
     return None
 
-# ========== ASYNC UTILS ==========
-def run_async(func, *args):
-    """Безопасный запуск async функций из синхронного контекста"""
-    import threading
-    def wrapper():
-        try:
-            logger.info(f"🔄 Запуск async функции {func.__name__} в отдельном потоке...")
-            # Создаем новый event loop для этого потока
-            new_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(new_loop)
-            try:
-                new_loop.run_until_complete(func(*args))
-            finally:
-                new_loop.close()
-            logger.info(f"✅ Функция {func.__name__} завершена")
-        except Exception as e:
-            logger.exception(f"❌ Ошибка при выполнении {func.__name__}: {e}")
-    
-    thread = threading.Thread(target=wrapper, daemon=True)
-    thread.start()
-    logger.info(f"📌 Поток для {func.__name__} запущен")
-
 # ========== COLIZEUM POSADKA ==========
-async def validated_send_colizeum_posadka(bot):
+async def send_cached_colizeum_posadka(reason: DeadlineExceeded) -> bool:
+    """Рассылает последнюю известную посадку COLIZEUM с отметкой о свежести"""
+    cached = get_cached_posadka()
+    if not cached:
+        logger.warning("⏱ Дедлайн COLIZEUM исчерпан (%s), кэша нет", reason)
+        await notify_service(f"⚠️ Посадка не получена: {reason}.")
+        return False
+    result, fetched_at = cached
+    logger.warning("⏱ Дедлайн COLIZEUM исчерпан (%s), отправляю данные из кэша", reason)
+    text = format_colizeum_message(result, updated_at=datetime.fromtimestamp(fetched_at))
+    text += "\n" + freshness_note(fetched_at)
+    await broadcast_report(text, Deadline(FALLBACK_SEND_TIMEOUT))
+    return True
+
+async def fetch_colizeum_posadka(deadline: Deadline):
+    """Запрос посадки COLIZEUM; одновременные запросы используют один HTTP запрос"""
+    return await deadline.run(
+        colizeum_flight.do("posadka", lambda: compute_posadka_async(
+            COLIZEUM_DOMAIN, COLIZEUM_API_KEY, COLIZEUM_PROXY_URL,
+            MAX_RETRIES, RETRY_DELAY, SCHEMA_CACHE_TTL, deadline
+        )),
+        "fetch"
+    )
+
+async def validated_send_colizeum_posadka(deadline: Optional[Deadline] = None):
     """Отправка посадки COLIZEUM с проверкой"""
+    deadline = deadline or Deadline(COLIZEUM_DEADLINE)
     try:
         logger.info("🔍 Проверка достоверности посадки COLIZEUM")
-        result = await compute_posadka_async(
-            COLIZEUM_DOMAIN, COLIZEUM_API_KEY, COLIZEUM_PROXY_URL,
-            MAX_RETRIES, RETRY_DELAY, SCHEMA_CACHE_TTL
-        )
+        with deadline.stage("fetch"):
+            result = await fetch_colizeum_posadka(deadline)
         
         if not result:
             last_busy = get_last_busy()
@@ -142,11 +240,9 @@ async def validated_send_colizeum_posadka(bot):
 
         if busy == 0:
             logger.warning("🚫 Анти-ноль: занято=0, повтор через 30 сек.")
-            await asyncio.sleep(30)
-            result2 = await compute_posadka_async(
-                COLIZEUM_DOMAIN, COLIZEUM_API_KEY, COLIZEUM_PROXY_URL,
-                MAX_RETRIES, RETRY_DELAY, SCHEMA_CACHE_TTL
-            )
+            await deadline.asleep(30, "anti-zero")
+            with deadline.stage("refetch"):
+                result2 = await fetch_colizeum_posadka(deadline)
             if result2:
                 busy2 = len(result2["busy_pc"])
                 if busy2 and busy2 > 0:
@@ -154,75 +250,51 @@ async def validated_send_colizeum_posadka(bot):
                     busy = busy2
                     result = result2
                 else:
-                    await bot.send_message(chat_id=TARGET_CHAT_ID, text="⚠️ Посадка не подтверждена (занято=0).")
+                    await notify_service("⚠️ Посадка не подтверждена (занято=0).")
                     return False
             else:
-                await bot.send_message(chat_id=TARGET_CHAT_ID, text="⚠️ Посадка не получена (ошибка).")
+                await notify_service("⚠️ Посадка не получена (ошибка).")
                 return False
 
         busy_count = len(result["busy_pc"])
         save_colizeum_stat(busy_count, result["total_pc"], STATS_FILE)
-        text = format_colizeum_message(result)
-        
-        await bot.send_message(chat_id=TARGET_CHAT_ID, text=text, parse_mode="Markdown")
-        logger.info("✅ Посадка COLIZEUM отправлена — занято %s", busy_count)
+        # Текст формируется один раз для всех получателей; недоставленное к дедлайну отбрасывается
+        with deadline.stage("telegram"):
+            delivered = await publish_report(
+                "colizeum", posadka_state(result), lambda: format_colizeum_message(result), deadline
+            )
+        if not delivered:
+            # Все сообщения просрочены в очереди - уходим в отправку из кэша с отметкой
+            deadline.check("telegram")
+        logger.info("✅ Посадка COLIZEUM отправлена в %s чатов — занято %s (%s)", delivered, busy_count, deadline.summary())
+        stage_timings.record_deadline(deadline, "colizeum")
         return True
 
+    except DeadlineExceeded as e:
+        try:
+            return await send_cached_colizeum_posadka(e)
+        except Exception as send_error:
+            logger.error("❌ Не удалось отправить посадку COLIZEUM из кэша: %s", send_error)
+            return False
     except Exception as e:
         logger.exception("Ошибка в validated_send_colizeum_posadka: %s", e)
-        await bot.send_message(chat_id=TARGET_CHAT_ID, text=f"⚠️ Ошибка при проверке посадки: {e}")
+        await notify_service(f"⚠️ Ошибка при проверке посадки: {e}")
         return False
 
 # ========== TRUEGAMERS POSADKA ==========
-async def send_truegamers_posadka_text_only(bot, chat_id: int = None) -> str:
-    """Отправляет посадку TrueGamers только текстом (без фото)"""
-    # Если chat_id не передан, используем TARGET_CHAT_ID из конфига
-    if not chat_id:
-        chat_id = TARGET_CHAT_ID
+def format_truegamers_message(status: dict, timestamp: str, venue: str = TRUEGAMERS_VENUE) -> str:
+    """Форматирует сообщение о посадке площадки TrueGamers"""
+    total_pc = status.get('total_pc', 0)
+    occupied_pc = status.get('occupied_pc', 0)
+    free_pc = status.get('free_pc', 0)
+    total_tv = status.get('total_tv', 0)
+    occupied_tv = status.get('occupied_tv', 0)
+    free_tv = status.get('free_tv', 0)
     
-    if not chat_id:
-        logger.error("⚠️ chat_id не указан, невозможно отправить посадку TrueGamers")
-        return "❌ Chat ID не указан!"
-    
-    # Проверяем подключение устройства
-    if not android.check_device_connected():
-        error_msg = "❌ Эмулятор/устройство не подключено!"
-        logger.warning(error_msg)
-        try:
-            await bot.send_message(chat_id=chat_id, text=error_msg)
-        except Exception as e:
-            logger.error(f"Ошибка отправки сообщения об отсутствии устройства: {e}")
-        return error_msg
+    pc_occupied_percent = (occupied_pc / total_pc * 100) if total_pc > 0 else 0
+    pc_free_percent = (free_pc / total_pc * 100) if total_pc > 0 else 0
     
-    try:
-        logger.info("📱 Открываю приложение TrueGamers...")
-        android.open_app_and_places()
-        await asyncio.sleep(3)
-        
-        logger.info("📊 Получаю статус мест...")
-        status = android.get_places_status()
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        if 'error' in status:
-            message = f"❌ Ошибка при получении статуса: {status['error']}\n🕐 {timestamp}"
-            logger.error(f"Ошибка получения статуса: {status['error']}")
-            try:
-                await bot.send_message(chat_id=chat_id, text=message)
-            except Exception as e:
-                logger.error(f"Ошибка отправки сообщения об ошибке: {e}")
-            return message
-        
-        total_pc = status.get('total_pc', 0)
-        occupied_pc = status.get('occupied_pc', 0)
-        free_pc = status.get('free_pc', 0)
-        total_tv = status.get('total_tv', 0)
-        occupied_tv = status.get('occupied_tv', 0)
-        free_tv = status.get('free_tv', 0)
-        
-        pc_occupied_percent = (occupied_pc / total_pc * 100) if total_pc > 0 else 0
-        pc_free_percent = (free_pc / total_pc * 100) if total_pc > 0 else 0
-        
-        message = f"""📊 **TrueGamers Каменск-Уральский**
+    return f"""📊 **{venue}**
 🕐 {timestamp}
 
 💻 **ПК места:**
@@ -234,26 +306,261 @@ async def send_truegamers_posadka_text_only(bot, chat_id: int = None) -> str:
 • Всего: {total_tv}
 • 🟢 Свободно: {free_tv}
 • 🔴 Занято: {occupied_tv}"""
+
+async def send_cached_truegamers_posadka(chat_id: Optional[int], venue: str, reason: DeadlineExceeded) -> str:
+    """Отправляет последнюю известную посадку площадки с отметкой о свежести (кэш устройств этой площадки)"""
+    cached = device_pool.latest_status(venue)
+    if cached is None:
+        message = f"❌ Посадка {venue} не получена: {reason}"
+        logger.warning("⏱ Дедлайн %s исчерпан (%s), кэша нет", venue, reason)
+    else:
+        logger.warning("⏱ Дедлайн %s исчерпан (%s), отправляю данные из кэша", venue, reason)
+        status, fetched_at = cached
+        timestamp = datetime.fromtimestamp(fetched_at).strftime("%Y-%m-%d %H:%M:%S")
+        message = format_truegamers_message(status, timestamp, venue)
+        message += "\n\n" + freshness_note(fetched_at)
+    try:
+        await send_truegamers_text(chat_id, message, Deadline(FALLBACK_SEND_TIMEOUT), venue=venue)
+    except Exception as e:
+        logger.error(f"❌ Не удалось отправить посадку TrueGamers из кэша: {e}")
+    return message
+
+def truegamers_state(status: dict) -> dict:
+    """Состояние посадки TrueGamers для живого табло (счётчики мест без времени)"""
+    keys = ('total_pc', 'occupied_pc', 'free_pc', 'total_tv', 'occupied_tv', 'free_tv')
+    return {key: status.get(key, 0) for key in keys}
+
+def truegamers_board(venue: str) -> str:
+    """Ключ живого табло площадки (основная площадка - прежний ключ 'truegamers')"""
+    return "truegamers" if venue == TRUEGAMERS_VENUE else f"truegamers:{venue}"
+
+async def send_truegamers_text(chat_id: Optional[int], text: str, deadline: Optional[Deadline] = None,
+                               state: Optional[dict] = None, venue: str = TRUEGAMERS_VENUE) -> int:
+    """Отправляет отчёт площадки TrueGamers в указанный чат или, если chat_id не задан, всем подписчикам"""
+    if chat_id is None and state is not None:
+        return await publish_report(truegamers_board(venue), state, lambda: text, deadline)
+    if chat_id is None:
+        return await broadcast_report(text, deadline)
+    message = await outbox.send(chat_id, text, deadline=deadline, parse_mode='Markdown')
+    return int(message is not None)
+
+async def send_truegamers_error(chat_id: Optional[int], text: str) -> None:
+    """Ошибка TrueGamers: запросившему чату или, при рассылке, в основной чат"""
+    if chat_id is None:
+        await notify_service(text)
+    else:
+        await outbox.send(chat_id, text)
+
+def capture_truegamers_status(android: AndroidAutomation, deadline: Deadline, warm: bool) -> dict:
+    """Навигация к экрану мест и анализ статуса (блокирующий вызов, выполняется в потоке)"""
+    with android.use_deadline(deadline):
+        if warm:
+            logger.info("🔥 Экран мест прогрет заранее, пропускаю навигацию")
+            mode = 'prewarmed'
+        else:
+            logger.info("📱 Открываю экран мест TrueGamers...")
+            with deadline.stage("navigation"):
+                mode = android.ensure_places_screen()
+            # Вместо паузы "settle": навигация сама дожидается стабильного экрана с местами
+            logger.info("⏱ Навигация TrueGamers (%s): %s", mode, android.wait_log.summary())
         
-        logger.info(f"📤 Отправляю посадку TrueGamers в чат {chat_id}...")
-        try:
-            await bot.send_message(chat_id=chat_id, text=message, parse_mode='Markdown')
-            logger.info("✅ Посадка TrueGamers успешно отправлена")
-        except Exception as e:
-            logger.error(f"❌ Ошибка отправки сообщения в чат {chat_id}: {e}")
-            raise
+        logger.info("📊 Получаю статус мест...")
+        with deadline.stage("capture"):
+            status = android.get_places_status()
+        if mode != 'cold' and not truegamers_places_found(status):
+            # Экран без перезапуска мог показать устаревшие или пустые данные - один полный перезапуск
+            logger.warning("🔥 Места на экране без перезапуска не найдены, перезапускаю приложение")
+            with deadline.stage("navigation"):
+                android.open_app_and_places()
+            with deadline.stage("capture"):
+                status = android.get_places_status()
+        return status
+
+def truegamers_places_found(status: dict) -> bool:
+    """Статус без ошибки и хотя бы с одним распознанным местом"""
+    return 'error' not in status and status.get('total_pc', 0) + status.get('total_tv', 0) > 0
+
+def capture_venue_status(slot, deadline: Deadline) -> dict:
+    """Захват площадки на выданном устройстве (блокирующий вызов, выполняется в потоке)"""
+    # Прогретый экран мест используется один раз: в :00 остаётся только скриншот и анализ
+    warm = PREWARM_ENABLED and time.time() - slot.prewarmed_at < PREWARM_MAX_AGE
+    slot.prewarmed_at = 0.0
+    status = capture_truegamers_status(slot.android, deadline, warm)
+    if 'error' in status:
+        slot.fail(status['error'])
+    else:
+        slot.remember(status)
+    return status
+
+async def deliver_truegamers_venue(chat_id: Optional[int], venue: str, result, deadline: Deadline) -> str:
+    """Отправляет посадку одной площадки по результату захвата (статус или исключение)"""
+    try:
+        if isinstance(result, BaseException):
+            raise result
+        status = result
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        return message
+        if 'error' in status:
+            message = f"❌ {venue}: ошибка при получении статуса: {status['error']}\n🕐 {timestamp}"
+            logger.error(f"Ошибка получения статуса {venue}: {status['error']}")
+            try:
+                await send_truegamers_error(chat_id, message)
+            except Exception as e:
+                logger.error(f"Ошибка отправки сообщения об ошибке: {e}")
+            return message
         
+        message = format_truegamers_message(status, timestamp, venue)
+        
+        logger.info(f"📤 Отправляю посадку {venue} в {chat_id or 'чаты подписчиков'}...")
+        with deadline.stage("telegram"):
+            delivered = await send_truegamers_text(chat_id, message, deadline, truegamers_state(status), venue)
+        if not delivered:
+            deadline.check("telegram")
+            raise RuntimeError("сообщение не доставлено ни в один чат")
+        logger.info(f"✅ Посадка {venue} отправлена в {delivered} чатов ({deadline.summary()})")
+        return message
+    
+    except DeadlineExceeded as e:
+        return await send_cached_truegamers_posadka(chat_id, venue, e)
     except Exception as e:
-        error_msg = f"❌ Ошибка при получении посадки TrueGamers: {e}"
-        logger.exception("Ошибка в send_truegamers_posadka_text_only")
+        error_msg = f"❌ Ошибка при получении посадки {venue}: {e}"
+        logger.error("Ошибка посадки %s: %s", venue, e, exc_info=not isinstance(e, NoDeviceAvailable))
         try:
-            await bot.send_message(chat_id=chat_id, text=error_msg)
+            await send_truegamers_error(chat_id, error_msg)
         except Exception as send_error:
             logger.error(f"❌ Не удалось отправить сообщение об ошибке: {send_error}")
         return error_msg
 
+async def send_truegamers_posadka_text_only(chat_id: Optional[int] = None, deadline: Optional[Deadline] = None) -> str:
+    """Отправляет посадку TrueGamers только текстом (без фото)
+
+    Каждая площадка захватывается на своём устройстве, площадки - параллельно
+    (device_pool.map), отчёт и запасной кэш - отдельно по площадке.
+    Без chat_id отчёт рассылается всем подписчикам, ошибки - в основной чат.
+    """
+    if chat_id is None and not subscribers.all():
+        logger.error("⚠️ Нет подписанных чатов, невозможно отправить посадку TrueGamers")
+        return "❌ Нет чатов для рассылки!"
+    
+    deadline = deadline or Deadline(TRUEGAMERS_DEADLINE)
+    
+    # Проверяем подключение устройства
+    if not await device_pool.check_connected():
+        error_msg = "❌ Эмулятор/устройство не подключено!"
+        logger.warning(error_msg)
+        try:
+            await send_truegamers_error(chat_id, error_msg)
+        except Exception as e:
+            logger.error(f"Ошибка отправки сообщения об отсутствии устройства: {e}")
+        return error_msg
+    
+    if device_pool.all_busy():
+        logger.info("⏳ Все устройства заняты другими сценариями, жду освобождения...")
+    results = await device_pool.map(lambda slot: capture_venue_status(slot, deadline), venues=device_pool.venues())
+    messages = await asyncio.gather(*(deliver_truegamers_venue(chat_id, venue, result, deadline)
+                                      for venue, result in results.items()))
+    if all(not isinstance(r, BaseException) and 'error' not in r for r in results.values()):
+        stage_timings.record_deadline(deadline, "truegamers")
+    return "\n\n".join(messages)
+
+# ========== PREWARM ==========
+def compute_prewarm_lead() -> float:
+    """Опережение прогрева: p90 навигации и загрузки схемы плюс запас"""
+    navigation = stage_timings.estimate("prewarm.navigation", default=60.0)
+    schema = stage_timings.estimate("prewarm.schema", default=5.0)
+    lead = navigation + schema + PREWARM_MARGIN
+    return max(PREWARM_MIN_LEAD, min(PREWARM_MAX_LEAD, lead))
+
+def prewarm_places_screen(android: AndroidAutomation, deadline: Deadline) -> None:
+    """Открывает экран мест заранее (блокирующий вызов, выполняется в потоке)"""
+    with android.use_deadline(deadline), deadline.stage("navigation"):
+        android.ensure_places_screen()
+
+def prewarm_slot(slot, deadline: Deadline) -> None:
+    """Прогрев устройства площадки; время прогрева - только после успешной навигации"""
+    prewarm_places_screen(slot.android, deadline)
+    slot.prewarmed_at = time.time()
+
+def next_report_time(now: datetime) -> datetime:
+    """Время ближайшего отчёта в 0 минут после now"""
+    return (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+
+async def prewarm_task(app):
+    """Прогрев перед отчётом: проверка adb, экран мест TrueGamers и схема COLIZEUM"""
+    deadline = Deadline(PREWARM_MAX_LEAD)
+    # Отчёт, для которого выполняется этот прогрев: следующий прогрев - только для отчёта после него
+    served_report = next_report_time(datetime.now(timezone(LOCAL_TZ)))
+    logger.info("🔥 Прогрев перед отчётом (опережение %.0f с)", compute_prewarm_lead())
+    try:
+        # Схема должна оставаться в кэше до отчёта в :00
+        with deadline.stage("schema"):
+            await fetch_schema_async(
+                COLIZEUM_DOMAIN, COLIZEUM_API_KEY, COLIZEUM_PROXY_URL,
+                MAX_RETRIES, RETRY_DELAY, max(0, SCHEMA_CACHE_TTL - PREWARM_MAX_LEAD), deadline
+            )
+        
+        with deadline.stage("adb"):
+            connected = await device_pool.check_connected()
+        if connected:
+            # Прогревается по устройству на площадку; отчёт в :00 предпочтёт именно прогретое устройство
+            results = await device_pool.map(lambda slot: prewarm_slot(slot, deadline), venues=device_pool.venues())
+            for venue, result in results.items():
+                if isinstance(result, BaseException):
+                    logger.warning("⚠️ Прогрев %s не удался: %s", venue, result)
+            logger.info("✅ Прогрев завершён (%s)", deadline.summary())
+        else:
+            logger.warning("⚠️ Прогрев: эмулятор/устройство не подключено")
+    except DeadlineExceeded as e:
+        logger.warning("⏱ Прогрев не уложился в бюджет: %s", e)
+    except Exception as e:
+        logger.exception(f"❌ Ошибка прогрева: {e}")
+    finally:
+        stage_timings.record_deadline(deadline, "prewarm")
+        schedule_next_prewarm(app, served_report)
+
+def schedule_next_prewarm(app, served_report: Optional[datetime] = None):
+    """Планирует прогрев перед следующим отчётом в 0 минут.
+    
+    served_report - отчёт, который уже прогрет: если опережение за время
+    прогрева уменьшилось, второй прогрев перед тем же отчётом не планируется.
+    """
+    if not PREWARM_ENABLED or scheduler is None:
+        return
+    
+    now = datetime.now(timezone(LOCAL_TZ))
+    next_report = next_report_time(now)
+    if served_report is not None and next_report <= served_report:
+        next_report = served_report + timedelta(hours=1)
+    lead = compute_prewarm_lead()
+    run_at = next_report - timedelta(seconds=lead)
+    if run_at <= now:
+        run_at += timedelta(hours=1)
+    
+    scheduler.add_job(
+        prewarm_task,
+        trigger="date",
+        args=[app],
+        run_date=run_at,
+        id="prewarm",
+        replace_existing=True
+    )
+    logger.info(f"🔥 Прогрев запланирован на {run_at.strftime('%H:%M:%S')} (опережение {lead:.0f} с)")
+
+# ========== LIVE BOARD ==========
+async def live_board_task():
+    """Обновление живого табло COLIZEUM: сообщения правятся только при изменении посадки"""
+    deadline = Deadline(min(COLIZEUM_DEADLINE, LIVE_BOARD_INTERVAL))
+    try:
+        result = await fetch_colizeum_posadka(deadline)
+        if not result or not result["busy_pc"]:
+            # Анти-ноль: пустую посадку подтверждает только ежечасная проверка
+            return
+        await publish_report("colizeum", posadka_state(result), lambda: format_colizeum_message(result), deadline)
+    except DeadlineExceeded as e:
+        logger.warning("⏱ Табло COLIZEUM не обновлено: %s", e)
+    except Exception as e:
+        logger.exception(f"❌ Ошибка обновления табло COLIZEUM: {e}")
+
 # ========== HOURLY TASKS ==========
 async def hourly_posadka_task(app):
     """Задача для отправки посадки каждый час"""
@@ -263,26 +570,24 @@ async def hourly_posadka_task(app):
         logger.error("⚠️ app не передан - посадка не будет отправлена!")
         return
     
-    if not TARGET_CHAT_ID:
-        logger.error("⚠️ TARGET_CHAT_ID не установлен - посадка не будет отправлена!")
+    chats = subscribers.all()
+    if not chats:
+        logger.error("⚠️ Нет подписанных чатов - посадка не будет отправлена!")
         return
     
     try:
-        logger.info(f"⏳ Начало отправки посадки в чат {TARGET_CHAT_ID}...")
+        logger.info(f"⏳ Начало отправки посадки в {len(chats)} чатов: {chats}")
         logger.info(f"⏰ Время: {datetime.now(timezone(LOCAL_TZ)).strftime('%Y-%m-%d %H:%M:%S')}")
         
         # Отправляем COLIZEUM
         try:
             logger.info("📤 Отправляю посадку COLIZEUM...")
-            await validated_send_colizeum_posadka(app.bot)
+            await validated_send_colizeum_posadka()
             logger.info("✅ Посадка COLIZEUM отправлена")
         except Exception as e:
             logger.exception(f"❌ Ошибка при отправке посадки COLIZEUM: {e}")
             try:
-                await app.bot.send_message(
-                    chat_id=TARGET_CHAT_ID,
-                    text=f"⚠️ Ошибка при отправке посадки COLIZEUM: {e}"
-                )
+                await notify_service(f"⚠️ Ошибка при отправке посадки COLIZEUM: {e}")
             except:
                 pass
         
@@ -292,21 +597,19 @@ async def hourly_posadka_task(app):
         # Отправляем TrueGamers
         try:
             logger.info("📤 Отправляю посадку TrueGamers...")
-            await send_truegamers_posadka_text_only(app.bot, TARGET_CHAT_ID)
+            await send_truegamers_posadka_text_only()
             logger.info("✅ Посадка TrueGamers отправлена")
         except Exception as e:
             logger.exception(f"❌ Ошибка при отправке посадки TrueGamers: {e}")
             # Сообщение об ошибке уже отправлено внутри функции
         
         logger.info("✅ Процесс отправки посадки завершен")
+        schedule_next_prewarm(app)
         
     except Exception as e:
         logger.exception(f"❌ Критическая ошибка при отправке посадки каждый час: {e}")
         try:
-            await app.bot.send_message(
-                chat_id=TARGET_CHAT_ID,
-                text=f"❌ Критическая ошибка при отправке посадки: {e}"
-            )
+            await notify_service(f"❌ Критическая ошибка при отправке посадки: {e}")
         except:
             pass
 
@@ -323,6 +626,10 @@ async def start_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
             "👋 Привет! Я объединенный бот для мониторинга посадки.\n\n"
             "Доступные команды:\n"
             "• /start - Показать меню\n"
+            "• /subscribe - Получать отчёты в этом чате\n"
+            "• /unsubscribe - Отписаться от отчётов\n"
+            "• /outbox - Состояние очереди сообщений\n"
+            "• /devices - Устройства TrueGamers\n"
             "• Посадка отправляется автоматически каждый час\n\n"
             "Выбери действие:",
             reply_markup=markup
@@ -340,23 +647,22 @@ async def text_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
         
         if "посадка colizeum" in text or "посадка колизеум" in text:
             await update.message.reply_text("⏳ Проверяю посадку COLIZEUM...")
-            ok = await validated_send_colizeum_posadka(context.bot)
+            ok = await validated_send_colizeum_posadka()
             if ok:
                 await update.message.reply_text("✅ Посадка COLIZEUM отправлена/подтверждена.")
             else:
                 await update.message.reply_text("⚠️ Посадка не подтверждена.")
         
         elif "посадка truegamers" in text or "посадка тругеймерс" in text:
-            await update.message.reply_text("⏳ Проверяю посадку TrueGamers...")
+            if device_pool.all_busy():
+                await update.message.reply_text("⏳ Устройство занято другим запросом, посадка TrueGamers будет получена следом...")
+            else:
+                await update.message.reply_text("⏳ Проверяю посадку TrueGamers...")
             try:
-                # Отправляем в TARGET_CHAT_ID, как и COLIZEUM
-                if not TARGET_CHAT_ID:
-                    await update.message.reply_text("❌ TARGET_CHAT_ID не настроен!")
-                    return
-                    
-                message = await send_truegamers_posadka_text_only(context.bot, TARGET_CHAT_ID)
+                # Рассылаем подписчикам, как и COLIZEUM
+                message = await send_truegamers_posadka_text_only()
                 if "❌" not in message:
-                    await update.message.reply_text("✅ Посадка TrueGamers отправлена в чат.")
+                    await update.message.reply_text("✅ Посадка TrueGamers отправлена в чаты.")
                 else:
                     await update.message.reply_text(f"⚠️ {message}")
             except Exception as e:
@@ -378,6 +684,114 @@ async def text_router(update: Update, context: ContextTypes.DEFAULT_TYPE):
         except:
             pass
 
+def is_broadcast_admin(update: Update) -> bool:
+    """Управление рассылкой: пользователь из ADMIN_USER_IDS, без списка - только в основном чате"""
+    if ADMIN_USER_IDS:
+        return update.effective_user is not None and update.effective_user.id in ADMIN_USER_IDS
+    return update.effective_chat is not None and update.effective_chat.id == TARGET_CHAT_ID
+
+async def deny_broadcast_command(update: Update, command: str) -> bool:
+    """Отказ в команде управления рассылкой; True - команда не выполняется"""
+    if is_broadcast_admin(update):
+        return False
+    user = update.effective_user
+    logger.warning("⛔ /%s от пользователя %s в чате %s отклонена", command, user.id if user else None,
+                   update.effective_chat.id if update.effective_chat else None)
+    await update.message.reply_text("⛔ Команда доступна только администраторам бота.")
+    return True
+
+async def subscribe_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Подписывает чат на рассылку отчётов"""
+    try:
+        if await deny_broadcast_command(update, "subscribe"):
+            return
+        if subscribers.add(update.effective_chat.id):
+            await update.message.reply_text("✅ Чат подписан на отчёты о посадке.")
+        else:
+            await update.message.reply_text("ℹ️ Чат уже получает отчёты.")
+    except Exception as e:
+        logger.exception("Ошибка в subscribe_cmd: %s", e)
+
+async def unsubscribe_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отписывает чат от рассылки отчётов"""
+    try:
+        if await deny_broadcast_command(update, "unsubscribe"):
+            return
+        if update.effective_chat.id in (TARGET_CHAT_ID, *BROADCAST_CHAT_IDS):
+            # Чаты из настроек подписываются заново при каждом запуске - отписка только через .env
+            await update.message.reply_text("ℹ️ Чат задан в настройках (TARGET_CHAT_ID / BROADCAST_CHAT_IDS), отписка - через .env.")
+            return
+        if subscribers.remove(update.effective_chat.id):
+            await update.message.reply_text("✅ Чат отписан от отчётов.")
+        else:
+            await update.message.reply_text("ℹ️ Чат не был подписан.")
+    except Exception as e:
+        logger.exception("Ошибка в unsubscribe_cmd: %s", e)
+
+async def outbox_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает состояние очереди исходящих сообщений"""
+    try:
+        if await deny_broadcast_command(update, "outbox"):
+            return
+        m = outbox.metrics()
+        await update.message.reply_text(
+            f"📮 Очередь: {m['depth']} (отправляется {m['in_flight']})\n"
+            f"✅ Отправлено: {m['sent']} • ❌ Ошибок: {m['failed']} • ⏱ Просрочено: {m['expired']}\n"
+            f"🚦 RetryAfter: {m['retry_after']}\n"
+            f"⌛ Задержка: p50 {m['latency_p50'] * 1000:.0f} мс, p95 {m['latency_p95'] * 1000:.0f} мс\n"
+            f"👥 Подписчиков: {len(subscribers.all())}"
+            + (f"\n📌 Табло: правок {live_board.edits}, новых {live_board.created}, без изменений {live_board.skipped}"
+               if live_board else "")
+        )
+    except Exception as e:
+        logger.exception("Ошибка в outbox_cmd: %s", e)
+
+async def devices_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Показывает устройства пула: состояние, занятость, задержку и ошибки"""
+    try:
+        await device_pool.discover()
+        lines = ["📱 Устройства TrueGamers:"]
+        for d in device_pool.stats():
+            icon = "🟢" if d['healthy'] and d['state'] == 'device' else "🔴"
+            latency = f"{d['latency']:.1f} с" if d['latency'] is not None else "—"
+            lines.append(
+                f"{icon} {d['serial']} ({d['venue']}): {d['state']}{' (занято)' if d['busy'] else ''}, "
+                f"захватов {d['captures']}, ошибок {d['failures']}, задержка {latency}"
+                + (f"\n    📄 {d['ui_dump']}" if d['ui_dump'] else "")
+                + (f"\n    🧭 {d['navigation']}" if d['navigation'] else "")
+                + (f"\n    ⚠️ {d['last_error']}" if d['last_error'] else "")
+            )
+        if len(lines) == 1:
+            lines.append("нет устройств")
+        if device_tracker:
+            lines.append(f"🛰 Отслеживание: {device_tracker.mode}, изменений {device_tracker.changes}")
+        await update.message.reply_text("\n".join(lines))
+    except Exception as e:
+        logger.exception("Ошибка в devices_cmd: %s", e)
+
+async def debug_capture_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Отладочные кадры и дампы последних прогонов навигации архивом (PNG кодируются только сейчас)"""
+    try:
+        rings = [(slot.name, slot.android.debug_ring) for slot in device_pool.slots.values()
+                 if getattr(slot.android, 'debug_ring', None) is not None]
+        if not rings:
+            await update.message.reply_text("ℹ️ Отладочная запись выключена (DEBUG_CAPTURE=1 в .env)")
+            return
+        for name, ring in rings:
+            if not ring.runs():
+                await update.message.reply_text(f"ℹ️ {name}: прогонов ещё не было")
+                continue
+            archive = await asyncio.to_thread(ring.to_zip)
+            safe_name = re.sub(r'[^\w.-]', '_', name)
+            await update.message.reply_document(
+                document=archive,
+                filename=f"debug_{safe_name}_{datetime.now(timezone(LOCAL_TZ)).strftime('%Y%m%d_%H%M%S')}.zip",
+                caption=f"🧪 {name}: {ring.summary()}"
+            )
+    except Exception as e:
+        logger.exception("Ошибка в debug_capture_cmd: %s", e)
+        await update.message.reply_text("⚠️ Не удалось выгрузить отладочные кадры.")
+
 async def csv_export_cmd(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Экспорт статистики в CSV"""
     try:
@@ -444,56 +858,68 @@ def export_stats_to_csv(days: int = 7) -> Optional[str]:
         return None
 
 # ========== SCHEDULER ==========
+async def send_shift_report(app):
+    """Отправляет итог смены"""
+    summary = colizeum_shift_summary(STATS_FILE)
+    await broadcast_report(summary)
+
 def start_scheduler(app):
-    """Запускает планировщик задач"""
+    """Запускает планировщик задач в event loop бота"""
     global scheduler
     
     try:
         local_tz = timezone(LOCAL_TZ)
-        scheduler = BackgroundScheduler(timezone=local_tz)
+        scheduler = AsyncIOScheduler(timezone=local_tz)
         
         # Посадка каждый час (0 минут)
         scheduler.add_job(
-            lambda: run_async(hourly_posadka_task, app),
+            hourly_posadka_task,
             trigger="cron",
             minute=0,
+            args=[app],
             id="hourly_posadka",
             replace_existing=True
         )
         
         # Итог смены в 21:00
-        async def send_shift_report():
-            if TARGET_CHAT_ID:
-                summary = colizeum_shift_summary(STATS_FILE)
-                await app.bot.send_message(
-                    chat_id=TARGET_CHAT_ID,
-                    text=summary,
-                    parse_mode="Markdown"
-                )
-        
         scheduler.add_job(
-            lambda: run_async(send_shift_report),
+            send_shift_report,
             trigger="cron",
+            args=[app],
             hour=21,
             minute=0,
             id="shift_report",
             replace_existing=True
         )
         
-        # Очистка старых данных в 8:00
+        # Очистка старых данных в 8:00 (синхронная задача выполняется в пуле потоков)
         scheduler.add_job(
-            lambda: prune_old_days(STATS_FILE),
+            prune_old_days,
             trigger="cron",
+            args=[STATS_FILE],
             hour=8,
             minute=0,
             id="prune_stats",
             replace_existing=True
         )
         
+        # Живое табло COLIZEUM обновляется чаще ежечасного отчёта
+        if live_board:
+            scheduler.add_job(
+                live_board_task,
+                trigger="interval",
+                seconds=LIVE_BOARD_INTERVAL,
+                id="live_board",
+                max_instances=1,
+                coalesce=True,
+                replace_existing=True
+            )
+        
         scheduler.start()
+        schedule_next_prewarm(app)
         logger.info("🕒 Планировщик запущен (ежечасные отчёты, итог в 21:00, очистка в 8:00).")
         logger.info(f"📅 Следующая отправка посадки в 0 минут следующего часа (часовой пояс: {LOCAL_TZ})")
-        logger.info(f"✅ TARGET_CHAT_ID: {TARGET_CHAT_ID}")
+        logger.info(f"✅ TARGET_CHAT_ID: {TARGET_CHAT_ID}, подписчиков: {len(subscribers.all())}")
         logger.info(f"✅ app_instance установлен: {app_instance is not None}")
         
         # Показываем список задач
@@ -505,6 +931,49 @@ def start_scheduler(app):
         logger.exception(f"⚠️ Не удалось запустить планировщик: {e}")
 
 # ========== MAIN ==========
+async def on_device_change(serial: str, before: str, after: str):
+    """Сообщает в основной чат об отключении и повторном подключении устройства"""
+    await device_pool.discover()
+    if before == 'device' and after != 'device':
+        await notify_service(f"📴 Устройство {serial} отключено ({after or 'нет в списке adb'})")
+    elif after == 'device':
+        await notify_service(f"📱 Устройство {serial} подключено")
+
+async def on_startup(app):
+    """post_init: очередь исходящих, отслеживание устройств и планировщик запускаются в event loop бота"""
+    start_outbox(app)
+    if device_tracker:
+        device_pool.tracker = device_tracker
+        device_tracker.add_listener(on_device_change)
+        await asyncio.to_thread(device_tracker.start, asyncio.get_running_loop())
+        logger.info("📱 Отслеживание устройств: %s", device_tracker.mode)
+    if app.bot_data.get("with_scheduler", True):
+        start_scheduler(app)
+
+async def on_shutdown(app):
+    """post_shutdown: дожидаемся отправки оставшихся сообщений"""
+    if device_tracker:
+        await asyncio.to_thread(device_tracker.stop)
+    if outbox:
+        await outbox.stop()
+
+def build_application(token: str = TELEGRAM_TOKEN, base_url: Optional[str] = None, with_scheduler: bool = True):
+    """Создаёт приложение с обработчиками и параллельной обработкой обновлений"""
+    builder = ApplicationBuilder().token(token).concurrent_updates(CONCURRENT_UPDATES)
+    if base_url:
+        builder = builder.base_url(base_url)
+    app = builder.post_init(on_startup).post_shutdown(on_shutdown).build()
+    app.bot_data["with_scheduler"] = with_scheduler
+    
+    app.add_handler(CommandHandler("start", start_cmd))
+    app.add_handler(CommandHandler("subscribe", subscribe_cmd))
+    app.add_handler(CommandHandler("unsubscribe", unsubscribe_cmd))
+    app.add_handler(CommandHandler("outbox", outbox_cmd))
+    app.add_handler(CommandHandler("devices", devices_cmd))
+    app.add_handler(CommandHandler("debug_capture", debug_capture_cmd))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_router))
+    return app
+
 def main():
     """Запускает бота"""
     global app_instance
@@ -514,16 +983,18 @@ def main():
         return
     
     try:
-        app = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+        app = build_application()
         app_instance = app
         
-        app.add_handler(CommandHandler("start", start_cmd))
-        app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, text_router))
-        
-        start_scheduler(app)
-        
-        logger.info("✅ Объединенный бот запущен.")
-        app.run_polling()
+        if BOT_MODE == "webhook":
+            if not WEBHOOK_URL:
+                logger.error("BOT_MODE=webhook, но WEBHOOK_URL не установлен!")
+                return
+            logger.info("✅ Объединенный бот запущен (webhook).")
+            run_webhook(app, WEBHOOK_URL, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET, ALLOWED_UPDATES)
+        else:
+            logger.info("✅ Объединенный бот запущен.")
+            app.run_polling(allowed_updates=ALLOWED_UPDATES)
         
     except KeyboardInterrupt:
         logger.info("Бот остановлен пользователем")
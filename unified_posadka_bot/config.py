@@ -22,6 +22,35 @@ TELEGRAM_TOKEN = os.getenv('TELEGRAM_TOKEN', '8357166908:AAHFZNh5T05r_6Hhbk-vwGr
 TARGET_CHAT_ID_STR = os.getenv('TARGET_CHAT_ID', '-1002383295254')
 TARGET_CHAT_ID = int(TARGET_CHAT_ID_STR) if TARGET_CHAT_ID_STR and TARGET_CHAT_ID_STR.strip() else -1002383295254
 
+# Дополнительные чаты для рассылки отчётов (через запятую); подписка также через /subscribe
+BROADCAST_CHAT_IDS = [int(c) for c in os.getenv('BROADCAST_CHAT_IDS', '').split(',') if c.strip()]
+SUBSCRIBERS_FILE = os.getenv('SUBSCRIBERS_FILE', 'subscribers.json')
+# Пользователи (через запятую), которым доступны /subscribe, /unsubscribe и /outbox;
+# пусто - команды принимаются только в основном чате (TARGET_CHAT_ID)
+ADMIN_USER_IDS = [int(u) for u in os.getenv('ADMIN_USER_IDS', '').split(',') if u.strip()]
+# Очередь исходящих: параллельные отправки, лимит сообщений/с на бота, интервалы на чат (с)
+OUTBOX_CONCURRENCY = int(os.getenv('OUTBOX_CONCURRENCY', '4'))
+OUTBOX_GLOBAL_RATE = float(os.getenv('OUTBOX_GLOBAL_RATE', '25'))
+OUTBOX_CHAT_INTERVAL = float(os.getenv('OUTBOX_CHAT_INTERVAL', '1.0'))
+OUTBOX_GROUP_INTERVAL = float(os.getenv('OUTBOX_GROUP_INTERVAL', '3.0'))
+
+# Живое табло: одно закреплённое сообщение на чат и площадку, правится при изменении посадки
+LIVE_BOARD_ENABLED = os.getenv('LIVE_BOARD_ENABLED', '0').lower() in ('1', 'true', 'yes')
+LIVE_BOARD_INTERVAL = int(os.getenv('LIVE_BOARD_INTERVAL', '60'))  # Период обновления табло COLIZEUM (с)
+LIVE_BOARD_FILE = os.getenv('LIVE_BOARD_FILE', 'live_board.json')
+
+# Режим получения обновлений: polling (long polling) или webhook (локальный HTTP приёмник)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')  # Публичный https адрес, проксируемый на приёмник
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8081'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')  # Пусто - случайный токен при каждом запуске
+# Бот обрабатывает только сообщения - остальные типы обновлений не запрашиваем
+ALLOWED_UPDATES = ['message']
+# Сколько обновлений обрабатывать параллельно (1 - последовательно)
+CONCURRENT_UPDATES = int(os.getenv('CONCURRENT_UPDATES', '16'))
+
 # ========== COLIZEUM API ==========
 COLIZEUM_DOMAIN = os.getenv('COLIZEUM_DOMAIN', '234-1.cls.expert')
 COLIZEUM_API_KEY = os.getenv('COLIZEUM_API_KEY', 'd9a77f5187d4e6e4260e06d6619d695b')
@@ -30,11 +59,32 @@ COLIZEUM_PROXY_URL = os.getenv('COLIZEUM_PROXY_URL', 'https://mapclub.langame.ru
 # ========== TRUEGAMERS ANDROID ==========
 ADB_PATH = os.getenv('ADB_PATH', 'adb')
 DEVICE_ID = os.getenv('DEVICE_ID', '')
+# Пул устройств: серийные номера через запятую или auto (все подключённые); пусто - одно устройство DEVICE_ID
+DEVICE_IDS = [s.strip() for s in os.getenv('DEVICE_IDS', '').split(',') if s.strip()]
+# Название площадки TrueGamers в отчёте (все устройства пула, если TRUEGAMERS_VENUES не задан)
+TRUEGAMERS_VENUE = os.getenv('TRUEGAMERS_VENUE', 'TrueGamers Каменск-Уральский')
+# Несколько площадок (аккаунтов): "Название=серийный номер" через запятую - отчёт по каждой,
+# захват параллельно на своём устройстве; устройства не из списка - площадка TRUEGAMERS_VENUE
+TRUEGAMERS_VENUES = {serial.strip(): name.strip() for name, _, serial in
+                     (v.rpartition('=') for v in os.getenv('TRUEGAMERS_VENUES', '').split(',') if '=' in v)}
+# Пауза перед повторным использованием устройства после ошибки захвата (с, удваивается подряд)
+DEVICE_FAILURE_COOLDOWN = float(os.getenv('DEVICE_FAILURE_COOLDOWN', '30'))
+# Фоновое отслеживание подключения устройств (track-devices) вместо adb devices перед каждым захватом
+DEVICE_TRACKER = os.getenv('DEVICE_TRACKER', '1').lower() in ('1', 'true', 'yes')
+# Интервал проверок adb devices, пока поток track-devices недоступен (с)
+DEVICE_POLL_INTERVAL = float(os.getenv('DEVICE_POLL_INTERVAL', '5'))
 TRUEGAMERS_PACKAGE = os.getenv('TRUEGAMERS_PACKAGE', 'com.truegamers.true_gamers')
 TRUEGAMERS_ACTIVITY = os.getenv('TRUEGAMERS_ACTIVITY', '')
 PIN_CODE = os.getenv('PIN_CODE', '1111')
+# Команды adb shell через один постоянный процесс вместо запуска adb на каждую
+ADB_SHELL_SESSION = os.getenv('ADB_SHELL_SESSION', '1').lower() in ('1', 'true', 'yes')
+# Способ связи с устройством: cli - процесс adb, native - протокол adb сервера напрямую (без процессов)
+ADB_BACKEND = os.getenv('ADB_BACKEND', 'cli').lower()
+ADB_SERVER_HOST = os.getenv('ADB_SERVER_HOST', '127.0.0.1')
+ADB_SERVER_PORT = int(os.getenv('ADB_SERVER_PORT', '5037'))
 
-# Координаты TrueGamers (для разрешения 1440x2560)
+# Координаты TrueGamers (для разрешения 1440x2560); на других экранах пересчитываются пропорционально
+REFERENCE_SCREEN = (1440, 2560)
 PLACES_BUTTON = (407, 882)
 PIN_KEYPAD = {
     '1': (265, 1075), '2': (625, 1075), '3': (985, 1075),
@@ -42,6 +92,31 @@ PIN_KEYPAD = {
     '7': (265, 1475), '8': (625, 1475), '9': (985, 1475),
     '0': (625, 1675),
 }
+# Пауза между цифрами PIN (с); нажатия выполняются одним сценарием на устройстве
+PIN_TAP_INTERVAL = float(os.getenv('PIN_TAP_INTERVAL', '0.3'))
+# Тёплый режим: приложение остаётся на экране мест, данные обновляются на месте
+# (swipe - потянуть экран вниз, tab - повторно открыть вкладку 'Места') без перезапуска и PIN
+WARM_APP_MODE = os.getenv('WARM_APP_MODE', '1').lower() in ('1', 'true', 'yes')
+WARM_REFRESH = os.getenv('WARM_REFRESH', 'swipe').lower()
+# Полный перезапуск приложения не реже, чем раз в WARM_MAX_AGE секунд
+WARM_MAX_AGE = int(os.getenv('WARM_MAX_AGE', '1800'))
+# Калибровка интерфейса (кнопка 'Места', клавиши PIN, область мест) по разрешению и версии приложения
+UI_CALIBRATION_FILE = os.getenv('UI_CALIBRATION_FILE', 'ui_calibration.json')
+# Отпечатки экранов (PIN, главный, схема мест) для быстрого определения, какой экран открыт
+SCREEN_STATES_FILE = os.getenv('SCREEN_STATES_FILE', 'screen_states.json')
+# UI dump в сжатом режиме (uiautomator dump --compressed): без служебных контейнеров, меньше и быстрее
+UI_DUMP_COMPRESSED = os.getenv('UI_DUMP_COMPRESSED', '1').lower() in ('1', 'true', 'yes')
+# Отладочные PNG (экран до/после PIN, экран мест, кадр анализа) и файлы UI dump
+# (ui_dump.xml, ui_dump_debug.xml) - только по этому флагу; анализ мест работает с сырым framebuffer в памяти
+SCREEN_DEBUG_PNG = os.getenv('SCREEN_DEBUG_PNG', '0').lower() in ('1', 'true', 'yes')
+# Отладочные кадры и дампы навигации в памяти: DEBUG_CAPTURE_FRAMES последних за прогон,
+# DEBUG_CAPTURE_RUNS последних прогонов; выгрузка архивом - команда /debug_capture
+DEBUG_CAPTURE = os.getenv('DEBUG_CAPTURE', '0').lower() in ('1', 'true', 'yes')
+DEBUG_CAPTURE_FRAMES = int(os.getenv('DEBUG_CAPTURE_FRAMES', '12'))
+DEBUG_CAPTURE_RUNS = int(os.getenv('DEBUG_CAPTURE_RUNS', '3'))
+# Раскладка мест (номер, тип, центр, размер) по отпечатку экрана мест и разрешению:
+# повторный захват без UI dump; места ищутся по дампу заново не реже раза в SEAT_LAYOUT_MAX_AGE с (0 - всегда)
+SEAT_LAYOUT_MAX_AGE = int(os.getenv('SEAT_LAYOUT_MAX_AGE', '900'))
 
 # ========== НАСТРОЙКИ ==========
 STATS_FILE = os.getenv('STATS_FILE', 'stats.json')
@@ -51,3 +126,15 @@ MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
 RETRY_DELAY = int(os.getenv('RETRY_DELAY', '2'))
 SCHEMA_CACHE_TTL = int(os.getenv('SCHEMA_CACHE_TTL', '3600'))
 
+# Бюджет времени на один отчёт (секунды): HTTP, ADB, UI dump, скриншот, анализ и отправка
+COLIZEUM_DEADLINE = int(os.getenv('COLIZEUM_DEADLINE', '60'))
+TRUEGAMERS_DEADLINE = int(os.getenv('TRUEGAMERS_DEADLINE', '180'))
+
+# Прогрев перед ежечасным отчётом: опережение подбирается по истории длительностей этапов
+PREWARM_ENABLED = os.getenv('PREWARM_ENABLED', '1').lower() in ('1', 'true', 'yes')
+PREWARM_MIN_LEAD = int(os.getenv('PREWARM_MIN_LEAD', '30'))
+PREWARM_MAX_LEAD = int(os.getenv('PREWARM_MAX_LEAD', '300'))
+PREWARM_MARGIN = int(os.getenv('PREWARM_MARGIN', '15'))
+PREWARM_MAX_AGE = int(os.getenv('PREWARM_MAX_AGE', '600'))
+STAGE_TIMINGS_FILE = os.getenv('STAGE_TIMINGS_FILE', 'stage_timings.json')
+
@@ -0,0 +1,218 @@
+"""
+Клиент протокола adb сервера (localhost:5037) без запуска процесса adb
+"""
+import socket
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+from .deadline import DeadlineExceeded
+
+
+class AdbError(Exception):
+    """adb сервер или устройство вернули FAIL"""
+
+
+# Пакеты shell v2: id (1 байт) + длина (4 байта LE) + данные
+_SHELL_STDOUT = 1
+_SHELL_STDERR = 2
+_SHELL_EXIT = 3
+
+
+class AdbConnection:
+    """Одно соединение с adb сервером: запросы в формате <4 hex длины><текст>"""
+
+    def __init__(self, host: str, port: int, timeout: float):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(timeout)
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_exactly(self, size: int) -> bytes:
+        chunks = []
+        while size:
+            chunk = self.sock.recv(min(size, 65536))
+            if not chunk:
+                raise AdbError("соединение с adb сервером закрыто")
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+
+    def read_all(self) -> bytes:
+        chunks = []
+        while True:
+            chunk = self.sock.recv(65536)
+            if not chunk:
+                return b''.join(chunks)
+            chunks.append(chunk)
+
+    def read_length_prefixed(self) -> bytes:
+        size = int(self.read_exactly(4), 16)
+        return self.read_exactly(size)
+
+    def request(self, payload: str) -> None:
+        """Отправляет запрос и проверяет ответ OKAY/FAIL"""
+        data = payload.encode('utf-8')
+        self.sock.sendall(b'%04x' % len(data) + data)
+        status = self.read_exactly(4)
+        if status == b'OKAY':
+            return
+        if status == b'FAIL':
+            raise AdbError(self.read_length_prefixed().decode('utf-8', errors='replace'))
+        raise AdbError(f"неожиданный ответ adb сервера: {status!r}")
+
+
+def parse_devices(text: str) -> List[Tuple[str, str]]:
+    """Список (серийный номер, состояние) из ответа host:devices / host:track-devices"""
+    return [tuple(line.split('\t', 1)) for line in text.splitlines() if '\t' in line]
+
+
+class DeviceTrackStream:
+    """Поток host:track-devices: список устройств сразу и затем при каждом изменении.
+
+    close() из другого потока прерывает ожидание следующего списка.
+    """
+
+    def __init__(self, conn: AdbConnection):
+        self.conn = conn
+
+    def __iter__(self) -> Iterator[List[Tuple[str, str]]]:
+        while True:
+            try:
+                data = self.conn.read_length_prefixed()
+            except (AdbError, OSError, ValueError):
+                return
+            yield parse_devices(data.decode('utf-8', errors='replace'))
+
+    def close(self) -> None:
+        try:
+            self.conn.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.conn.close()
+
+
+class AdbClient:
+    """Сервисы adb сервера: host:devices, host:transport, shell:, exec: и sync (pull).
+
+    Каждый вызов открывает своё соединение, поэтому клиент можно использовать
+    из нескольких потоков одновременно.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 5037, serial: str = '', timeout: float = 10.0):
+        self.host = host
+        self.port = port
+        self.serial = serial
+        self.timeout = timeout
+        self._shell_v2: Optional[bool] = None
+
+    def _connect(self, timeout: Optional[float]) -> AdbConnection:
+        """Соединение с сервером; timeout из остатка дедлайна может быть 0 - тогда запрос не начинается"""
+        timeout = self.timeout if timeout is None else timeout
+        if timeout <= 0:
+            raise DeadlineExceeded('adb')
+        return AdbConnection(self.host, self.port, timeout)
+
+    def _device(self, timeout: Optional[float]) -> AdbConnection:
+        """Соединение, переключённое на устройство (host:transport)"""
+        conn = self._connect(timeout)
+        try:
+            conn.request(f"host:transport:{self.serial}" if self.serial else "host:transport-any")
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def version(self, timeout: Optional[float] = None) -> int:
+        with self._connect(timeout) as conn:
+            conn.request("host:version")
+            return int(conn.read_length_prefixed(), 16)
+
+    def devices(self, timeout: Optional[float] = None) -> List[Tuple[str, str]]:
+        """Список (серийный номер, состояние) как в `adb devices`"""
+        with self._connect(timeout) as conn:
+            conn.request("host:devices")
+            return parse_devices(conn.read_length_prefixed().decode('utf-8', errors='replace'))
+
+    def track_devices(self) -> DeviceTrackStream:
+        """Подписка на изменения списка устройств (host:track-devices)"""
+        conn = self._connect(None)
+        try:
+            conn.request("host:track-devices")
+        except Exception:
+            conn.close()
+            raise
+        # Между изменениями поток молчит сколько угодно долго
+        conn.sock.settimeout(None)
+        return DeviceTrackStream(conn)
+
+    def shell(self, command: str, timeout: Optional[float] = None) -> Tuple[str, str, int]:
+        """Shell команда: (stdout, stderr, код возврата).
+
+        Использует протокол shell v2 (раздельные потоки и код возврата); если
+        устройство его не поддерживает - обычный shell: с общим выводом.
+        """
+        if self._shell_v2 is not False:
+            try:
+                return self._shell_v2_run(command, timeout)
+            except AdbError as e:
+                # Ошибки транспорта (нет устройства, offline) не означают отсутствие shell v2
+                if self._shell_v2 or 'device' in str(e).lower():
+                    raise
+                self._shell_v2 = False
+        with self._device(timeout) as conn:
+            conn.request(f"shell:{command}")
+            return conn.read_all().decode('utf-8', errors='replace'), "", 0
+
+    def _shell_v2_run(self, command: str, timeout: Optional[float]) -> Tuple[str, str, int]:
+        stdout, stderr, exit_code = bytearray(), bytearray(), 0
+        with self._device(timeout) as conn:
+            conn.request(f"shell,v2,raw:{command}")
+            self._shell_v2 = True
+            while True:
+                try:
+                    header = conn.read_exactly(5)
+                except AdbError:
+                    break
+                packet_id, size = struct.unpack('<BI', header)
+                data = conn.read_exactly(size) if size else b''
+                if packet_id == _SHELL_STDOUT:
+                    stdout += data
+                elif packet_id == _SHELL_STDERR:
+                    stderr += data
+                elif packet_id == _SHELL_EXIT:
+                    exit_code = data[0] if data else 0
+                    break
+        return stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace'), exit_code
+
+    def exec_out(self, command: str, timeout: Optional[float] = None) -> bytes:
+        """Двоичный stdout команды без терминала (как `adb exec-out`)"""
+        with self._device(timeout) as conn:
+            conn.request(f"exec:{command}")
+            return conn.read_all()
+
+    def pull(self, remote_path: str, timeout: Optional[float] = None) -> bytes:
+        """Содержимое файла устройства через сервис sync (RECV), без записи на диск"""
+        path = remote_path.encode('utf-8')
+        chunks = []
+        with self._device(timeout) as conn:
+            conn.request("sync:")
+            conn.sock.sendall(b'RECV' + struct.pack('<I', len(path)) + path)
+            while True:
+                packet_id, size = struct.unpack('<4sI', conn.read_exactly(8))
+                if packet_id == b'DATA':
+                    chunks.append(conn.read_exactly(size))
+                elif packet_id == b'DONE':
+                    break
+                elif packet_id == b'FAIL':
+                    raise AdbError(conn.read_exactly(size).decode('utf-8', errors='replace'))
+                else:
+                    raise AdbError(f"неожиданный ответ sync: {packet_id!r}")
+            conn.sock.sendall(b'QUIT' + struct.pack('<I', 0))
+        return b''.join(chunks)
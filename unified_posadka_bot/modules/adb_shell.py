@@ -0,0 +1,214 @@
+"""
+Постоянная сессия adb shell: команды передаются в один процесс вместо запуска adb на каждую
+"""
+import logging
+import os
+import shlex
+import subprocess
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ShellTimeout(Exception):
+    """Команда не завершилась за отведённое время (сессия будет пересоздана)"""
+
+
+class _SessionLost(Exception):
+    """Процесс adb shell недоступен до отправки команды"""
+
+
+class _StreamReader(threading.Thread):
+    """Читает поток процесса в буфер и будит ожидающих при поступлении данных"""
+
+    def __init__(self, stream, cond: threading.Condition):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.cond = cond
+        self.buffer = bytearray()
+        self.closed = False
+
+    def run(self) -> None:
+        fd = self.stream.fileno()
+        while True:
+            try:
+                chunk = os.read(fd, 65536)
+            except OSError:
+                chunk = b''
+            with self.cond:
+                if not chunk:
+                    self.closed = True
+                    self.cond.notify_all()
+                    return
+                self.buffer += chunk
+                self.cond.notify_all()
+
+    def take_until(self, marker: bytes) -> Optional[Tuple[bytes, bytes]]:
+        """Забирает из буфера данные до marker и строку после него (вызывать под cond)"""
+        pos = self.buffer.find(marker)
+        if pos < 0:
+            return None
+        end = self.buffer.find(b'\n', pos + len(marker))
+        if end < 0:
+            return None
+        data = bytes(self.buffer[:pos])
+        tail = bytes(self.buffer[pos + len(marker):end])
+        del self.buffer[:end + 1]
+        return data, tail
+
+
+class AdbShellSession:
+    """Один долгоживущий процесс `adb shell`, в который по очереди пишутся команды.
+
+    Каждая команда выполняется в `sh -c` и обрамляется уникальным маркером
+    в stdout и stderr: маркер отделяет вывод команды от следующей и несёт код
+    возврата; ошибка синтаксиса команды (незакрытая кавычка) не мешает маркеру. При таймауте
+    или обрыве процесса сессия закрывается и при следующем вызове
+    открывается заново.
+    """
+
+    def __init__(self, adb_path: str = 'adb', device_id: str = ''):
+        self.adb_path = adb_path
+        self.device_id = device_id
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._proc: Optional[subprocess.Popen] = None
+        self._stdout: Optional[_StreamReader] = None
+        self._stderr: Optional[_StreamReader] = None
+        self._seq = 0
+        self._opened = 0
+        self._token = uuid.uuid4().hex[:12]
+        self.commands = 0
+        self.reconnects = 0
+
+    def _command(self) -> List[str]:
+        command = [self.adb_path]
+        if self.device_id:
+            command.extend(['-s', self.device_id])
+        command.append('shell')
+        return command
+
+    @property
+    def alive(self) -> bool:
+        return self._proc is not None and self._proc.poll() is None
+
+    def _open(self) -> None:
+        if self._opened:
+            self.reconnects += 1
+        self._opened += 1
+        self._proc = subprocess.Popen(
+            self._command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        self._stdout = _StreamReader(self._proc.stdout, self._cond)
+        self._stderr = _StreamReader(self._proc.stderr, self._cond)
+        self._stdout.start()
+        self._stderr.start()
+
+    def close(self) -> None:
+        """Завершает процесс adb shell"""
+        with self._lock:
+            self._close()
+
+    def _close(self, kill: bool = False) -> None:
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        if kill:
+            # Зависшая команда продолжила бы выполняться и писать в канал
+            proc.kill()
+        try:
+            proc.wait(timeout=1)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+
+    def _exchange(self, command: str, timeout: float) -> Tuple[str, str, int]:
+        self._seq += 1
+        marker = f"__ADBSH_{self._token}_{self._seq}__".encode()
+        # Команда выполняется в `sh -c`: незакрытая кавычка или скобка даёт синтаксическую ошибку
+        # этой команды, а не поглощает маркер; stdin - /dev/null, чтобы не прочитать следующие команды
+        script = (
+            f"sh -c {shlex.quote(command)} </dev/null; __rc=$?; "
+            f"printf '\\n%s %d\\n' {marker.decode()} \"$__rc\"; "
+            f"printf '\\n%s\\n' {marker.decode()} >&2\n"
+        )
+        try:
+            self._proc.stdin.write(script.encode())
+            self._proc.stdin.flush()
+        except OSError as e:
+            # Команда не отправлена - её можно повторить в новой сессии
+            raise _SessionLost(str(e))
+
+        until = time.monotonic() + timeout
+        out = err = None
+        with self._cond:
+            while out is None or err is None:
+                if out is None:
+                    out = self._stdout.take_until(b'\n' + marker + b' ')
+                if err is None:
+                    err = self._stderr.take_until(b'\n' + marker)
+                if out is not None and err is not None:
+                    break
+                if self._stdout.closed and out is None or self._stderr.closed and err is None:
+                    # Процесс adb shell завершился во время команды: результат - вывод и код процесса
+                    return self._finish_exited()
+                remaining = until - time.monotonic()
+                if remaining <= 0:
+                    raise ShellTimeout(command)
+                self._cond.wait(remaining)
+
+        stdout, code = out
+        stderr, _ = err
+        try:
+            exit_code = int(code.strip() or 0)
+        except ValueError:
+            exit_code = -1
+        return (stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'),
+                exit_code)
+
+    def _finish_exited(self) -> Tuple[str, str, int]:
+        """Результат команды, после которой процесс adb shell завершился (вызывать под cond)"""
+        proc, self._proc = self._proc, None
+        self._cond.release()
+        try:
+            exit_code = proc.wait(timeout=5)
+        finally:
+            self._cond.acquire()
+        stdout, stderr = bytes(self._stdout.buffer), bytes(self._stderr.buffer)
+        return (stdout.decode('utf-8', errors='replace'),
+                stderr.decode('utf-8', errors='replace'),
+                exit_code)
+
+    def run(self, command: str, timeout: float = 10.0) -> Tuple[str, str, int]:
+        """Выполняет команду в сессии: (stdout, stderr, код возврата).
+
+        Обрыв процесса приводит к одной попытке переподключения; при таймауте
+        сессия закрывается и бросается ShellTimeout.
+        """
+        with self._lock:
+            for attempt in (1, 2):
+                if not self.alive:
+                    self._open()
+                try:
+                    result = self._exchange(command, timeout)
+                    self.commands += 1
+                    return result
+                except ShellTimeout:
+                    self._close(kill=True)
+                    raise
+                except _SessionLost as e:
+                    self._close()
+                    if attempt == 2:
+                        raise
+                    logger.warning("adb shell оборвался (%s), переподключаюсь", e)
@@ -0,0 +1,114 @@
+"""
+Калибровка интерфейса TrueGamers: координаты кнопки 'Места', клавиш PIN и области мест,
+найденные один раз для разрешения экрана и версии приложения и сохранённые в JSON
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .ui_tree import UITree, clickable, contains, matches
+
+logger = logging.getLogger(__name__)
+
+_BOUNDS = re.compile(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]')
+
+
+def make_key(screen_size: Optional[tuple], app_version: str) -> str:
+    """Ключ калибровки: разрешение и версия приложения (например '1440x2560@2.3.1')"""
+    size = f"{screen_size[0]}x{screen_size[1]}" if screen_size else "unknown"
+    return f"{size}@{app_version or 'unknown'}"
+
+
+def find_places_button(tree: UITree, texts: List[str]) -> Optional[Tuple[int, int]]:
+    """Центр кнопки 'Места' в снимке экрана (кликабельные элементы - в первую очередь)"""
+    selector = contains(*texts)
+    node = tree.first(clickable() & selector) or tree.first(selector)
+    return node.center if node else None
+
+
+def find_keypad(tree: UITree) -> Dict[str, Tuple[int, int]]:
+    """Центры цифровых клавиш PIN: элементы, у которых text или content-desc - одна цифра"""
+    keypad = {}
+    for node in tree.find(matches(r'^\s*\d\s*$')):
+        for label in (node.text.strip(), node.desc.strip()):
+            if len(label) == 1 and label.isdigit() and label not in keypad:
+                keypad[label] = node.center
+    return keypad
+
+
+def seat_region(places: List[Dict], margin: int = 50) -> Optional[List[int]]:
+    """Прямоугольник [x1, y1, x2, y2], в котором лежат распознанные места, с запасом margin"""
+    boxes = [tuple(int(v) for v in m.groups()) for m in
+             (_BOUNDS.search(p.get('bounds', '')) for p in places) if m]
+    if not boxes:
+        return None
+    return [max(0, min(b[0] for b in boxes) - margin), max(0, min(b[1] for b in boxes) - margin),
+            max(b[2] for b in boxes) + margin, max(b[3] for b in boxes) + margin]
+
+
+class CalibrationCache:
+    """Калибровки по ключам make_key(), сохраняются в JSON.
+
+    Запись ключа: {'places_button': [x, y], 'keypad': {'0': [x, y], ...},
+    'seat_region': [x1, y1, x2, y2], 'updated_at': ...}. Значение,
+    которое не подтвердилось (кнопка не открыла экран мест, PIN не принят),
+    удаляется через forget() и находится заново при следующем запуске.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {k: v for k, v in data.items() if isinstance(v, dict)}
+        except Exception as e:
+            logger.warning("Ошибка чтения калибровки %s: %s", self.path, e)
+            return {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning("Ошибка записи калибровки %s: %s", self.path, e)
+
+    def get(self, key: str, field: str):
+        """Сохранённое значение поля калибровки (None - не откалибровано)"""
+        with self._lock:
+            return self._entries.get(key, {}).get(field)
+
+    def put(self, key: str, field: str, value) -> None:
+        value = json.loads(json.dumps(value))  # кортежи - списками, как после загрузки из файла
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            if entry.get(field) == value:
+                return
+            entry[field] = value
+            entry['updated_at'] = time.time()
+            self._save()
+        logger.info("🎯 Калибровка %s: %s = %s", key, field, value)
+
+    def forget(self, key: str, field: str) -> None:
+        """Удаляет значение, которое не подтвердилось проверкой"""
+        with self._lock:
+            entry = self._entries.get(key, {})
+            if entry.pop(field, None) is None:
+                return
+            self._save()
+        logger.warning("🎯 Калибровка %s: %s не подтвердилась, будет найдена заново", key, field)
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._lock:
+            return json.loads(json.dumps(self._entries))
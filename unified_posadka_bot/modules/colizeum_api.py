@@ -4,12 +4,14 @@
 import logging
 import json
 import os
-import asyncio
 import time
 from datetime import datetime
 from typing import Optional, Dict, List, Any
 from statistics import mean
 
+from .deadline import Deadline, DeadlineExceeded, bounded_sleep, bounded_timeout
+from .locks import stats_lock
+
 try:
     import aiohttp
     HAS_AIOHTTP = True
@@ -25,10 +27,13 @@ logger = logging.getLogger(__name__)
 # Кэш схемы клуба
 _schema_cache: Optional[Dict[str, Any]] = None
 _schema_cache_time: float = 0
-last_message_id: Optional[int] = None
+
+# Последний успешный результат посадки (для деградации при исчерпании дедлайна)
+_last_result: Optional[Dict[str, Any]] = None
+_last_result_time: float = 0
 
 
-async def fetch_schema_async(domain: str, api_key: str, proxy_url: str, max_retries: int = 3, retry_delay: int = 2, cache_ttl: int = 3600) -> Dict[str, str]:
+async def fetch_schema_async(domain: str, api_key: str, proxy_url: str, max_retries: int = 3, retry_delay: int = 2, cache_ttl: int = 3600, deadline: Optional[Deadline] = None) -> Dict[str, str]:
     """Асинхронно получает схему клуба (UUID -> имя/номер места) с кэшированием"""
     global _schema_cache, _schema_cache_time
     
@@ -49,17 +54,19 @@ async def fetch_schema_async(domain: str, api_key: str, proxy_url: str, max_retr
     }
     
     data = {"type": "clubSchema", "club_id": 1, "domain": domain}
+    stage = "clubSchema"
     
     for attempt in range(max_retries):
         try:
+            timeout = bounded_timeout(deadline, 10, stage)
             if HAS_AIOHTTP:
                 async with aiohttp.ClientSession() as session:
-                    async with session.post(proxy_url, headers=headers, data=data, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                    async with session.post(proxy_url, headers=headers, data=data, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
                         resp.raise_for_status()
                         result = await resp.json()
                         payload = result.get("data", [])
             else:
-                resp = requests.post(proxy_url, headers=headers, data=data, timeout=10)
+                resp = requests.post(proxy_url, headers=headers, data=data, timeout=timeout)
                 resp.raise_for_status()
                 payload = resp.json().get("data", [])
             
@@ -76,10 +83,14 @@ async def fetch_schema_async(domain: str, api_key: str, proxy_url: str, max_retr
             logger.info("Схема клуба загружена: %s мест", len(seats))
             return seats
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(stage)
             logger.warning("Ошибка clubSchema (попытка %s/%s): %s", attempt + 1, max_retries, e)
             if attempt < max_retries - 1:
-                await asyncio.sleep(retry_delay * (attempt + 1))
+                await bounded_sleep(deadline, retry_delay * (attempt + 1), stage)
             else:
                 logger.error("Не удалось загрузить схему после %s попыток", max_retries)
                 if _schema_cache:
@@ -88,7 +99,7 @@ async def fetch_schema_async(domain: str, api_key: str, proxy_url: str, max_retr
                 return {}
 
 
-async def fetch_status_async(domain: str, api_key: str, proxy_url: str, max_retries: int = 3, retry_delay: int = 2) -> List[Dict[str, Any]]:
+async def fetch_status_async(domain: str, api_key: str, proxy_url: str, max_retries: int = 3, retry_delay: int = 2, deadline: Optional[Deadline] = None) -> List[Dict[str, Any]]:
     """Асинхронно получает статусы ПК"""
     headers = {
         "User-Agent": "Mozilla/5.0 (Bot)",
@@ -101,32 +112,44 @@ async def fetch_status_async(domain: str, api_key: str, proxy_url: str, max_retr
     }
     
     data = {"type": "pcStatus", "club_id": 1, "domain": domain}
+    stage = "pcStatus"
     
     for attempt in range(max_retries):
         try:
+            timeout = bounded_timeout(deadline, 10, stage)
             if HAS_AIOHTTP:
                 async with aiohttp.ClientSession() as session:
-                    async with session.post(proxy_url, headers=headers, data=data, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                    async with session.post(proxy_url, headers=headers, data=data, timeout=aiohttp.ClientTimeout(total=timeout)) as resp:
                         resp.raise_for_status()
                         result = await resp.json()
                         return result.get("data", [])
             else:
-                resp = requests.post(proxy_url, headers=headers, data=data, timeout=10)
+                resp = requests.post(proxy_url, headers=headers, data=data, timeout=timeout)
                 resp.raise_for_status()
                 return resp.json().get("data", [])
+        except DeadlineExceeded:
+            raise
         except Exception as e:
+            if deadline is not None and deadline.expired():
+                raise DeadlineExceeded(stage)
             logger.warning("Ошибка pcStatus (попытка %s/%s): %s", attempt + 1, max_retries, e)
             if attempt < max_retries - 1:
-                await asyncio.sleep(retry_delay * (attempt + 1))
+                await bounded_sleep(deadline, retry_delay * (attempt + 1), stage)
             else:
                 logger.error("Не удалось загрузить статусы после %s попыток", max_retries)
                 return []
 
 
-async def compute_posadka_async(domain: str, api_key: str, proxy_url: str, max_retries: int = 3, retry_delay: int = 2, cache_ttl: int = 3600) -> Optional[Dict[str, Any]]:
-    """Асинхронно комбинирует данные схемы и статусы"""
-    schema = await fetch_schema_async(domain, api_key, proxy_url, max_retries, retry_delay, cache_ttl)
-    statuses = await fetch_status_async(domain, api_key, proxy_url, max_retries, retry_delay)
+async def compute_posadka_async(domain: str, api_key: str, proxy_url: str, max_retries: int = 3, retry_delay: int = 2, cache_ttl: int = 3600, deadline: Optional[Deadline] = None) -> Optional[Dict[str, Any]]:
+    """Асинхронно комбинирует данные схемы и статусы
+
+    При исчерпании дедлайна бросает DeadlineExceeded — вызывающий код
+    может деградировать к get_cached_posadka().
+    """
+    global _last_result, _last_result_time
+
+    schema = await fetch_schema_async(domain, api_key, proxy_url, max_retries, retry_delay, cache_ttl, deadline)
+    statuses = await fetch_status_async(domain, api_key, proxy_url, max_retries, retry_delay, deadline)
     
     if not schema or not statuses:
         logger.warning("Недостаточно данных: schema=%s, statuses=%s", len(schema) if schema else 0, len(statuses) if statuses else 0)
@@ -155,7 +178,7 @@ async def compute_posadka_async(domain: str, api_key: str, proxy_url: str, max_r
     total_pc, total_tv = len(all_pc), len(all_tv)
     free_pc, free_tv = total_pc - len(busy_pc), total_tv - len(busy_tv)
 
-    return {
+    result = {
         "busy_pc": busy_pc,
         "total_pc": total_pc,
         "free_pc": free_pc,
@@ -163,11 +186,31 @@ async def compute_posadka_async(domain: str, api_key: str, proxy_url: str, max_r
         "total_tv": total_tv,
         "free_tv": free_tv,
     }
+    _last_result = result
+    _last_result_time = time.time()
+    return result
+
 
+def get_cached_posadka() -> Optional[tuple]:
+    """Возвращает (результат, время получения) последней успешной посадки или None"""
+    if _last_result is None:
+        return None
+    return _last_result, _last_result_time
+
+
+def posadka_state(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Состояние посадки для живого табло: всё, от чего зависит текст, кроме времени"""
+    return {
+        "busy_pc": result["busy_pc"],
+        "busy_tv": result["busy_tv"],
+        "total_pc": result["total_pc"],
+        "total_tv": result["total_tv"],
+    }
 
-def format_colizeum_message(result: Dict[str, Any]) -> str:
+
+def format_colizeum_message(result: Dict[str, Any], updated_at: Optional[datetime] = None) -> str:
     """Форматирует сообщение о посадке COLIZEUM"""
-    now = datetime.now().strftime("%H:%M")
+    now = (updated_at or datetime.now()).strftime("%H:%M")
     busy_pc_str = ", ".join(result["busy_pc"]) if result["busy_pc"] else "—"
     busy_tv_str = ", ".join(result["busy_tv"]) if result["busy_tv"] else "—"
 
@@ -189,34 +232,35 @@ def format_colizeum_message(result: Dict[str, Any]) -> str:
 def save_stat(busy: int, total: int, stats_file: str) -> None:
     """Сохраняет статистику в JSON файл"""
     day = datetime.now().strftime("%Y-%m-%d")
-    stats = {}
-    if os.path.exists(stats_file):
+    with stats_lock:
+        stats = {}
+        if os.path.exists(stats_file):
+            try:
+                with open(stats_file, "r", encoding="utf-8") as f:
+                    stats = json.load(f)
+            except Exception as e:
+                logger.warning("Ошибка чтения статистики: %s", e)
+                stats = {}
+        
+        if not isinstance(stats, dict):
+            stats = {}
+        
+        stats.setdefault(day, []).append(
+            {"time": datetime.now().strftime("%H:%M"), "busy": busy, "total": total}
+        )
+        
         try:
-            with open(stats_file, "r", encoding="utf-8") as f:
-                stats = json.load(f)
+            with open(stats_file, "w", encoding="utf-8") as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
         except Exception as e:
-            logger.warning("Ошибка чтения статистики: %s", e)
-            stats = {}
-    
-    if not isinstance(stats, dict):
-        stats = {}
-    
-    stats.setdefault(day, []).append(
-        {"time": datetime.now().strftime("%H:%M"), "busy": busy, "total": total}
-    )
-    
-    try:
-        with open(stats_file, "w", encoding="utf-8") as f:
-            json.dump(stats, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        logger.error("Ошибка записи статистики: %s", e)
+            logger.error("Ошибка записи статистики: %s", e)
 
 
 def shift_summary(stats_file: str) -> str:
     """Формирует итог смены"""
     if not os.path.exists(stats_file):
         return "📊 Нет данных за сегодня."
-    with open(stats_file, "r", encoding="utf-8") as f:
+    with stats_lock, open(stats_file, "r", encoding="utf-8") as f:
         stats = json.load(f)
     day = datetime.now().strftime("%Y-%m-%d")
     if day not in stats or not stats[day]:
@@ -0,0 +1,113 @@
+"""
+Бюджет времени (дедлайн) для конвейера отчётов посадки
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Awaitable, List, Optional, Tuple
+
+
+class DeadlineExceeded(TimeoutError):
+    """Бюджет времени отчёта исчерпан"""
+
+    def __init__(self, stage: str = ''):
+        self.stage = stage
+        super().__init__(f"дедлайн исчерпан на этапе '{stage}'" if stage else "дедлайн исчерпан")
+
+
+class Deadline:
+    """Общий бюджет времени на один запрос отчёта.
+
+    Каждый этап (HTTP, ADB, UI dump, скриншот, классификация, отправка в Telegram)
+    проверяет остаток бюджета и ограничивает им свои таймауты.
+    """
+
+    def __init__(self, budget: float):
+        self.budget = budget
+        self.started = time.monotonic()
+        self.expires_at = self.started + budget
+        self.stages: List[Tuple[str, float]] = []
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str = '') -> None:
+        """Бросает DeadlineExceeded, если бюджет исчерпан"""
+        if self.expired():
+            raise DeadlineExceeded(stage)
+
+    def timeout(self, cap: float, stage: str = '') -> float:
+        """Таймаут этапа: не больше cap и не больше остатка бюджета"""
+        self.check(stage)
+        return min(cap, self.remaining())
+
+    def sleep(self, seconds: float, stage: str = '') -> None:
+        """Синхронная пауза в пределах бюджета"""
+        self.check(stage)
+        remaining = self.remaining()
+        if seconds >= remaining:
+            time.sleep(remaining)
+            raise DeadlineExceeded(stage)
+        time.sleep(seconds)
+
+    async def asleep(self, seconds: float, stage: str = '') -> None:
+        """Асинхронная пауза в пределах бюджета"""
+        self.check(stage)
+        remaining = self.remaining()
+        if seconds >= remaining:
+            await asyncio.sleep(remaining)
+            raise DeadlineExceeded(stage)
+        await asyncio.sleep(seconds)
+
+    async def run(self, aw: Awaitable, stage: str = '', cap: Optional[float] = None):
+        """Выполняет корутину с таймаутом из остатка бюджета и отменяет её по истечении"""
+        timeout = self.timeout(cap, stage) if cap is not None else self.timeout(self.remaining(), stage)
+        try:
+            return await asyncio.wait_for(aw, timeout=timeout)
+        except asyncio.TimeoutError:
+            if self.expired():
+                raise DeadlineExceeded(stage)
+            raise
+
+    @contextmanager
+    def stage(self, name: str):
+        """Замеряет длительность этапа и проверяет бюджет на входе"""
+        self.check(name)
+        started = time.monotonic()
+        try:
+            yield self
+        finally:
+            self.stages.append((name, time.monotonic() - started))
+
+    def summary(self) -> str:
+        parts = [f"{name}={duration:.1f}s" for name, duration in self.stages]
+        return f"{self.elapsed():.1f}/{self.budget:.0f}s" + (f" ({', '.join(parts)})" if parts else "")
+
+
+def bounded_timeout(deadline: Optional[Deadline], cap: float, stage: str = '') -> float:
+    """Таймаут этапа с учётом необязательного дедлайна"""
+    if deadline is None:
+        return cap
+    return deadline.timeout(cap, stage)
+
+
+async def bounded_sleep(deadline: Optional[Deadline], seconds: float, stage: str = '') -> None:
+    """asyncio.sleep с учётом необязательного дедлайна"""
+    if deadline is None:
+        await asyncio.sleep(seconds)
+    else:
+        await deadline.asleep(seconds, stage)
+
+
+def freshness_note(timestamp: float) -> str:
+    """Явная отметка о свежести данных из кэша"""
+    age_min = max(0, int((time.time() - timestamp) // 60))
+    when = datetime.fromtimestamp(timestamp).strftime("%H:%M")
+    return f"⚠️ _Данные из кэша от {when} (устарели на {age_min} мин): бюджет времени отчёта исчерпан_"
@@ -0,0 +1,90 @@
+"""
+Отладочные кадры и дампы навигации в памяти: последние N за прогон в кольцевом буфере,
+PNG и архив собираются только по запросу (/debug_capture), а не на каждом шаге
+"""
+import io
+import threading
+import time
+import zipfile
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+import numpy as np
+
+from .framebuffer import Frame
+
+
+class DebugArtifact:
+    """Кадр (прореженный массив пикселей) или XML дамп с именем и временем"""
+
+    __slots__ = ('name', 'frame', 'xml', 'created_at')
+
+    def __init__(self, name: str, frame: Optional[Frame] = None, xml: Optional[str] = None):
+        self.name = name
+        self.frame = frame
+        self.xml = xml
+        self.created_at = time.time()
+
+    @property
+    def size(self) -> int:
+        """Память, занятая артефактом (байт)"""
+        return self.frame.pixels.nbytes if self.frame is not None else len(self.xml or '')
+
+    def encode(self) -> bytes:
+        """PNG или XML - кодируется только здесь, при выгрузке"""
+        if self.frame is not None:
+            return self.frame.to_png()
+        return (self.xml or '').encode('utf-8')
+
+
+class DebugRing:
+    """Кольцевой буфер отладочных артефактов: по frames штук за прогон, последние runs прогонов.
+
+    Кадр хранится прореженным (каждый step-й пиксель) и скопированным из
+    буфера screencap, чтобы не держать весь сырой кадр; дамп - строкой.
+    """
+
+    def __init__(self, frames: int = 12, runs: int = 3, step: int = 2):
+        self.frames = frames
+        self.step = max(1, step)
+        self._lock = threading.Lock()
+        self._runs: Deque[Tuple[str, float, Deque[DebugArtifact]]] = deque(maxlen=max(1, runs))
+
+    def start_run(self, label: str) -> None:
+        """Новый прогон навигации; самый старый прогон вытесняется"""
+        with self._lock:
+            self._runs.append((label, time.time(), deque(maxlen=self.frames)))
+
+    def _add(self, artifact: DebugArtifact) -> None:
+        with self._lock:
+            if not self._runs:
+                self._runs.append(('вне прогона', time.time(), deque(maxlen=self.frames)))
+            self._runs[-1][2].append(artifact)
+
+    def add_frame(self, name: str, frame: Frame) -> None:
+        pixels = np.ascontiguousarray(frame.pixels[::self.step, ::self.step])
+        self._add(DebugArtifact(name, frame=Frame(pixels, frame.x0, frame.y0, frame.step * self.step,
+                                                  frame.screen_size)))
+
+    def add_dump(self, name: str, xml: str) -> None:
+        self._add(DebugArtifact(name, xml=xml))
+
+    def runs(self) -> List[Tuple[str, float, List[DebugArtifact]]]:
+        with self._lock:
+            return [(label, started, list(items)) for label, started, items in self._runs]
+
+    def summary(self) -> str:
+        runs = self.runs()
+        artifacts = sum(len(items) for _, _, items in runs)
+        size = sum(a.size for _, _, items in runs for a in items)
+        return f"прогонов {len(runs)}, артефактов {artifacts}, {size / 1024 / 1024:.1f} МБ"
+
+    def to_zip(self, prefix: str = '') -> bytes:
+        """ZIP всех артефактов буфера: папка на прогон, файлы в порядке съёмки"""
+        out = io.BytesIO()
+        with zipfile.ZipFile(out, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for number, (label, started, items) in enumerate(self.runs(), 1):
+                folder = f"{prefix}{number:02d}_{time.strftime('%H%M%S', time.localtime(started))}_{label}"
+                for index, artifact in enumerate(items, 1):
+                    archive.writestr(f"{folder}/{index:02d}_{artifact.name}", artifact.encode())
+        return out.getvalue()
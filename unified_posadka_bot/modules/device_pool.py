@@ -0,0 +1,261 @@
+"""
+Пул Android устройств: обнаружение, выдача сценариям, здоровье и задержки захвата
+"""
+import asyncio
+import logging
+import os
+import re
+import statistics
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Сколько последних захватов учитывается в задержке устройства
+LATENCY_WINDOW = 20
+# Верхняя граница паузы после серии ошибок (с)
+MAX_COOLDOWN = 600
+
+
+class NoDeviceAvailable(Exception):
+    """В пуле нет подключённого устройства"""
+
+
+def device_files_dir(serial: str) -> str:
+    """Папка скриншотов и дампов устройства (серийный номер вида 127.0.0.1:5555 - безопасное имя)"""
+    return os.path.join("devices", re.sub(r'[^\w.-]', '_', serial))
+
+
+class DeviceSlot:
+    """Устройство пула: площадка, автоматизация, занятость, здоровье и кэш последнего статуса"""
+
+    def __init__(self, android, failure_cooldown: float = 30.0, venue: str = ''):
+        self.android = android
+        self.serial: str = android.device_id
+        # Площадка (аккаунт), которую показывает приложение на этом устройстве
+        self.venue = venue
+        self.failure_cooldown = failure_cooldown
+        self.busy = False
+        # Состояние из adb devices: device, offline, unauthorized, missing (нет в списке), unknown
+        self.state = 'unknown'
+        self.captures = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.last_error = ''
+        self.cooldown_until = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        # Кэш устройства: последний успешный статус мест и время прогрева экрана мест
+        self.last_status: Optional[dict] = None
+        self.last_status_time = 0.0
+        self.prewarmed_at = 0.0
+        self._failed = False
+
+    @property
+    def name(self) -> str:
+        return self.serial or 'default'
+
+    @property
+    def healthy(self) -> bool:
+        """Устройство подключено и не на паузе после ошибок"""
+        return self.state in ('device', 'unknown') and time.monotonic() >= self.cooldown_until
+
+    def latency(self) -> Optional[float]:
+        """Медиана длительности последних захватов (None - захватов ещё не было)"""
+        return statistics.median(self.latencies) if self.latencies else None
+
+    def fail(self, reason: str) -> None:
+        """Отмечает текущий захват как неудачный (вызывать внутри lease)"""
+        self._failed = True
+        self.last_error = reason
+
+    def remember(self, status: dict) -> None:
+        """Сохраняет успешный статус мест в кэш устройства"""
+        self.last_status = status
+        self.last_status_time = time.time()
+
+    def _record(self, seconds: float, error: Optional[str]) -> None:
+        self.captures += 1
+        if error is None:
+            self.consecutive_failures = 0
+            self.latencies.append(seconds)
+            return
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = error
+        cooldown = min(MAX_COOLDOWN, self.failure_cooldown * 2 ** (self.consecutive_failures - 1))
+        self.cooldown_until = time.monotonic() + cooldown
+        logger.warning("📱 %s: ошибка захвата (%s), пауза %.0f с", self.name, error, cooldown)
+
+    def stats(self) -> Dict[str, Any]:
+        dumper = getattr(self.android, 'ui_dumper', None)
+        nav_stats = getattr(self.android, 'nav_stats', None)
+        return {
+            'serial': self.name,
+            'venue': self.venue,
+            'state': self.state,
+            'busy': self.busy,
+            'healthy': self.healthy,
+            'captures': self.captures,
+            'failures': self.failures,
+            'latency': self.latency(),
+            'last_error': self.last_error,
+            'last_status_time': self.last_status_time,
+            'ui_dump': dumper.stats.summary() if dumper is not None else '',
+            'navigation': nav_stats.summary() if nav_stats is not None else '',
+        }
+
+
+class DevicePool:
+    """Набор устройств, которые выдаются сценариям по одному.
+
+    Каждое устройство относится к площадке (venues: серийный номер -> площадка,
+    остальные - default_venue). lease() выдаёт свободное подключённое устройство
+    (площадки venue, если задана) или ждёт освобождения: сначала исправные,
+    среди них прогретые заранее, затем с наименьшей задержкой; устройство на
+    паузе после ошибок - только если других нет. У каждого устройства свой
+    экземпляр AndroidAutomation - со своей калибровкой экрана, сессией adb
+    и папкой файлов - и свой кэш статуса. map() запускает захват по одному
+    устройству на каждую площадку (или на каждое устройство) одновременно.
+    """
+
+    def __init__(self, devices: List, factory: Optional[Callable[[str], Any]] = None,
+                 probe=None, failure_cooldown: float = 30.0,
+                 venues: Optional[Dict[str, str]] = None, default_venue: str = ''):
+        self.failure_cooldown = failure_cooldown
+        self.venue_of = dict(venues or {})
+        self.default_venue = default_venue
+        self.slots: Dict[str, DeviceSlot] = {}
+        for android in devices:
+            self._add(android)
+        # factory(serial) создаёт автоматизацию для нового устройства; None - состав пула фиксирован
+        self.factory = factory
+        # Через probe выполняется adb devices (для пустого пула в режиме auto)
+        self.probe = probe or (devices[0] if devices else None)
+        # DeviceTracker: пока он работает, состояние берётся из его таблицы без запуска adb
+        self.tracker = None
+        self._cond = asyncio.Condition()
+
+    def _add(self, android) -> DeviceSlot:
+        slot = DeviceSlot(android, self.failure_cooldown, self.venue_of.get(android.device_id, self.default_venue))
+        self.slots[slot.serial] = slot
+        return slot
+
+    # ---------- обнаружение ----------
+    async def discover(self) -> List[Tuple[str, str]]:
+        """Обновляет состояние устройств и добавляет новые (если есть factory).
+
+        Источник - таблица DeviceTracker, если он запущен, иначе adb devices.
+        """
+        if self.tracker is not None and self.tracker.running:
+            devices = self.tracker.snapshot()
+        elif self.probe is not None:
+            devices = await asyncio.to_thread(self.probe.list_devices)
+        else:
+            return []
+        states = {serial: state.strip() for serial, state in devices}
+        if self.factory is not None:
+            for serial, state in states.items():
+                if serial not in self.slots and state == 'device':
+                    logger.info("📱 Найдено новое устройство %s", serial)
+                    self._add(self.factory(serial))
+        for serial, slot in self.slots.items():
+            if serial:
+                slot.state = states.get(serial, 'missing')
+            else:
+                # Устройство без серийного номера - первое подключённое
+                slot.state = 'device' if 'device' in states.values() else 'missing'
+        return list(states.items())
+
+    async def check_connected(self) -> bool:
+        """Есть ли в пуле хотя бы одно подключённое устройство"""
+        await self.discover()
+        return any(slot.state == 'device' for slot in self.slots.values())
+
+    # ---------- выдача ----------
+    def all_busy(self) -> bool:
+        return bool(self.slots) and all(slot.busy for slot in self.slots.values())
+
+    def venues(self) -> List[str]:
+        """Площадки устройств пула в порядке добавления"""
+        return list(dict.fromkeys(slot.venue for slot in self.slots.values()))
+
+    def _pick(self, serial: Optional[str], venue: Optional[str] = None) -> Optional[DeviceSlot]:
+        if serial is not None:
+            if serial not in self.slots:
+                raise NoDeviceAvailable(f"устройство {serial} не в пуле")
+            candidates = [self.slots[serial]]
+        else:
+            candidates = [slot for slot in self.slots.values() if slot.state in ('device', 'unknown')
+                          and (venue is None or slot.venue == venue)]
+            if not candidates:
+                raise NoDeviceAvailable(f"нет подключённых устройств площадки {venue}" if venue is not None
+                                        else "нет подключённых устройств")
+        free = [slot for slot in candidates if not slot.busy]
+        if not free:
+            return None
+        # Сначала исправные, среди них прогретые (экран мест уже открыт) и быстрые;
+        # устройство на паузе - только если других нет
+        return min(free, key=lambda slot: (not slot.healthy, -slot.prewarmed_at, slot.latency() or 0.0))
+
+    @asynccontextmanager
+    async def lease(self, serial: Optional[str] = None, venue: Optional[str] = None):
+        """Выдаёт устройство на время блока; длительность и исход блока идут в статистику"""
+        async with self._cond:
+            while True:
+                slot = self._pick(serial, venue)
+                if slot is not None:
+                    break
+                await self._cond.wait()
+            slot.busy = True
+            slot._failed = False
+        started = time.perf_counter()
+        error = None
+        try:
+            yield slot
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            raise
+        finally:
+            if error is None and slot._failed:
+                error = slot.last_error
+            slot._record(time.perf_counter() - started, error)
+            async with self._cond:
+                slot.busy = False
+                self._cond.notify_all()
+
+    async def run(self, job: Callable[[DeviceSlot], Any], serial: Optional[str] = None,
+                  venue: Optional[str] = None) -> Any:
+        """Выполняет блокирующий job(slot) в потоке на выданном устройстве"""
+        async with self.lease(serial, venue) as slot:
+            return await asyncio.to_thread(job, slot)
+
+    async def map(self, job: Callable[[DeviceSlot], Any], serials: Optional[List[str]] = None,
+                  venues: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Параллельно выполняет job: по одному устройству на каждую площадку из venues
+        ({площадка: результат или исключение}) или на каждом устройстве из serials
+        ({серийный номер: результат или исключение}; по умолчанию - все исправные)
+        """
+        if venues is not None:
+            results = await asyncio.gather(*(self.run(job, venue=venue) for venue in venues), return_exceptions=True)
+            return dict(zip(venues, results))
+        if serials is None:
+            serials = [serial for serial, slot in self.slots.items() if slot.healthy]
+        results = await asyncio.gather(*(self.run(job, serial) for serial in serials), return_exceptions=True)
+        return dict(zip(serials, results))
+
+    # ---------- кэш и статистика ----------
+    def latest_status(self, venue: Optional[str] = None) -> Optional[Tuple[dict, float]]:
+        """Самый свежий успешный статус среди устройств площадки venue (None - всех): (статус, время) или None"""
+        cached = [slot for slot in self.slots.values() if slot.last_status is not None
+                  and (venue is None or slot.venue == venue)]
+        if not cached:
+            return None
+        slot = max(cached, key=lambda s: s.last_status_time)
+        return slot.last_status, slot.last_status_time
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [slot.stats() for slot in self.slots.values()]
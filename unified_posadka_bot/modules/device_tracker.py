@@ -0,0 +1,195 @@
+"""
+Отслеживание подключения устройств по потоку track-devices вместо `adb devices` перед каждым действием
+
+Один и тот же файл в двух пакетах (modules/device_tracker.py объединённого бота и
+truegamers_monitor/device_tracker.py): пакеты разворачиваются по отдельности, поэтому
+копия намеренная - правки вносятся в обе (tests/test_shared_modules.py)
+"""
+import asyncio
+import logging
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def parse_devices(text: str) -> List[Tuple[str, str]]:
+    """Список (серийный номер, состояние) из вывода track-devices / devices"""
+    return [tuple(line.split('\t', 1)) for line in text.splitlines() if '\t' in line]
+
+
+class TrackDevicesProcess:
+    """Поток `adb track-devices`: при каждом изменении adb печатает весь список устройств
+    в том же формате, что и сервис host:track-devices (4 hex цифры длины + текст).
+    """
+
+    def __init__(self, adb_path: str = 'adb'):
+        self.proc = subprocess.Popen(
+            [adb_path, 'track-devices'],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def _read(self, size: int) -> Optional[bytes]:
+        data = b''
+        while len(data) < size:
+            chunk = self.proc.stdout.read(size - len(data))
+            if not chunk:
+                return None
+            data += chunk
+        return data
+
+    def __iter__(self) -> Iterator[List[Tuple[str, str]]]:
+        while True:
+            header = self._read(4)
+            if header is None:
+                return
+            try:
+                size = int(header, 16)
+            except ValueError:
+                return
+            data = self._read(size) if size else b''
+            if data is None:
+                return
+            yield parse_devices(data.decode('utf-8', errors='replace'))
+
+    def close(self) -> None:
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        self.proc.stdout.close()
+
+
+class DeviceTracker:
+    """Таблица состояний устройств, которую обновляет фоновый поток.
+
+    Основной источник - поток track-devices (open_stream): adb сервер сам
+    сообщает о каждом подключении и отключении. Пока поток недоступен,
+    таблица обновляется дешёвыми периодическими проверками probe()
+    (`adb devices`) раз в poll_interval секунд. Проверки состояния -
+    чтение словаря, без процессов и сети.
+
+    Слушатели listener(serial, old, new) вызываются при каждом изменении
+    состояния ('' - устройства нет в списке). Корутины выполняются в
+    event loop, переданном в start().
+    """
+
+    def __init__(self, open_stream: Callable[[], object], probe: Callable[[], List[Tuple[str, str]]],
+                 poll_interval: float = 5.0):
+        self.open_stream = open_stream
+        self.probe = probe
+        self.poll_interval = poll_interval
+        self.states: Dict[str, str] = {}
+        self.mode = 'stopped'  # track, poll или stopped
+        self.updated_at = 0.0
+        self.changes = 0
+        self._listeners: List[Callable] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._ready = threading.Event()
+        self._stream = None
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- состояние ----------
+    @property
+    def running(self) -> bool:
+        """Поток работает и таблица уже заполнена"""
+        return self._thread is not None and self._thread.is_alive() and self._ready.is_set()
+
+    def state(self, serial: str = '') -> str:
+        """Состояние устройства; без серийного номера - первого подключённого ('' - нет)"""
+        states = self.states
+        if serial:
+            return states.get(serial, '')
+        return 'device' if 'device' in states.values() else next(iter(states.values()), '')
+
+    def is_online(self, serial: str = '') -> bool:
+        return self.state(serial) == 'device'
+
+    def snapshot(self) -> List[Tuple[str, str]]:
+        return list(self.states.items())
+
+    def add_listener(self, listener: Callable) -> None:
+        self._listeners.append(listener)
+
+    # ---------- жизненный цикл ----------
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None, wait: float = 5.0) -> None:
+        """Запускает фоновый поток; ждёт первый список устройств не дольше wait секунд"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="device-tracker", daemon=True)
+        self._thread.start()
+        self._ready.wait(wait)
+
+    def stop(self) -> None:
+        self._stop.set()
+        stream = self._stream
+        if stream is not None:
+            # Закрытие потока прерывает блокирующее чтение в фоновом потоке
+            try:
+                stream.close()
+            except Exception:
+                pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.mode = 'stopped'
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._stream = self.open_stream()
+                self.mode = 'track'
+                for devices in self._stream:
+                    self._update(devices)
+                    if self._stop.is_set():
+                        break
+            except Exception as e:
+                logger.debug("track-devices недоступен: %s", e)
+            finally:
+                stream, self._stream = self._stream, None
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+            if self._stop.is_set():
+                break
+            # Поток оборвался (adb сервер перезапущен или недоступен) - проверяем сами и пробуем снова
+            self.mode = 'poll'
+            try:
+                self._update(self.probe())
+            except Exception as e:
+                logger.warning("📱 Проверка устройств не удалась: %s", e)
+            self._stop.wait(self.poll_interval)
+
+    def _update(self, devices: List[Tuple[str, str]]) -> None:
+        new = {serial: state.strip() for serial, state in devices}
+        old, self.states = self.states, new
+        self.updated_at = time.time()
+        first = not self._ready.is_set()
+        self._ready.set()
+        if first:
+            logger.info("📱 Устройства: %s", ", ".join(f"{s} ({st})" for s, st in new.items()) or "нет")
+            return
+        for serial in sorted(set(old) | set(new)):
+            before, after = old.get(serial, ''), new.get(serial, '')
+            if before != after:
+                self.changes += 1
+                logger.info("📱 %s: %s → %s", serial, before or 'нет', after or 'нет')
+                self._notify(serial, before, after)
+
+    def _notify(self, serial: str, before: str, after: str) -> None:
+        for listener in self._listeners:
+            try:
+                if asyncio.iscoroutinefunction(listener):
+                    if self._loop is not None and not self._loop.is_closed():
+                        asyncio.run_coroutine_threadsafe(listener(serial, before, after), self._loop)
+                else:
+                    listener(serial, before, after)
+            except Exception as e:
+                logger.warning("📱 Ошибка обработчика изменения устройства: %s", e)
@@ -0,0 +1,116 @@
+"""
+Кадр экрана без PNG: сырой framebuffer из `screencap` (без -p) читается через exec-out
+прямо в массив NumPy - без сжатия на устройстве, файла на sdcard и декодирования PNG
+"""
+import io
+import struct
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+# Форматы пикселей screencap (android PixelFormat): байт на пиксель и порядок каналов
+_FORMATS = {
+    1: (4, (0, 1, 2)),  # RGBA_8888
+    2: (4, (0, 1, 2)),  # RGBX_8888
+    3: (3, (0, 1, 2)),  # RGB_888
+    5: (4, (2, 1, 0)),  # BGRA_8888
+}
+
+
+class FrameError(ValueError):
+    """Вывод screencap не разобран (не тот формат или обрезан)"""
+
+
+class Frame:
+    """Кадр экрана: pixels - массив (высота, ширина, 3) RGB uint8, возможно обрезанный и прореженный.
+
+    Координаты экрана пересчитываются в индексы массива через x0, y0 и step,
+    поэтому анализ мест работает с экранными координатами как раньше.
+    pixels - представление над байтами screencap, без копирования.
+    """
+
+    __slots__ = ('pixels', 'x0', 'y0', 'step', 'screen_size')
+
+    def __init__(self, pixels: np.ndarray, x0: int = 0, y0: int = 0, step: int = 1,
+                 screen_size: Optional[Tuple[int, int]] = None):
+        self.pixels = pixels
+        self.x0 = x0
+        self.y0 = y0
+        self.step = step
+        self.screen_size = screen_size or (pixels.shape[1] * step, pixels.shape[0] * step)
+
+    @property
+    def width(self) -> int:
+        return self.screen_size[0]
+
+    @property
+    def height(self) -> int:
+        return self.screen_size[1]
+
+    def contains(self, x: int, y: int) -> bool:
+        """Точка экрана попадает в кадр (с учётом обрезки)"""
+        row, col = (y - self.y0) // self.step, (x - self.x0) // self.step
+        return 0 <= row < self.pixels.shape[0] and 0 <= col < self.pixels.shape[1]
+
+    def patch(self, x: int, y: int, radius: int) -> np.ndarray:
+        """Область (2*radius+1)² пикселей экрана вокруг точки, обрезанная по краям кадра"""
+        r = max(radius // self.step, 0)
+        row, col = (y - self.y0) // self.step, (x - self.x0) // self.step
+        return self.pixels[max(0, row - r):max(0, row + r + 1), max(0, col - r):max(0, col + r + 1)]
+
+    def to_png(self) -> bytes:
+        """PNG кадра - только для отладки, сжатие выполняется здесь, а не на устройстве"""
+        from PIL import Image
+        out = io.BytesIO()
+        Image.fromarray(np.ascontiguousarray(self.pixels)).save(out, format='PNG')
+        return out.getvalue()
+
+    def save_png(self, path: str) -> None:
+        with open(path, 'wb') as f:
+            f.write(self.to_png())
+
+
+def parse_screencap(raw: bytes, region: Optional[Sequence[int]] = None, step: int = 1) -> Frame:
+    """Кадр из вывода `screencap` без -p.
+
+    Заголовок - ширина, высота, формат (и color space с Android 8: 16 байт
+    вместо 12). region=[x1, y1, x2, y2] обрезает кадр, step > 1 берёт
+    каждый step-й пиксель по обеим осям; и то и другое - срезы без копирования.
+    """
+    if len(raw) < 12:
+        raise FrameError(f"вывод screencap слишком короткий ({len(raw)} байт)")
+    width, height, pixel_format = struct.unpack_from('<III', raw)
+    if pixel_format not in _FORMATS:
+        raise FrameError(f"формат пикселей {pixel_format} не поддерживается")
+    bpp, channels = _FORMATS[pixel_format]
+    size = width * height * bpp
+    header = len(raw) - size
+    if header not in (12, 16):
+        raise FrameError(f"размер {len(raw)} байт не совпадает с кадром {width}x{height}")
+    pixels = np.frombuffer(raw, dtype=np.uint8, count=size, offset=header).reshape(height, width, bpp)
+    x0 = y0 = 0
+    if region is not None:
+        x1, y1, x2, y2 = (int(v) for v in region)
+        x0, y0 = max(0, x1), max(0, y1)
+        pixels = pixels[y0:max(y0, min(height, y2)), x0:max(x0, min(width, x2))]
+    step = max(1, int(step))
+    if step > 1:
+        pixels = pixels[::step, ::step]
+    if channels == (0, 1, 2):
+        pixels = pixels[..., :3]
+    else:
+        pixels = pixels[..., list(channels)]  # BGRA: каналы переставляются с копированием
+    return Frame(pixels, x0, y0, step, (width, height))
+
+
+def frames_differ(a: Frame, b: Frame, skip_top: int = 0, step: int = 8, level: int = 40, min_pixels: int = 20) -> bool:
+    """Кадры заметно различаются: не меньше min_pixels точек (через каждые step пикселей)
+    с разницей каналов больше level. Полоса экрана выше skip_top (строка состояния с часами)
+    не сравнивается; кадры разного размера или обрезки считаются разными."""
+    if a.pixels.shape != b.pixels.shape or (a.x0, a.y0, a.step) != (b.x0, b.y0, b.step):
+        return True
+    top = max(0, skip_top - a.y0) // a.step
+    stride = max(1, step // a.step)
+    pa = a.pixels[top::stride, ::stride].astype(np.int16)
+    pb = b.pixels[top::stride, ::stride].astype(np.int16)
+    return int((np.abs(pa - pb).max(axis=2) > level).sum()) >= min_pixels
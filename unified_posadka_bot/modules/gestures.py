@@ -0,0 +1,100 @@
+"""
+Сценарии ввода: последовательность жестов выполняется на устройстве одним shell скриптом
+"""
+import shlex
+from typing import Dict, List
+
+# Маркер строк с отметками времени шагов в выводе скрипта
+_MARK = "@G"
+
+# Время на устройстве: $EPOCHREALTIME (mksh, bash) или date с наносекундами
+_PRELUDE = '__ts() { echo "${EPOCHREALTIME:-$(date +%s.%N)}"; }'
+
+
+class GestureScript:
+    """Сценарий из нажатий, свайпов, долгих нажатий, клавиш, ввода текста и пауз.
+
+    Все шаги выполняются одной shell командой: паузы идут на устройстве,
+    без обмена с компьютером между шагами. После каждого шага скрипт
+    печатает код возврата и время, из которых собирается тайминг шагов.
+
+    Пример:
+        script = GestureScript().tap(265, 1075).wait(0.3).tap(625, 1075)
+        result = android.run_gestures(script)
+    """
+
+    def __init__(self):
+        self.steps: List[Dict] = []
+
+    def _add(self, action: str, command: str, duration: float = 0.0) -> 'GestureScript':
+        self.steps.append({'action': action, 'command': command, 'duration': duration})
+        return self
+
+    def tap(self, x: int, y: int) -> 'GestureScript':
+        return self._add(f"tap {x},{y}", f"input tap {int(x)} {int(y)}")
+
+    def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> 'GestureScript':
+        return self._add(f"swipe {x1},{y1}->{x2},{y2}",
+                         f"input swipe {int(x1)} {int(y1)} {int(x2)} {int(y2)} {int(duration)}",
+                         duration / 1000)
+
+    def long_press(self, x: int, y: int, duration: int = 800) -> 'GestureScript':
+        # Долгое нажатие - свайп в ту же точку
+        return self._add(f"long_press {x},{y}",
+                         f"input swipe {int(x)} {int(y)} {int(x)} {int(y)} {int(duration)}",
+                         duration / 1000)
+
+    def key(self, keycode: str) -> 'GestureScript':
+        return self._add(f"key {keycode}", f"input keyevent {shlex.quote(str(keycode))}")
+
+    def text(self, text: str) -> 'GestureScript':
+        # input text не принимает пробелы - они передаются как %s
+        return self._add("text", f"input text {shlex.quote(text.replace(' ', '%s'))}")
+
+    def wait(self, seconds: float) -> 'GestureScript':
+        return self._add(f"wait {seconds:g}s", f"sleep {seconds:g}", seconds)
+
+    def expected_duration(self) -> float:
+        """Оценка длительности: паузы и жесты плюс ~0.5 с на запуск input"""
+        return sum(step['duration'] + (0.5 if step['command'].startswith('input') else 0) for step in self.steps)
+
+    def render(self) -> str:
+        """Shell скрипт сценария"""
+        lines = [_PRELUDE, f'echo "{_MARK} 0 0 $(__ts)"']
+        for i, step in enumerate(self.steps, 1):
+            lines.append(f'{step["command"]}; echo "{_MARK} {i} $? $(__ts)"')
+        return "\n".join(lines)
+
+    def parse(self, stdout: str) -> Dict:
+        """Результат выполнения по выводу скрипта.
+
+        Возвращает {'ok', 'completed', 'total', 'steps': [{'action', 'exit_code', 'duration'}]};
+        duration - время шага на устройстве в секундах (None, если часы недоступны).
+        """
+        marks = {}
+        for line in stdout.splitlines():
+            parts = line.split()
+            if len(parts) == 4 and parts[0] == _MARK:
+                try:
+                    stamp = float(parts[3])
+                except ValueError:
+                    stamp = None
+                marks[int(parts[1])] = (int(parts[2]), stamp)
+
+        steps = []
+        previous = marks.get(0, (0, None))[1]
+        for i, step in enumerate(self.steps, 1):
+            if i not in marks:
+                break
+            exit_code, stamp = marks[i]
+            duration = stamp - previous if stamp is not None and previous is not None else None
+            steps.append({'action': step['action'], 'exit_code': exit_code, 'duration': duration})
+            previous = stamp
+
+        durations = [s['duration'] for s in steps if s['duration'] is not None]
+        return {
+            'ok': len(steps) == len(self.steps) and all(s['exit_code'] == 0 for s in steps),
+            'completed': len(steps),
+            'total': sum(durations) if durations else None,
+            'steps': steps,
+        }
@@ -0,0 +1,126 @@
+"""
+Живое табло: одно закреплённое сообщение на чат и площадку, которое правится при изменении посадки
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from telegram.error import BadRequest
+
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+def _canonical(value: Any) -> Any:
+    """Приводит состояние к виду, не зависящему от порядка элементов"""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        return sorted((_canonical(v) for v in value), key=lambda v: json.dumps(v, sort_keys=True))
+    return value
+
+
+def board_missing(error: Any) -> bool:
+    """Правка не удалась, потому что сообщения табло больше нет (удалено в чате)"""
+    return isinstance(error, BadRequest) and "message to edit not found" in str(error).lower()
+
+
+def state_hash(state: Dict[str, Any]) -> str:
+    """Хэш состояния посадки (номера занятых мест и итоги), без формирования текста"""
+    raw = json.dumps(_canonical(state), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class LiveBoard:
+    """Закреплённые сообщения с посадкой по чатам и площадкам (хранятся в JSON).
+
+    Сообщение правится только если хэш состояния изменился, поэтому частое
+    обновление табло почти не расходует запросы к Telegram.
+    """
+
+    def __init__(self, outbox, path: str):
+        self.outbox = outbox
+        self.path = path
+        self._boards: Dict[str, Dict[str, Any]] = self._load()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.edits = 0
+        self.created = 0
+        self.skipped = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning("Ошибка чтения табло %s: %s", self.path, e)
+            return {}
+
+    def _save(self) -> None:
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._boards, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning("Ошибка записи табло %s: %s", self.path, e)
+
+    @staticmethod
+    def _key(chat_id: int, venue: str) -> str:
+        return f"{chat_id}:{venue}"
+
+    async def publish(self, venue: str, state: Dict[str, Any], render: Callable[[], str],
+                      chat_ids: Iterable[int], deadline: Optional[Deadline] = None) -> int:
+        """Обновляет табло площадки во всех чатах.
+
+        render вызывается не больше одного раза и только если хотя бы одному
+        чату нужна правка. Возвращает число чатов с актуальным табло.
+        """
+        lock = self._locks.setdefault(venue, asyncio.Lock())
+        async with lock:
+            chat_ids = list(chat_ids)
+            digest = state_hash(state)
+            stale = [c for c in chat_ids if self._boards.get(self._key(c, venue), {}).get("hash") != digest]
+            current = len(chat_ids) - len(stale)
+            self.skipped += current
+            if not stale:
+                return current
+            text = render()
+            results = await asyncio.gather(*(self._update(c, venue, text, digest, deadline) for c in stale))
+            self._save()
+            return current + sum(results)
+
+    async def _update(self, chat_id: int, venue: str, text: str, digest: str, deadline: Optional[Deadline]) -> bool:
+        key = self._key(chat_id, venue)
+        board = self._boards.get(key)
+        if board:
+            edited = await self.outbox.call(
+                chat_id, "edit_message_text", deadline=deadline, return_errors=True,
+                message_id=board["message_id"], text=text, parse_mode="Markdown"
+            )
+            if edited is not None and not isinstance(edited, Exception):
+                board.update(hash=digest, updated=time.time())
+                self.edits += 1
+                return True
+            if not board_missing(edited):
+                # Сбой сети, дедлайн, нет прав: табло остаётся прежним, правка повторится при следующем обновлении
+                logger.warning("📌 Табло %s в чате %s не обновлено (%s), оставляю прежнее",
+                               venue, chat_id, edited or "дедлайн исчерпан")
+                return False
+            logger.info("📌 Табло %s в чате %s удалено, создаю новое", venue, chat_id)
+
+        message = await self.outbox.send(chat_id, text, deadline=deadline, parse_mode="Markdown")
+        if message is None:
+            return False
+        self._boards[key] = {"message_id": message.message_id, "hash": digest, "updated": time.time()}
+        self.created += 1
+        pinned = await self.outbox.call(
+            chat_id, "pin_chat_message", message_id=message.message_id, disable_notification=True
+        )
+        if pinned is None:
+            logger.warning("📌 Не удалось закрепить табло %s в чате %s (нет прав?)", venue, chat_id)
+        return True
@@ -0,0 +1,32 @@
+"""
+Блокировки ресурсов для параллельной обработки обновлений
+"""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+# Файл статистики читается и перезаписывается из обработчиков и задач планировщика
+stats_lock = threading.RLock()
+
+
+class SingleFlight:
+    """Объединяет одновременные одинаковые запросы в один.
+
+    Пока запрос с ключом key выполняется, остальные вызовы do(key, ...)
+    ждут его результат вместо повторного обращения к API.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.shared = 0
+
+    async def do(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # shield: отмена одного ожидающего не отменяет общий запрос
+        return await asyncio.shield(future)
@@ -0,0 +1,149 @@
+"""
+Навигация как конечный автомат: текущий экран определяется по дампу,
+выполняются только переходы, которые нужны из этого состояния
+"""
+import statistics
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+from .deadline import DeadlineExceeded
+
+# Состояния, которых нет среди экранов screen_states
+STOPPED = 'stopped'  # Процесс приложения не запущен
+SPLASH = 'splash'    # Приложение в фокусе, но экран ещё без элементов (заставка, загрузка)
+ERROR = 'error'      # Окно ошибки (нет соединения, повторить)
+# Запасной переход из любого состояния, когда основной не помог
+RESTART = 'restart'
+
+
+class Edge:
+    """Переход из состояния: action(timeout) -> bool, число повторов при неудаче.
+
+    assume - чем считать нераспознанные состояния после этого перехода
+    (например {'unknown': 'pin'} после запуска приложения).
+    """
+
+    __slots__ = ('name', 'action', 'timeout', 'retries', 'assume')
+
+    def __init__(self, name: str, action: Callable[[float], bool], timeout: float, retries: int = 1,
+                 assume: Optional[Dict[str, str]] = None):
+        self.name = name
+        self.action = action
+        self.timeout = timeout
+        self.retries = retries
+        self.assume = assume or {}
+
+
+class TransitionStats:
+    """Длительность переходов 'из→в' (последние window) и число неудач"""
+
+    def __init__(self, window: int = 50):
+        self.window = window
+        self._lock = threading.Lock()
+        self._times: Dict[str, deque] = {}
+        self._failures: Dict[str, int] = {}
+
+    def record(self, transition: str, ok: bool, seconds: float) -> None:
+        with self._lock:
+            self._times.setdefault(transition, deque(maxlen=self.window)).append(seconds)
+            if not ok:
+                self._failures[transition] = self._failures.get(transition, 0) + 1
+
+    def as_dict(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {name: {'count': len(times), 'median': statistics.median(times), 'max': max(times),
+                           'failures': self._failures.get(name, 0)}
+                    for name, times in self._times.items()}
+
+    def summary(self) -> str:
+        stats = self.as_dict()
+        if not stats:
+            return "переходов ещё не было"
+        return ", ".join(f"{name} {s['median']:.1f} с ×{s['count']}" + (f" (неудач {s['failures']})" if s['failures'] else "")
+                         for name, s in sorted(stats.items()))
+
+
+class NavigationResult:
+    """Итог навигации: достигнута ли цель и пройденные состояния"""
+
+    __slots__ = ('ok', 'path', 'elapsed')
+
+    def __init__(self, ok: bool, path: List[str], elapsed: float):
+        self.ok = ok
+        self.path = path
+        self.elapsed = elapsed
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def __repr__(self) -> str:
+        return f"{' → '.join(self.path)} за {self.elapsed:.1f} с{'' if self.ok else ', цель не достигнута'}"
+
+
+class Navigator:
+    """Ведёт приложение к целевому состоянию.
+
+    detect() -> состояние; edges - переход для каждого состояния, из которого
+    есть путь к цели. Переход, после которого состояние не изменилось,
+    повторяется до edge.retries раз, затем выполняется переход RESTART
+    (один раз за навигацию, счётчики повторов после него сбрасываются).
+    Каждый переход учитывается в stats под именем 'из→в'.
+    
+    После перехода с edge.assume определённое detect() состояние из ключей
+    assume заменяется значением. Предположение действует, пока detect()
+    возвращает эти состояния или заставку: неудачный переход из предполагаемого
+    состояния повторяется, как и для распознанного.
+    """
+
+    def __init__(self, detect: Callable[[], str], edges: Dict[str, Edge], stats: TransitionStats,
+                 max_steps: int = 10, log: Callable[[str], None] = print):
+        self.detect = detect
+        self.edges = edges
+        self.stats = stats
+        self.max_steps = max_steps
+        self.log = log
+
+    def run(self, target: str, state: Optional[str] = None) -> NavigationResult:
+        started = time.monotonic()
+        state = self.detect() if state is None else state
+        path = [state]
+        attempts: Dict[str, int] = {}
+        assumed: Dict[str, str] = {}
+        restarted = False
+        for _ in range(self.max_steps):
+            if state == target:
+                break
+            edge = self.edges.get(state)
+            if edge is None or attempts.get(state, 0) > edge.retries:
+                if restarted or RESTART not in self.edges:
+                    self.log(f"❌ Навигация: нет перехода из состояния '{state}'")
+                    break
+                restarted = True
+                edge = self.edges[RESTART]
+                # После перезапуска у каждого перехода снова полный запас повторов
+                attempts.clear()
+            else:
+                attempts[state] = attempts.get(state, 0) + 1
+            self.log(f"🧭 {state}: {edge.name}")
+            edge_started = time.monotonic()
+            try:
+                done = edge.action(edge.timeout)
+            except DeadlineExceeded:
+                self.stats.record(f"{state}→?", False, time.monotonic() - edge_started)
+                raise
+            detected = self.detect()
+            if edge.assume:
+                assumed = dict(edge.assume)
+            if detected not in assumed and detected != SPLASH:
+                assumed = {}
+            new_state = assumed.get(detected, detected)
+            if new_state != detected:
+                self.log(f"🧭 Состояние '{detected}' после '{edge.name}' считается '{new_state}'")
+            changed = new_state != state
+            self.stats.record(f"{state}→{new_state}", bool(done) and changed, time.monotonic() - edge_started)
+            if changed:
+                path.append(new_state)
+            state = new_state
+        return NavigationResult(state == target, path, time.monotonic() - started)
@@ -0,0 +1,261 @@
+"""
+Очередь исходящих сообщений Telegram: рассылка по подписанным чатам с учётом лимитов
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter, TimedOut
+
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriberStore:
+    """Список чатов, получающих отчёты (хранится в JSON)"""
+
+    def __init__(self, path: str, initial: Iterable[int] = ()):
+        self.path = path
+        self._lock = threading.Lock()
+        self._chats = set(int(c) for c in initial if c)
+        self._chats.update(self._load())
+
+    def _load(self) -> List[int]:
+        if not os.path.exists(self.path):
+            return []
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return [int(c) for c in json.load(f)]
+        except Exception as e:
+            logger.warning("Ошибка чтения подписчиков %s: %s", self.path, e)
+            return []
+
+    def _save(self) -> None:
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(sorted(self._chats), f)
+        except Exception as e:
+            logger.warning("Ошибка записи подписчиков %s: %s", self.path, e)
+
+    def add(self, chat_id: int) -> bool:
+        with self._lock:
+            if chat_id in self._chats:
+                return False
+            self._chats.add(chat_id)
+            self._save()
+            return True
+
+    def remove(self, chat_id: int) -> bool:
+        with self._lock:
+            if chat_id not in self._chats:
+                return False
+            self._chats.discard(chat_id)
+            self._save()
+            return True
+
+    def all(self) -> List[int]:
+        with self._lock:
+            return sorted(self._chats)
+
+
+class _Job:
+    __slots__ = ("chat_id", "method", "kwargs", "future", "enqueued", "expires_at", "attempt", "return_errors")
+
+    def __init__(self, chat_id: int, method: str, kwargs: Dict[str, Any], expires_at: Optional[float],
+                 return_errors: bool = False):
+        self.chat_id = chat_id
+        self.method = method
+        self.kwargs = kwargs
+        self.return_errors = return_errors
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued = time.monotonic()
+        self.expires_at = expires_at
+        self.attempt = 0
+
+
+class Outbox:
+    """Очередь исходящих сообщений с ограниченным параллелизмом.
+
+    Соблюдает глобальный лимит (сообщений в секунду на бота), интервал между
+    сообщениями в один чат (для групп — больше) и паузы RetryAfter от Telegram.
+    Сообщения в один чат отправляются в порядке постановки в очередь.
+    """
+
+    def __init__(self, bot, concurrency: int = 4, global_rate: float = 25.0,
+                 chat_interval: float = 1.0, group_interval: float = 3.0, max_retries: int = 3):
+        self.bot = bot
+        self.concurrency = concurrency
+        self.global_interval = 1.0 / global_rate
+        self.chat_interval = chat_interval
+        self.group_interval = group_interval
+        self.max_retries = max_retries
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._chat_locks: Dict[int, asyncio.Lock] = {}
+        self._chat_next: Dict[int, float] = {}
+        self._global_next = 0.0
+        self._global_lock: Optional[asyncio.Lock] = None
+        self._paused_until = 0.0
+        self._latencies = deque(maxlen=200)
+        self.in_flight = 0
+        self.sent = 0
+        self.failed = 0
+        self.expired = 0
+        self.retry_after = 0
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._global_lock = asyncio.Lock()
+        self._workers = [asyncio.create_task(self._worker(), name=f"outbox-{i}") for i in range(self.concurrency)]
+        logger.info("📮 Очередь исходящих запущена (%s воркеров)", self.concurrency)
+
+    async def stop(self, drain_timeout: float = 10.0) -> None:
+        """Дожидается отправки очереди (не дольше drain_timeout) и останавливает воркеров"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("📮 Очередь не успела опустеть: %s сообщений отброшено", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def _enqueue(self, chat_id: int, method: str, kwargs: Dict[str, Any], deadline: Optional[Deadline],
+                 return_errors: bool = False) -> _Job:
+        job = _Job(chat_id, method, kwargs, deadline.expires_at if deadline else None, return_errors)
+        self._queue.put_nowait(job)
+        return job
+
+    async def send(self, chat_id: int, text: str, deadline: Optional[Deadline] = None, **kwargs) -> Any:
+        """Ставит сообщение в очередь и ждёт отправки; возвращает Message или None при ошибке"""
+        job = self._enqueue(chat_id, "send_message", dict(text=text, **kwargs), deadline)
+        return await job.future
+
+    async def broadcast(self, chat_ids: Iterable[int], text: str, deadline: Optional[Deadline] = None,
+                        **kwargs) -> Dict[int, Any]:
+        """Рассылает один и тот же (уже сформированный) текст во все чаты.
+
+        Возвращает {chat_id: Message или None}; None - сообщение не доставлено.
+        """
+        jobs = [self._enqueue(chat_id, "send_message", dict(text=text, **kwargs), deadline) for chat_id in chat_ids]
+        results = await asyncio.gather(*(job.future for job in jobs))
+        return {job.chat_id: result for job, result in zip(jobs, results)}
+
+    async def call(self, chat_id: int, method: str, deadline: Optional[Deadline] = None,
+                   return_errors: bool = False, **kwargs) -> Any:
+        """Любой метод бота (edit_message_text, pin_chat_message, ...) через общие лимиты.
+
+        Ошибка Telegram - None; с return_errors=True - само исключение (BadRequest, Forbidden, ...),
+        чтобы вызывающий мог отличить, например, удалённое сообщение от сбоя сети.
+        """
+        job = self._enqueue(chat_id, method, dict(chat_id=chat_id, **kwargs), deadline, return_errors)
+        return await job.future
+
+    async def _wait_slot(self, chat_id: int) -> None:
+        loop = asyncio.get_running_loop()
+        # Пауза после RetryAfter и интервал для конкретного чата
+        delay = max(self._paused_until, self._chat_next.get(chat_id, 0.0)) - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Глобальный лимит: равномерно распределяем отправки
+        async with self._global_lock:
+            delay = self._global_next - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._global_next = max(loop.time(), self._global_next) + self.global_interval
+
+    async def _deliver(self, job: _Job) -> Any:
+        loop = asyncio.get_running_loop()
+        kwargs = dict(job.kwargs)
+        if job.method == "send_message":
+            kwargs["chat_id"] = job.chat_id
+        while True:
+            if job.expires_at is not None and time.monotonic() >= job.expires_at:
+                self.expired += 1
+                logger.warning("⏱ Сообщение в чат %s отброшено: дедлайн отчёта исчерпан", job.chat_id)
+                return None
+            await self._wait_slot(job.chat_id)
+            job.attempt += 1
+            try:
+                result = await getattr(self.bot, job.method)(**kwargs)
+                interval = self.group_interval if job.chat_id < 0 else self.chat_interval
+                self._chat_next[job.chat_id] = loop.time() + interval
+                self.sent += 1
+                return result
+            except RetryAfter as e:
+                self.retry_after += 1
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else float(e.retry_after)
+                logger.warning("🚦 Flood control: пауза %.0f с (чат %s)", retry_after, job.chat_id)
+                self._paused_until = max(self._paused_until, loop.time() + retry_after)
+            except (BadRequest, Forbidden):
+                # BadRequest наследует NetworkError, но повтор не поможет
+                raise
+            except (TimedOut, NetworkError) as e:
+                if job.attempt >= self.max_retries:
+                    raise
+                logger.warning("Ошибка сети при отправке в чат %s (попытка %s/%s): %s",
+                               job.chat_id, job.attempt, self.max_retries, e)
+                await asyncio.sleep(job.attempt)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            lock = self._chat_locks.setdefault(job.chat_id, asyncio.Lock())
+            self.in_flight += 1
+            try:
+                async with lock:
+                    result = await self._deliver(job)
+                self._latencies.append(time.monotonic() - job.enqueued)
+                if not job.future.done():
+                    job.future.set_result(result)
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    # Правка без изменений текста - сообщение уже актуально
+                    self.sent += 1
+                    result = True
+                else:
+                    self.failed += 1
+                    logger.error("❌ Сообщение в чат %s не доставлено: %s", job.chat_id, e)
+                    result = e if job.return_errors else None
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Forbidden as e:
+                self.failed += 1
+                logger.error("❌ Сообщение в чат %s не доставлено: %s", job.chat_id, e)
+                if not job.future.done():
+                    job.future.set_result(e if job.return_errors else None)
+            except Exception as e:
+                self.failed += 1
+                logger.exception("❌ Ошибка отправки в чат %s: %s", job.chat_id, e)
+                if not job.future.done():
+                    job.future.set_result(e if job.return_errors else None)
+            finally:
+                self.in_flight -= 1
+                self._queue.task_done()
+
+    def metrics(self) -> Dict[str, Any]:
+        latencies = sorted(self._latencies)
+
+        def quantile(q: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+        return {
+            "depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self.in_flight,
+            "sent": self.sent,
+            "failed": self.failed,
+            "expired": self.expired,
+            "retry_after": self.retry_after,
+            "latency_p50": quantile(0.5),
+            "latency_p95": quantile(0.95),
+        }
@@ -0,0 +1,107 @@
+"""
+Известные состояния экрана TrueGamers по структурным отпечаткам UITree.fingerprint():
+какой экран открыт - одна проверка по словарю вместо поиска текстов в дампе
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Метки состояний
+LAUNCHER = 'launcher'  # Приложение не на переднем плане (рабочий стол или другое приложение)
+PIN = 'pin'            # Клавиатура PIN
+HOME = 'home'          # Главный экран с кнопкой 'Места'
+PLACES = 'places'      # Схема мест
+UNKNOWN = 'unknown'
+# Отпечаток встретился на разных экранах: по нему экран не определить, нужна проверка по тексту
+AMBIGUOUS = 'ambiguous'
+
+
+class ScreenStates:
+    """Отпечатки экранов с метками, сохраняются в JSON.
+
+    Запись: {fingerprint: {'label': ..., 'app_version': ..., 'first_seen': ...}}.
+    Отпечаток получает метку после того, как сценарий подтвердил экран
+    (learn), дальше экран узнаётся по словарю (label). Новый отпечаток у уже
+    известной метки - значит, изменилась вёрстка экрана (обновление
+    приложения): об этом пишется предупреждение, старые варианты остаются
+    до forget(). Отпечаток, подтверждённый на разных экранах, помечается
+    AMBIGUOUS и больше не используется для определения экрана.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self._load()
+
+    def _load(self) -> Dict[str, Dict]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {k: v for k, v in data.items() if isinstance(v, dict) and v.get('label')}
+        except Exception as e:
+            logger.warning("Ошибка чтения состояний экрана %s: %s", self.path, e)
+            return {}
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning("Ошибка записи состояний экрана %s: %s", self.path, e)
+
+    def label(self, fingerprint: str) -> Optional[str]:
+        """Метка известного отпечатка (None - экран не встречался или отпечаток неоднозначен)"""
+        entry = self._entries.get(fingerprint)
+        return entry['label'] if entry and entry['label'] != AMBIGUOUS else None
+
+    def fingerprints(self, label: str) -> List[str]:
+        with self._lock:
+            return [fp for fp, entry in self._entries.items() if entry['label'] == label]
+
+    def learn(self, fingerprint: str, label: str, app_version: str = '') -> None:
+        """Запоминает отпечаток экрана, подтверждённого сценарием навигации"""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry and entry['label'] in (label, AMBIGUOUS):
+                return
+            if entry:
+                previous, entry['label'] = entry['label'], AMBIGUOUS
+            else:
+                previous = None
+                variants = [e.get('app_version', '') for e in self._entries.values() if e['label'] == label]
+                self._entries[fingerprint] = {'label': label, 'app_version': app_version or '',
+                                              'first_seen': time.time()}
+            self._save()
+        if previous:
+            logger.warning("🧩 Отпечаток %s встретился на экранах '%s' и '%s' - экраны различаются по тексту",
+                           fingerprint, previous, label)
+        elif variants:
+            logger.warning("🧩 Экран '%s' изменил структуру (версия приложения %s, прежние: %s) - "
+                           "возможно, приложение обновилось", label, app_version or '?',
+                           ', '.join(sorted(set(v or '?' for v in variants))))
+        else:
+            logger.info("🧩 Экран '%s' запомнен: %s", label, fingerprint)
+
+    def forget(self, fingerprint: str) -> None:
+        with self._lock:
+            if self._entries.pop(fingerprint, None) is None:
+                return
+            self._save()
+        logger.info("🧩 Отпечаток экрана %s забыт", fingerprint)
+
+    def summary(self) -> Dict[str, int]:
+        """Число известных вариантов каждого экрана"""
+        counts: Dict[str, int] = {}
+        with self._lock:
+            for entry in self._entries.values():
+                counts[entry['label']] = counts.get(entry['label'], 0) + 1
+        return counts
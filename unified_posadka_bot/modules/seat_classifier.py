@@ -0,0 +1,106 @@
+"""
+Статус мест по одному кадру: все пробы фона всех мест собираются индексированием массива,
+яркость и насыщенность считаются несколькими операциями NumPy вместо цикла по местам
+"""
+import warnings
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .framebuffer import Frame
+
+# Точки фона вокруг центра места (края, а не центр с номером) и радиус пробы 7x7
+SAMPLE_OFFSETS = np.array([(-12, -12), (12, -12), (-12, 12), (12, 12),
+                           (-15, 0), (15, 0), (0, -15), (0, 15)], dtype=np.int64)
+PATCH_RADIUS = 3
+
+# Пороги: занято - серый фон (темнее OCCUPIED_BRIGHTNESS и разница каналов меньше OCCUPIED_DIFF)
+# или очень тёмный (темнее DARK_BRIGHTNESS); всё остальное - свободно (белый или цветной фон)
+OCCUPIED_BRIGHTNESS = 155.0
+OCCUPIED_DIFF = 32.0
+DARK_BRIGHTNESS = 110.0
+# Запас до порога (в единицах яркости), при котором уверенность по порогу полная
+CONFIDENT_MARGIN = 20.0
+
+
+def patch_means(frame: Frame, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Средний цвет проб 7x7 в точках экрана points (..., 2): (..., 3) и маска точек, попавших в кадр (...).
+
+    Проба у края кадра обрезается, как срез массива, - среднее по попавшим пикселям.
+    """
+    points = np.asarray(points, dtype=np.int64)
+    height, width = frame.pixels.shape[:2]
+    cols = (points[..., 0] - frame.x0) // frame.step
+    rows = (points[..., 1] - frame.y0) // frame.step
+    valid = (rows >= 0) & (rows < height) & (cols >= 0) & (cols < width)
+
+    radius = max(PATCH_RADIUS // frame.step, 0)
+    delta = np.arange(-radius, radius + 1)
+    patch_rows = rows[..., None, None] + delta[:, None]  # (..., k, 1)
+    patch_cols = cols[..., None, None] + delta[None, :]  # (..., 1, k)
+    inside = ((patch_rows >= 0) & (patch_rows < height)) & ((patch_cols >= 0) & (patch_cols < width))
+    pixels = frame.pixels[np.clip(patch_rows, 0, height - 1), np.clip(patch_cols, 0, width - 1)]  # (..., k, k, 3)
+    weight = inside[..., None].astype(np.float64)
+    count = np.maximum(weight.sum(axis=(-3, -2)), 1.0)
+    means = (pixels * weight).sum(axis=(-3, -2)) / count
+    return means, valid & inside.any(axis=(-2, -1))
+
+
+def sample_means(frame: Frame, centers: Sequence[Tuple[int, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Средний цвет проб фона: (мест, 8, 3) и маска проб, чья точка попала в кадр (мест, 8)"""
+    points = np.asarray(centers, dtype=np.int64).reshape(-1, 1, 2) + SAMPLE_OFFSETS  # (n, 8, 2)
+    return patch_means(frame, points)
+
+
+def _margin(brightness: np.ndarray, diff: np.ndarray, occupied: np.ndarray) -> np.ndarray:
+    """Расстояние до границы решения (занято/свободно) по яркости и разнице каналов"""
+    inside = np.minimum(OCCUPIED_BRIGHTNESS - brightness, np.maximum(OCCUPIED_DIFF - diff, DARK_BRIGHTNESS - brightness))
+    outside = np.minimum(np.maximum(brightness - OCCUPIED_BRIGHTNESS, diff - OCCUPIED_DIFF), brightness - DARK_BRIGHTNESS)
+    return np.where(occupied, inside, outside)
+
+
+def _is_occupied(brightness: np.ndarray, diff: np.ndarray) -> np.ndarray:
+    return (brightness < OCCUPIED_BRIGHTNESS) & ((diff < OCCUPIED_DIFF) | (brightness < DARK_BRIGHTNESS))
+
+
+def classify_seats(frame: Frame, centers: Sequence[Tuple[int, int]]) -> List[Dict]:
+    """Статус каждого места: {'status', 'confidence', 'brightness', 'color_diff'}.
+
+    status - 'occupied', 'free' или 'unknown' (ни одна проба не попала в кадр).
+    Яркость и разница каналов - 0.6 * медиана + 0.4 * среднее по пробам.
+    confidence (0..1) - половина за запас до порога, половина за долю проб,
+    которые по отдельности дают тот же статус.
+    """
+    if len(centers) == 0:
+        return []
+    means, valid = sample_means(frame, centers)
+    brightness = means.mean(axis=2)
+    diff = means.max(axis=2) - means.min(axis=2)
+    brightness[~valid] = np.nan
+    diff[~valid] = np.nan
+    # Центр места вне кадра - статус не определяется, даже если часть проб попала в кадр
+    known = valid.any(axis=1) & np.array([frame.contains(x, y) for x, y in centers])
+
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        # Места без проб дают NaN (пустой срез) - они помечаются unknown
+        warnings.simplefilter('ignore', RuntimeWarning)
+        final_brightness = np.nanmedian(brightness, axis=1) * 0.6 + np.nanmean(brightness, axis=1) * 0.4
+        final_diff = np.nanmedian(diff, axis=1) * 0.6 + np.nanmean(diff, axis=1) * 0.4
+        occupied = _is_occupied(final_brightness, final_diff)
+        margin = _margin(final_brightness, final_diff, occupied)
+        per_sample = _is_occupied(brightness, diff)
+        agreement = np.where(valid, per_sample == occupied[:, None], False).sum(axis=1) / np.maximum(valid.sum(axis=1), 1)
+        confidence = 0.5 * np.clip(margin / CONFIDENT_MARGIN, 0.0, 1.0) + 0.5 * agreement
+
+    results = []
+    for i in range(len(centers)):
+        if not known[i]:
+            results.append({'status': 'unknown', 'confidence': 0.0, 'brightness': None, 'color_diff': None})
+            continue
+        results.append({
+            'status': 'occupied' if occupied[i] else 'free',
+            'confidence': round(float(confidence[i]), 2),
+            'brightness': round(float(final_brightness[i]), 1),
+            'color_diff': round(float(final_diff[i]), 1),
+        })
+    return results
@@ -0,0 +1,149 @@
+"""
+Раскладка мест на схеме: номер, тип, центр и размер каждого места, найденные по UI dump,
+запоминаются по отпечатку экрана и разрешению - повторный захват обходится кадром
+и пакетной классификацией, без дампа и поиска мест
+"""
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .framebuffer import Frame
+from .seat_classifier import patch_means
+
+# Опорные точки фона схемы: на ANCHOR_GAP пикселей снаружи от краёв мест, не больше MAX_ANCHORS
+ANCHOR_GAP = 12
+MAX_ANCHORS = 24
+# Точка совпала, если каналы отличаются от запомненных не больше чем на ANCHOR_TOLERANCE;
+# раскладка не подтверждена, если не совпала больше чем ANCHOR_MISMATCH доля точек
+ANCHOR_TOLERANCE = 24.0
+ANCHOR_MISMATCH = 0.25
+# Доля мест с уверенностью ниже 0.5, при которой места ищутся заново
+LOW_CONFIDENCE_SHARE = 0.3
+
+
+def layout_key(fingerprint: str, screen_size: Tuple[int, int]) -> str:
+    """Ключ раскладки: отпечаток экрана мест и разрешение (например 'a1b2c3...@1440x2560')"""
+    return f"{fingerprint}@{screen_size[0]}x{screen_size[1]}"
+
+
+def _boxes(places: Sequence[Dict]) -> np.ndarray:
+    """Прямоугольники мест (x1, y1, x2, y2) по центру и размеру"""
+    return np.array([(cx - w // 2, cy - h // 2, cx + w // 2, cy + h // 2)
+                     for (cx, cy), (w, h) in ((p['center'], p['size']) for p in places)], dtype=np.int64).reshape(-1, 4)
+
+
+def anchor_points(frame: Frame, places: Sequence[Dict]) -> np.ndarray:
+    """Точки фона вокруг мест (сверху, снизу, слева, справа), которые попали в кадр и не лежат на других местах"""
+    boxes = _boxes(places)
+    if not len(boxes):
+        return np.empty((0, 2), dtype=np.int64)
+    cx, cy = (boxes[:, 0] + boxes[:, 2]) // 2, (boxes[:, 1] + boxes[:, 3]) // 2
+    points = np.concatenate([np.stack([cx, boxes[:, 1] - ANCHOR_GAP], axis=1),
+                             np.stack([cx, boxes[:, 3] + ANCHOR_GAP], axis=1),
+                             np.stack([boxes[:, 0] - ANCHOR_GAP, cy], axis=1),
+                             np.stack([boxes[:, 2] + ANCHOR_GAP, cy], axis=1)])
+    pad = 4
+    on_seat = ((points[:, None, 0] >= boxes[None, :, 0] - pad) & (points[:, None, 0] <= boxes[None, :, 2] + pad) &
+               (points[:, None, 1] >= boxes[None, :, 1] - pad) & (points[:, None, 1] <= boxes[None, :, 3] + pad)).any(axis=1)
+    points = np.unique(points[~on_seat], axis=0)
+    points = points[[frame.contains(int(x), int(y)) for x, y in points]] if len(points) else points
+    if len(points) > MAX_ANCHORS:
+        points = points[np.linspace(0, len(points) - 1, MAX_ANCHORS).astype(int)]
+    return points
+
+
+class SeatLayout:
+    """Места одного экрана схемы и цвет фона в опорных точках на момент поиска"""
+
+    __slots__ = ('key', 'places', 'anchors', 'anchor_colors', 'created_at')
+
+    def __init__(self, key: str, places: List[Dict], anchors: np.ndarray, anchor_colors: np.ndarray):
+        self.key = key
+        self.places = places
+        self.anchors = anchors
+        self.anchor_colors = anchor_colors
+        self.created_at = time.time()
+
+    @classmethod
+    def from_frame(cls, key: str, places: List[Dict], frame: Frame) -> 'SeatLayout':
+        anchors = anchor_points(frame, places)
+        colors, valid = patch_means(frame, anchors) if len(anchors) else (np.empty((0, 3)), np.empty(0, dtype=bool))
+        return cls(key, places, anchors[valid], colors[valid])
+
+    @property
+    def centers(self) -> List[Tuple[int, int]]:
+        return [tuple(p['center']) for p in self.places]
+
+    @property
+    def screen_size(self) -> Tuple[int, int]:
+        width, height = self.key.rsplit('@', 1)[1].split('x')
+        return int(width), int(height)
+
+    def check(self, frame: Frame, verdicts: Sequence[Dict]) -> Optional[str]:
+        """Почему раскладка не подходит к кадру (None - подходит).
+
+        Проверки дешёвые и без дампа: разрешение кадра, все места в кадре,
+        фон схемы в опорных точках (прокрутка, окно поверх схемы, другой экран)
+        и доля мест с низкой уверенностью классификации.
+        """
+        if tuple(frame.screen_size) != self.screen_size:
+            return f"разрешение {frame.width}x{frame.height}"
+        unknown = sum(1 for v in verdicts if v['status'] == 'unknown')
+        if unknown:
+            return f"мест вне кадра: {unknown}"
+        if len(self.anchors):
+            colors, valid = patch_means(frame, self.anchors)
+            mismatch = ~valid | (np.abs(colors - self.anchor_colors).max(axis=1) > ANCHOR_TOLERANCE)
+            if mismatch.mean() > ANCHOR_MISMATCH:
+                return f"фон схемы изменился ({int(mismatch.sum())} из {len(mismatch)} точек)"
+        low = sum(1 for v in verdicts if v['confidence'] < 0.5)
+        if verdicts and low / len(verdicts) > LOW_CONFIDENCE_SHARE:
+            return f"низкая уверенность у {low} из {len(verdicts)} мест"
+        return None
+
+
+class SeatLayoutCache:
+    """Раскладки мест по ключам layout_key() в памяти, общие для устройств.
+
+    Раскладка старше max_age секунд не используется - места ищутся заново
+    по дампу; max_age = 0 отключает кэш.
+    """
+
+    def __init__(self, max_age: float):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._layouts: Dict[str, SeatLayout] = {}
+        self.stats = {'hits': 0, 'scans': 0, 'rejected': 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age > 0
+
+    def get(self, key: str) -> Optional[SeatLayout]:
+        with self._lock:
+            layout = self._layouts.get(key)
+            if layout is not None and time.time() - layout.created_at >= self.max_age:
+                del self._layouts[key]
+                layout = None
+            return layout
+
+    def put(self, layout: SeatLayout) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._layouts[layout.key] = layout
+
+    def forget(self, key: str) -> None:
+        with self._lock:
+            self._layouts.pop(key, None)
+
+    def count(self, event: str) -> None:
+        with self._lock:
+            self.stats[event] += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            return (f"из кэша {self.stats['hits']}, поиск по дампу {self.stats['scans']}, "
+                    f"не подтвердилось {self.stats['rejected']}")
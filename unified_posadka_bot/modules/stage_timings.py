@@ -0,0 +1,62 @@
+"""
+История длительностей этапов конвейера отчётов (для подбора времени прогрева)
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional
+
+from .deadline import Deadline
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimings:
+    """Хранит последние замеры длительности этапов и сохраняет их в JSON"""
+
+    def __init__(self, path: str, max_samples: int = 48):
+        self.path = path
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = self._load()
+
+    def _load(self) -> Dict[str, List[float]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {k: [float(x) for x in v] for k, v in data.items() if isinstance(v, list)}
+        except Exception as e:
+            logger.warning("Ошибка чтения истории этапов %s: %s", self.path, e)
+            return {}
+
+    def _save(self) -> None:
+        try:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self._samples, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logger.warning("Ошибка записи истории этапов %s: %s", self.path, e)
+
+    def record(self, stage: str, duration: float) -> None:
+        """Добавляет замер этапа"""
+        with self._lock:
+            samples = self._samples.setdefault(stage, [])
+            samples.append(round(duration, 3))
+            del samples[:-self.max_samples]
+            self._save()
+
+    def record_deadline(self, deadline: Deadline, prefix: str) -> None:
+        """Сохраняет все этапы, замеренные дедлайном, с префиксом (например 'truegamers')"""
+        for name, duration in deadline.stages:
+            self.record(f"{prefix}.{name}", duration)
+
+    def estimate(self, stage: str, quantile: float = 0.9, default: Optional[float] = None) -> Optional[float]:
+        """Оценка длительности этапа по квантилю истории"""
+        with self._lock:
+            samples = sorted(self._samples.get(stage, []))
+        if not samples:
+            return default
+        index = min(len(samples) - 1, int(round(quantile * (len(samples) - 1))))
+        return samples[index]
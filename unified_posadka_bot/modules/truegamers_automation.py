@@ -1,25 +1,170 @@
 """
 Модуль для автоматизации Android приложения через ADB
 """
+import socket
 import subprocess
+import threading
 import time
 import json
+import re
+import xml.etree.ElementTree as ET
+from contextlib import contextmanager
 from typing import Optional, Dict, List
 # Импорт будет из основного config
 import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import ADB_PATH, DEVICE_ID, TRUEGAMERS_PACKAGE, TRUEGAMERS_ACTIVITY, PIN_CODE, PLACES_BUTTON, PIN_KEYPAD
+from config import ADB_PATH, DEVICE_ID, TRUEGAMERS_PACKAGE, TRUEGAMERS_ACTIVITY, PIN_CODE, PLACES_BUTTON, PIN_KEYPAD, ADB_SHELL_SESSION
+from config import ADB_BACKEND, ADB_SERVER_HOST, ADB_SERVER_PORT, PIN_TAP_INTERVAL, REFERENCE_SCREEN
+from config import WARM_APP_MODE, WARM_REFRESH, WARM_MAX_AGE, UI_CALIBRATION_FILE, UI_DUMP_COMPRESSED, SCREEN_STATES_FILE
+from config import SCREEN_DEBUG_PNG, DEBUG_CAPTURE, DEBUG_CAPTURE_FRAMES, DEBUG_CAPTURE_RUNS, SEAT_LAYOUT_MAX_AGE
+from .deadline import Deadline, DeadlineExceeded
+from .adb_shell import AdbShellSession, ShellTimeout
+from .adb_protocol import AdbClient, AdbError
+from .gestures import GestureScript
+from .waits import WaitLog, WaitResult, wait_until
+from .ui_dump import UiDumper
+from .ui_tree import UITree, clickable, contains, in_region, matches, number_desc
+from .calibration import CalibrationCache, make_key, find_keypad, find_places_button, seat_region
+from .screen_states import ScreenStates, LAUNCHER, PIN, HOME, PLACES, UNKNOWN
+from .framebuffer import Frame, FrameError, frames_differ, parse_screencap
+from .debug_capture import DebugRing
+from .seat_classifier import classify_seats
+from .seat_layout import SeatLayout, SeatLayoutCache, layout_key
+from .navigator import Edge, Navigator, NavigationResult, TransitionStats, STOPPED, SPLASH, ERROR, RESTART
+
+
+# Варианты текста кнопки 'Места'
+PLACES_TEXTS = ['Места', 'места', 'МЕСТА', 'Places', 'places', 'Место', 'место']
+# Ключевые слова экрана с местами
+PLACES_INDICATORS = ['место', 'seat', 'занято', 'свободно', 'бронирование', 'booking']
+# Окно ошибки: текст ошибки и кнопка, которая его закрывает
+ERROR_TEXTS = ['ошибка', 'error', 'нет соединения', 'нет подключения', 'не удалось', 'no internet', 'connection']
+# Строка состояния (часы, значки) - доля высоты экрана сверху, не признак обновления экрана мест
+STATUS_BAR_SHARE = 0.04
+ERROR_BUTTON = clickable() & matches(r'^\s*(повторить|попробовать снова|обновить|retry|try again|ok|ок|закрыть)\s*$')
+
+# Калибровка интерфейса, общая для всех устройств: ключ - разрешение экрана и версия приложения
+calibration_cache = CalibrationCache(UI_CALIBRATION_FILE)
+# Отпечатки известных экранов, общие для всех устройств
+screen_states = ScreenStates(SCREEN_STATES_FILE)
+# Раскладки мест по отпечатку экрана мест и разрешению, общие для всех устройств
+seat_layouts = SeatLayoutCache(SEAT_LAYOUT_MAX_AGE)
 
 
 class AndroidAutomation:
     """Класс для автоматизации Android через ADB"""
     
-    def __init__(self):
+    def __init__(self, device_id: Optional[str] = None, files_dir: str = ''):
         self.adb_path = ADB_PATH
-        self.device_id = DEVICE_ID
+        self.device_id = DEVICE_ID if device_id is None else device_id
         self.package = TRUEGAMERS_PACKAGE
+        # Папка для скриншотов и дампов этого устройства ('' - текущая папка)
+        self.files_dir = files_dir
+        if files_dir:
+            os.makedirs(files_dir, exist_ok=True)
+        # Калибровка: размер экрана устройства, по которому пересчитываются координаты из config
+        self.screen_size: Optional[tuple] = None
+        # Ожидания последнего сценария навигации (фактическое время против прежних пауз)
+        self.wait_log = WaitLog()
+        # Время последнего перезапуска, после которого открылся экран мест (0 - состояние неизвестно)
+        self.cold_started_at = 0.0
+        # Калибровка интерфейса (общая для устройств с тем же разрешением и версией приложения)
+        self.calibration = calibration_cache
+        self.app_version: Optional[str] = None
+        # Откуда взяты клавиши PIN последнего ввода: cache, dump или config
+        self._keypad = ('config', {})
+        # Какой экран открыт - по структурному отпечатку дампа (см. screen_state)
+        self.screens = screen_states
+        # Отпечаток экрана, на котором вводился PIN (запоминается, когда PIN принят)
+        self._pin_fingerprint: Optional[str] = None
+        # Отпечаток экрана, с которого нажатие открыло экран мест (запоминается как главный, когда места найдены)
+        self._home_fingerprint: Optional[str] = None
+        # Длительность переходов навигации ('pin→home', 'home→places', ...) на этом устройстве
+        self.nav_stats = TransitionStats()
+        # Раскладка мест (кэш по отпечатку и разрешению) и ключ раскладки последнего поиска мест на этом устройстве
+        self.seat_layouts = seat_layouts
+        self._seat_layout_key: Optional[str] = None
+        # Отладочные кадры и дампы последних прогонов в памяти (DEBUG_CAPTURE=1, выгрузка - /debug_capture)
+        self.debug_ring = DebugRing(DEBUG_CAPTURE_FRAMES, DEBUG_CAPTURE_RUNS) if DEBUG_CAPTURE else None
+        # Дедлайн текущего отчёта хранится отдельно для каждого потока:
+        # захват в рабочем потоке не ограничивает дешёвые проверки из других обработчиков
+        self._local = threading.local()
+        # native: запросы к adb серверу по сокету, без процессов adb и временных файлов
+        self.adb_client = AdbClient(ADB_SERVER_HOST, ADB_SERVER_PORT, self.device_id) if ADB_BACKEND == 'native' else None
+        # Иначе команды `adb shell ...` идут через один долгоживущий процесс adb shell
+        use_session = ADB_SHELL_SESSION and self.adb_client is None
+        self.shell_session = AdbShellSession(self.adb_path, self.device_id) if use_session else None
+        # UI dump в память одной командой; размер и длительность дампов - в ui_dumper.stats
+        # Последний дамп и его разобранный снимок; сбрасываются любым вводом (invalidate_ui)
+        self._ui_xml: Optional[str] = None
+        self._ui_tree: Optional[UITree] = None
+        # В сессии adb shell нет терминала: /dev/tty не открывается, сразу дамп через временный файл
+        self.ui_dumper = UiDumper(lambda command, timeout: self.exec_out(command, timeout, 'ui_dump'),
+                                  UI_DUMP_COMPRESSED, tty=self.shell_session is None)
+    
+    @property
+    def deadline(self) -> Optional[Deadline]:
+        """Дедлайн текущего потока (None - без ограничения)"""
+        return getattr(self._local, 'deadline', None)
+    
+    @deadline.setter
+    def deadline(self, value: Optional[Deadline]) -> None:
+        self._local.deadline = value
+    
+    @contextmanager
+    def use_deadline(self, deadline: Optional[Deadline]):
+        """Ограничивает все ADB команды и паузы внутри блока бюджетом дедлайна"""
+        previous = self.deadline
+        self.deadline = deadline
+        try:
+            yield self
+        finally:
+            self.deadline = previous
+    
+    def _check(self, stage: str) -> None:
+        """Прерывает этап, если бюджет отчёта исчерпан"""
+        if self.deadline is not None:
+            self.deadline.check(stage)
+    
+    def _sleep(self, seconds: float, stage: str = 'sleep') -> None:
+        """Пауза, которая не выходит за пределы дедлайна"""
+        if self.deadline is not None:
+            self.deadline.sleep(seconds, stage)
+        else:
+            time.sleep(seconds)
         
+    def wait_for(self, name: str, probe, timeout: float, budget: Optional[float] = None) -> WaitResult:
+        """Ждёт условие probe() не дольше timeout с учётом дедлайна; budget - прежняя фиксированная пауза"""
+        result = wait_until(probe, timeout, name, budget, sleep=lambda seconds: self._sleep(seconds, f'wait {name}'))
+        return self.wait_log.add(result)
+    
+    def is_app_focused(self) -> bool:
+        """Окно приложения в фокусе (дешевле полного get_current_activity)"""
+        stdout, _ = self._run_adb_command(['shell', "dumpsys window | grep -E 'mCurrentFocus|mFocusedApp'"])
+        return self.package in stdout
+    
+    def wait_app_focused(self, timeout: float = 12, budget: Optional[float] = None) -> WaitResult:
+        return self.wait_for('приложение в фокусе', self.is_app_focused, timeout, budget)
+    
+    def wait_screen_stable(self, timeout: float = 8, budget: Optional[float] = None) -> WaitResult:
+        """Ждёт, пока два UI дампа подряд совпадут (экран перестал меняться); значение - XML"""
+        previous = {'xml': None}
+        
+        def probe():
+            xml = self.get_ui_dump()
+            stable = bool(xml) and xml == previous['xml']
+            previous['xml'] = xml
+            return xml if stable else None
+        return self.wait_for('экран стабилен', probe, timeout, budget)
+    
+    def wait_screen(self, labels: tuple, name: str, timeout: float = 15, budget: Optional[float] = None) -> WaitResult:
+        """Ждёт экран с одной из меток (см. screen_state); значение - XML дампа"""
+        def probe():
+            tree = self.ui_tree(refresh=True)
+            return self._ui_xml if tree is not None and self.screen_state() in labels else None
+        return self.wait_for(name, probe, timeout, budget)
+    
     def _run_adb_command(self, command: List[str]) -> tuple:
         """Выполняет ADB команду"""
         full_command = [self.adb_path]
@@ -27,25 +172,159 @@ class AndroidAutomation:
             full_command.extend(['-s', self.device_id])
         full_command.extend(command)
         
+        stage = f"adb {' '.join(command[:2])}"
+        timeout = self.deadline.timeout(10, stage) if self.deadline is not None else 10
+        if self.adb_client is not None and command[0] in ('devices', 'shell', 'pull'):
+            return self._run_native(command, timeout, stage)
+        if command[0] == 'shell' and len(command) > 1 and self.shell_session is not None:
+            stdout, stderr, _ = self._run_shell(' '.join(command[1:]), timeout, stage)
+            return stdout, stderr
         try:
             result = subprocess.run(
                 full_command,
                 capture_output=True,
                 text=True,
-                timeout=10
+                timeout=timeout
             )
             return result.stdout, result.stderr
         except subprocess.TimeoutExpired:
+            if self.deadline is not None and self.deadline.expired():
+                raise DeadlineExceeded(stage)
             return "", "Timeout"
         except Exception as e:
             return "", str(e)
     
-    def check_device_connected(self) -> bool:
-        """Проверяет подключение устройства"""
+    def _native_call(self, stage: str, call, *args):
+        """Вызов клиента adb сервера с переводом таймаута сокета в DeadlineExceeded"""
+        try:
+            return call(*args)
+        except DeadlineExceeded:
+            # Остаток дедлайна кончился до запроса - этап вызывающего, а не клиента
+            raise DeadlineExceeded(stage)
+        except socket.timeout:
+            if self.deadline is not None and self.deadline.expired():
+                raise DeadlineExceeded(stage)
+            raise
+    
+    def _run_native(self, command: List[str], timeout: float, stage: str) -> tuple:
+        """Команды devices, shell и pull через протокол adb сервера (тот же формат вывода, что у adb)"""
+        try:
+            if command[0] == 'devices':
+                devices = self._native_call(stage, self.adb_client.devices, timeout)
+                lines = ["List of devices attached"] + [f"{serial}\t{state}" for serial, state in devices]
+                return "\n".join(lines) + "\n", ""
+            if command[0] == 'shell':
+                stdout, stderr, _ = self._native_call(stage, self.adb_client.shell, ' '.join(command[1:]), timeout)
+                return stdout, stderr
+            data = self._native_call(stage, self.adb_client.pull, command[1], timeout)
+            with open(command[2], 'wb') as f:
+                f.write(data)
+            return "", f"{command[1]}: 1 file pulled"
+        except DeadlineExceeded:
+            raise
+        except socket.timeout:
+            return "", "Timeout"
+        except (AdbError, OSError) as e:
+            return "", str(e)
+    
+    def _run_shell(self, command: str, timeout: float, stage: str) -> tuple:
+        """Выполняет команду в постоянной сессии adb shell: (stdout, stderr, код возврата)"""
+        try:
+            return self.shell_session.run(command, timeout)
+        except ShellTimeout:
+            if self.deadline is not None and self.deadline.expired():
+                raise DeadlineExceeded(stage)
+            return "", "Timeout", -1
+        except Exception as e:
+            return "", str(e), -1
+    
+    def shell(self, command: str, timeout: float = 10) -> tuple:
+        """Выполняет shell команду на устройстве: (stdout, stderr, код возврата)"""
+        stage = f"adb shell {command.split(' ', 1)[0]}"
+        timeout = self.deadline.timeout(timeout, stage) if self.deadline is not None else timeout
+        if self.adb_client is not None:
+            try:
+                return self._native_call(stage, self.adb_client.shell, command, timeout)
+            except DeadlineExceeded:
+                raise
+            except (AdbError, OSError) as e:
+                return "", str(e), -1
+        if self.shell_session is not None:
+            return self._run_shell(command, timeout, stage)
+        full_command = [self.adb_path] + (['-s', self.device_id] if self.device_id else []) + ['shell', command]
+        try:
+            result = subprocess.run(full_command, capture_output=True, text=True, timeout=timeout)
+            return result.stdout, result.stderr, result.returncode
+        except subprocess.TimeoutExpired:
+            if self.deadline is not None and self.deadline.expired():
+                raise DeadlineExceeded(stage)
+            return "", "Timeout", -1
+        except Exception as e:
+            return "", str(e), -1
+    
+    def run_gestures(self, script: GestureScript) -> Dict:
+        """Выполняет сценарий жестов на устройстве за один вызов adb shell.
+        
+        Возвращает результат GestureScript.parse с таймингом каждого шага.
+        """
+        self.invalidate_ui()
+        self._check('gestures')
+        stdout, stderr, exit_code = self.shell(script.render(), timeout=script.expected_duration() + 10)
+        result = script.parse(stdout)
+        timings = ", ".join(
+            f"{step['action']}={step['duration'] * 1000:.0f}ms" if step['duration'] is not None else step['action']
+            for step in result['steps']
+        )
+        if result['ok']:
+            print(f"✅ Сценарий из {len(script.steps)} шагов выполнен: {timings}")
+        else:
+            print(f"⚠️ Сценарий выполнен частично ({result['completed']}/{len(script.steps)}): {timings} {stderr.strip()}")
+        return result
+    
+    def list_devices(self) -> List[tuple]:
+        """Устройства adb: [(серийный номер, состояние)]"""
         stdout, stderr = self._run_adb_command(['devices'])
-        devices = [line for line in stdout.split('\n') if '\tdevice' in line]
+        return [tuple(line.split('\t', 1)) for line in stdout.split('\n')[1:] if '\t' in line]
+    
+    def check_device_connected(self) -> bool:
+        """Проверяет подключение устройства (своего серийного номера, если он задан)"""
+        devices = [serial for serial, state in self.list_devices() if state.strip() == 'device']
+        if self.device_id:
+            return self.device_id in devices
         return len(devices) > 0
     
+    def local_file(self, name: str) -> str:
+        """Путь к локальному файлу устройства (скриншоты и дампы разных устройств не пересекаются)"""
+        return os.path.join(self.files_dir, name) if self.files_dir else name
+    
+    def calibrate(self) -> Optional[tuple]:
+        """Определяет размер экрана один раз; None - размер неизвестен, координаты не пересчитываются"""
+        if self.screen_size is None:
+            stdout, _ = self._run_adb_command(['shell', 'wm', 'size'])
+            match = re.search(r'Physical size:\s*(\d+)x(\d+)', stdout)
+            if match:
+                self.screen_size = (int(match.group(1)), int(match.group(2)))
+        return self.screen_size
+    
+    def get_app_version(self) -> str:
+        """Версия приложения (versionName) - часть ключа калибровки"""
+        if self.app_version is None:
+            stdout, _ = self._run_adb_command(['shell', f"dumpsys package {self.package} | grep -m1 versionName"])
+            match = re.search(r'versionName=(\S+)', stdout)
+            self.app_version = match.group(1) if match else ''
+        return self.app_version
+    
+    def calibration_key(self) -> str:
+        """Ключ калибровки интерфейса: разрешение экрана и версия приложения"""
+        return make_key(self.calibrate(), self.get_app_version())
+    
+    def scaled(self, x: int, y: int) -> tuple:
+        """Координаты из config (для REFERENCE_SCREEN) в координаты экрана этого устройства"""
+        size = self.calibrate()
+        if not size or size == REFERENCE_SCREEN:
+            return x, y
+        return round(x * size[0] / REFERENCE_SCREEN[0]), round(y * size[1] / REFERENCE_SCREEN[1])
+    
     def get_device_info(self) -> Dict:
         """Получает информацию об устройстве"""
         info = {}
@@ -57,6 +336,7 @@ class AndroidAutomation:
     
     def tap(self, x: int, y: int) -> bool:
         """Нажимает на экран по координатам"""
+        self.invalidate_ui()
         print(f"👆 Нажимаю на координаты ({x}, {y})...")
         stdout, stderr = self._run_adb_command(['shell', 'input', 'tap', str(x), str(y)])
         
@@ -68,7 +348,7 @@ class AndroidAutomation:
         # Дополнительная проверка - пробуем еще раз если не получилось
         if stdout and 'error' in stdout.lower():
             print(f"⚠️ Возможна ошибка, пробую еще раз...")
-            time.sleep(0.5)
+            self._sleep(0.5)
             stdout2, stderr2 = self._run_adb_command(['shell', 'input', 'tap', str(x), str(y)])
             if stderr2 and stderr2.strip():
                 print(f"❌ Повторная попытка тоже не удалась: {stderr2}")
@@ -79,6 +359,7 @@ class AndroidAutomation:
     
     def long_tap(self, x: int, y: int, duration: int = 500) -> bool:
         """Выполняет долгое нажатие (удержание) на экране"""
+        self.invalidate_ui()
         print(f"👆 Долгое нажатие на координаты ({x}, {y}) в течение {duration}мс...")
         # Долгое нажатие через swipe с одинаковыми координатами
         stdout, stderr = self._run_adb_command([
@@ -95,6 +376,7 @@ class AndroidAutomation:
     
     def swipe(self, x1: int, y1: int, x2: int, y2: int, duration: int = 300) -> bool:
         """Выполняет свайп"""
+        self.invalidate_ui()
         stdout, stderr = self._run_adb_command([
             'shell', 'input', 'swipe', 
             str(x1), str(y1), str(x2), str(y2), str(duration)
@@ -103,6 +385,7 @@ class AndroidAutomation:
     
     def input_text(self, text: str) -> bool:
         """Вводит текст"""
+        self.invalidate_ui()
         # Экранируем специальные символы
         text = text.replace(' ', '%s').replace('&', '\\&')
         stdout, stderr = self._run_adb_command(['shell', 'input', 'text', text])
@@ -110,169 +393,152 @@ class AndroidAutomation:
     
     def input_key(self, keycode: str) -> bool:
         """Нажимает клавишу (например, ENTER, BACK)"""
+        self.invalidate_ui()
         stdout, stderr = self._run_adb_command(['shell', 'input', 'keyevent', keycode])
         return stderr == ""
     
+    def exec_out(self, command: str, timeout: float = 15, stage: str = 'exec-out', binary: bool = False) -> bytes:
+        """Двоичный stdout команды устройства без промежуточных файлов: adb exec-out,
+        сокет adb сервера (native) или постоянная сессия adb shell (только текст:
+        при binary=True вместо неё - отдельный adb exec-out); b'' - ошибка
+        """
+        timeout = self.deadline.timeout(timeout, stage) if self.deadline is not None else timeout
+        if self.adb_client is not None:
+            try:
+                return self._native_call(stage, self.adb_client.exec_out, command, timeout)
+            except DeadlineExceeded:
+                raise
+            except (AdbError, OSError) as e:
+                print(f"⚠️ Ошибка exec-out '{command.split(' ', 1)[0]}': {e}")
+                return b""
+        if self.shell_session is not None and not binary:
+            stdout, _, _ = self._run_shell(command, timeout, stage)
+            return stdout.encode('utf-8')
+        full_command = [self.adb_path] + (['-s', self.device_id] if self.device_id else []) + ['exec-out', command]
+        try:
+            return subprocess.run(full_command, stdin=subprocess.DEVNULL, capture_output=True, timeout=timeout).stdout
+        except subprocess.TimeoutExpired:
+            if self.deadline is not None and self.deadline.expired():
+                raise DeadlineExceeded(stage)
+            return b""
+        except OSError as e:
+            print(f"⚠️ Ошибка exec-out '{command.split(' ', 1)[0]}': {e}")
+            return b""
+    
     def get_ui_dump(self, save_to_file: bool = False) -> str:
-        """Получает XML дамп UI через UI Automator
+        """Получает XML дамп UI через UI Automator прямо в память (без файла на sdcard и adb pull)
         
         Args:
-            save_to_file: Если True, сохраняет дамп в файл для отладки
+            save_to_file: Если True, дамп - отладочный (debug_dump: буфер и файл при SCREEN_DEBUG_PNG=1)
         """
-        # Сохраняем дамп UI в файл на устройстве
-        stdout, stderr = self._run_adb_command([
-            'shell', 'uiautomator', 'dump', '/sdcard/ui_dump.xml'
-        ])
-        
-        if stderr:
-            print(f"⚠️ Ошибка при получении UI dump: {stderr}")
-            return ""
-        
-        # Скачиваем файл на компьютер
-        dump_file = 'ui_dump.xml'
-        stdout, stderr = self._run_adb_command([
-            'pull', '/sdcard/ui_dump.xml', dump_file
-        ])
-        
-        # ADB pull выводит информацию в stderr, но это не ошибка
-        # Проверяем реальные ошибки (не "file pulled" сообщения)
-        if stderr and 'error' in stderr.lower() and 'file pulled' not in stderr.lower():
-            print(f"⚠️ Ошибка при скачивании UI dump: {stderr}")
-            return ""
-        
-        # Проверяем, что файл действительно скачался
-        import os
-        if not os.path.exists(dump_file):
-            print(f"⚠️ Файл {dump_file} не найден после скачивания")
+        self._check('ui_dump')
+        content = self.ui_dumper.dump(timeout=20)
+        if not content:
+            print(f"⚠️ Ошибка при получении UI dump (способ {self.ui_dumper.mode})")
             return ""
+        self._ui_xml, self._ui_tree = content, None
+        if save_to_file:
+            self.debug_dump('ui_dump.xml', content)
+        return content
+    
+    def invalidate_ui(self) -> None:
+        """Сбрасывает снимок экрана: после ввода экран мог измениться"""
+        self._ui_xml = self._ui_tree = None
+    
+    def ui_tree(self, xml: Optional[str] = None, refresh: bool = False) -> Optional[UITree]:
+        """Снимок экрана для запросов (None - дамп не получен или повреждён).
         
-        # Читаем файл
-        try:
-            with open(dump_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-                if save_to_file:
-                    print(f"📄 UI dump сохранен в {dump_file}")
-                return content
-        except Exception as e:
-            print(f"⚠️ Ошибка при чтении UI dump: {e}")
-            return ""
+        Без refresh используется последний дамп, если после него не было ввода;
+        xml - уже полученный дамп, который становится текущим снимком.
+        """
+        if xml is not None:
+            self._ui_xml, self._ui_tree = xml, None
+        elif refresh or self._ui_xml is None:
+            self.get_ui_dump()
+        if self._ui_tree is None and self._ui_xml:
+            try:
+                self._ui_tree = UITree.from_xml(self._ui_xml)
+            except ET.ParseError as e:
+                print(f"⚠️ Ошибка при парсинге UI dump: {e}")
+                self._ui_xml = None
+        return self._ui_tree
+    
+    def screen_state(self, xml: Optional[str] = None) -> str:
+        """Какой экран открыт: launcher, pin, home, places или unknown.
+        
+        Известный отпечаток (UITree.fingerprint) определяет экран одной проверкой
+        по словарю; другой пакет на переднем плане - launcher. Для нового отпечатка -
+        прежняя проверка по текстам (индикаторы мест, кнопка 'Места'); запоминается
+        отпечаток только после подтверждения: экран мест - когда на нём найдены места
+        (get_places_status), главный - когда нажатие с него открыло этот экран мест.
+        """
+        tree = self.ui_tree(xml)
+        if tree is None or not len(tree):
+            return UNKNOWN
+        label = self.screens.label(tree.fingerprint())
+        if label:
+            return label
+        if tree.package and tree.package != self.package:
+            return LAUNCHER
+        if tree.contains_any(PLACES_INDICATORS):
+            return PLACES
+        if tree.contains_any(PLACES_TEXTS):
+            return HOME
+        return UNKNOWN
+    
+    def remember_screen(self, label: str, xml: Optional[str] = None) -> Optional[str]:
+        """Запоминает отпечаток подтверждённого экрана; возвращает отпечаток"""
+        tree = self.ui_tree(xml)
+        if tree is None or not len(tree):
+            return None
+        fingerprint = tree.fingerprint()
+        self.screens.learn(fingerprint, label, self.app_version or '')
+        return fingerprint
     
     def find_all_clickable_elements(self) -> List[Dict]:
         """Находит все кликабельные элементы на экране (для отладки)"""
-        import xml.etree.ElementTree as ET
-        import re
-        
-        ui_xml = self.get_ui_dump(save_to_file=True)
-        if not ui_xml:
-            return []
-        
-        elements = []
-        try:
-            root = ET.fromstring(ui_xml)
-            
-            for elem in root.iter():
-                clickable = elem.get('clickable', 'false').lower() == 'true'
-                if clickable:
-                    text = elem.get('text', '')
-                    content_desc = elem.get('content-desc', '')
-                    resource_id = elem.get('resource-id', '')
-                    bounds = elem.get('bounds', '')
-                    
-                    if bounds:
-                        match = re.search(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds)
-                        if match:
-                            x1, y1 = int(match.group(1)), int(match.group(2))
-                            x2, y2 = int(match.group(3)), int(match.group(4))
-                            center_x = (x1 + x2) // 2
-                            center_y = (y1 + y2) // 2
-                            
-                            elements.append({
-                                'text': text,
-                                'content_desc': content_desc,
-                                'resource_id': resource_id,
-                                'bounds': bounds,
-                                'center': (center_x, center_y)
-                            })
-            
-            return elements
-        except Exception as e:
-            print(f"⚠️ Ошибка при парсинге UI dump: {e}")
+        tree = self.ui_tree()
+        if tree is None:
             return []
+        self.debug_dump('ui_dump.xml', self._ui_xml)
+        return [{
+            'text': node.text,
+            'content_desc': node.desc,
+            'resource_id': node.resource_id,
+            'bounds': node.bounds,
+            'center': node.center
+        } for node in tree.clickable]
     
     def find_element_by_text(self, text: str, clickable_only: bool = False) -> tuple:
         """Находит элемент по тексту и возвращает его координаты (center)
         
+        Поиск идёт по текущему снимку экрана: повторные поиски без ввода
+        между ними не делают новый дамп.
+        
         Args:
             text: Текст для поиска
             clickable_only: Искать только кликабельные элементы (по умолчанию False - ищем все)
         """
-        import xml.etree.ElementTree as ET
-        import re
-        
-        # Получаем UI dump
-        ui_xml = self.get_ui_dump()
-        if not ui_xml:
+        tree = self.ui_tree()
+        if tree is None:
             return None
         
-        try:
-            # Парсим XML
-            root = ET.fromstring(ui_xml)
-            
-            # Ищем элемент с нужным текстом
-            # UI Automator использует namespace
-            namespace = {'ui': 'http://schemas.android.com/resources/android'}
-            
-            # Ищем по тексту (case-insensitive)
-            for elem in root.iter():
-                # Проверяем атрибут text
-                elem_text = elem.get('text', '')
-                content_desc = elem.get('content-desc', '')
-                resource_id = elem.get('resource-id', '')
-                clickable = elem.get('clickable', 'false').lower() == 'true'
-                
-                # Пропускаем не кликабельные элементы, если требуется
-                if clickable_only and not clickable:
-                    continue
-                
-                # Ищем текст "Места" или похожий (в тексте, content-desc или resource-id)
-                text_lower = text.lower()
-                elem_text_lower = (elem_text or '').lower()
-                content_desc_lower = (content_desc or '').lower()
-                resource_id_lower = (resource_id or '').lower()
-                
-                found = (
-                    text_lower in elem_text_lower or 
-                    text_lower in content_desc_lower or
-                    text_lower in resource_id_lower
-                )
-                
-                # Также ищем частичные совпадения для русского текста "Места"
-                if not found and text_lower in ['места', 'место']:
-                    if 'мест' in elem_text_lower or 'мест' in content_desc_lower:
-                        found = True
-                
-                if found:
-                    # Получаем bounds элемента
-                    bounds = elem.get('bounds', '')
-                    if bounds:
-                        # Формат: [x1,y1][x2,y2]
-                        match = re.search(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds)
-                        if match:
-                            x1, y1 = int(match.group(1)), int(match.group(2))
-                            x2, y2 = int(match.group(3)), int(match.group(4))
-                            # Возвращаем центр элемента
-                            center_x = (x1 + x2) // 2
-                            center_y = (y1 + y2) // 2
-                            print(f"✅ Найден элемент '{text}' с координатами центра: ({center_x}, {center_y})")
-                            print(f"   text='{elem_text}', content-desc='{content_desc}', resource-id='{resource_id}', clickable={clickable}")
-                            return (center_x, center_y)
-            
+        # Ищем текст в text, content-desc или resource-id (без учёта регистра);
+        # для "Места" подходят и частичные совпадения по корню "мест"
+        selector = contains(text)
+        if text.lower() in ['места', 'место']:
+            selector = selector | contains('мест')
+        if clickable_only:
+            selector = clickable() & selector
+        node = tree.first(selector)
+        if node is None:
             print(f"⚠️ Элемент с текстом '{text}' не найден")
             return None
-            
-        except Exception as e:
-            print(f"⚠️ Ошибка при парсинге UI dump: {e}")
-            return None
+        
+        center_x, center_y = node.center
+        print(f"✅ Найден элемент '{text}' с координатами центра: ({center_x}, {center_y})")
+        print(f"   text='{node.text}', content-desc='{node.desc}', resource-id='{node.resource_id}', clickable={node.clickable}")
+        return (center_x, center_y)
     
     def tap_by_ui_automator(self, text: str) -> bool:
         """Нажимает на элемент через UI Automator (использует координаты из UI dump)"""
@@ -284,7 +550,7 @@ class AndroidAutomation:
             x, y = coords
             print(f"👆 Нажимаю через UI Automator на координаты ({x}, {y})")
             if self.tap(x, y):
-                time.sleep(1)
+                self._sleep(1)
                 return True
         
         return False
@@ -297,7 +563,7 @@ class AndroidAutomation:
             x, y = coords
             print(f"👆 Нажимаю на элемент '{text}' по координатам ({x}, {y})")
             if self.tap(x, y):
-                time.sleep(2)  # Даем время на реакцию
+                self._sleep(2)  # Даем время на реакцию
                 return True
         
         # Метод 2: Если не нашли, пробуем через UI Automator
@@ -321,14 +587,24 @@ class AndroidAutomation:
             tap_x, tap_y = x + offset_x, y + offset_y
             print(f"Пробую нажать на ({tap_x}, {tap_y})...")
             if self.tap(tap_x, tap_y):
-                time.sleep(2)
+                self._sleep(2)
                 return True
         
         return False
     
     def get_screenshot(self, save_path: str = 'screenshot.png') -> bool:
         """Делает скриншот экрана"""
+        self._check('screenshot')
         try:
+            if self.adb_client is not None:
+                # PNG приходит по exec: сразу в память, без файла на sdcard и pull
+                png = self.get_screenshot_bytes()
+                if not png:
+                    return False
+                with open(save_path, 'wb') as f:
+                    f.write(png)
+                return True
+            
             # Сначала пробуем стандартный метод
             stdout, stderr = self._run_adb_command(['shell', 'screencap', '-p', '/sdcard/screenshot.png'])
             if stderr and stderr.strip() and 'error' in stderr.lower():
@@ -350,10 +626,78 @@ class AndroidAutomation:
             else:
                 print(f"⚠️ Файл скриншота не создан или пуст: {save_path}")
                 return False
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"⚠️ Исключение при создании скриншота: {e}")
             return False
     
+    def capture_frame(self, region: Optional[List[int]] = None, step: int = 1) -> Optional[Frame]:
+        """Кадр экрана из сырого framebuffer (screencap без -p) прямо в NumPy.
+        
+        Без PNG на устройстве, файла на sdcard и декодирования; region=[x1, y1, x2, y2]
+        обрезает кадр, step прореживает пиксели. None - кадр не получен.
+        """
+        self._check('screenshot')
+        raw = self.exec_out('screencap', timeout=15, stage='screenshot', binary=True)
+        try:
+            return parse_screencap(raw, region, step)
+        except FrameError as e:
+            print(f"⚠️ Ошибка при создании скриншота: {e}")
+            return None
+    
+    def debug_screenshot(self, name: str, frame: Optional[Frame] = None) -> str:
+        """Отладочный кадр: в кольцевой буфер (DEBUG_CAPTURE=1) и PNG-файлом (SCREEN_DEBUG_PNG=1).
+        
+        Без обоих флагов экран не снимается. Возвращает путь к PNG или ''.
+        """
+        if not SCREEN_DEBUG_PNG and self.debug_ring is None:
+            return ''
+        frame = frame or self.capture_frame()
+        if frame is None:
+            return ''
+        if self.debug_ring is not None:
+            self.debug_ring.add_frame(name, frame)
+        if not SCREEN_DEBUG_PNG:
+            return ''
+        path = self.local_file(name)
+        frame.save_png(path)
+        print(f"📸 Скриншот сохранен: {name}")
+        return path
+    
+    def debug_dump(self, name: str, xml: str) -> str:
+        """Отладочный UI dump: в кольцевой буфер (DEBUG_CAPTURE=1) и файлом (SCREEN_DEBUG_PNG=1).
+        
+        Возвращает путь к файлу или ''.
+        """
+        if not xml:
+            return ''
+        if self.debug_ring is not None:
+            self.debug_ring.add_dump(name, xml)
+        if not SCREEN_DEBUG_PNG:
+            return ''
+        path = self.local_file(name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(xml)
+        print(f"📄 UI dump сохранен: {name}")
+        return path
+    
+    def get_screenshot_bytes(self) -> bytes:
+        """PNG скриншот в памяти (только для ADB_BACKEND=native)"""
+        self._check('screenshot')
+        timeout = self.deadline.timeout(15, 'screenshot') if self.deadline is not None else 15
+        try:
+            png = self._native_call('screenshot', self.adb_client.exec_out, 'screencap -p', timeout)
+        except DeadlineExceeded:
+            raise
+        except (AdbError, OSError) as e:
+            print(f"⚠️ Ошибка при создании скриншота: {e}")
+            return b""
+        if not png.startswith(b'\x89PNG'):
+            print(f"⚠️ screencap вернул не PNG ({len(png)} байт)")
+            return b""
+        return png
+    
     def get_screen_size(self) -> tuple:
         """Получает размер экрана"""
         stdout, _ = self._run_adb_command(['shell', 'wm', 'size'])
@@ -373,6 +717,7 @@ class AndroidAutomation:
     
     def close_app(self) -> bool:
         """Закрывает приложение TrueGamers"""
+        self.invalidate_ui()
         from config import TRUEGAMERS_PACKAGE
         
         print("🔴 Закрываю приложение...")
@@ -389,7 +734,7 @@ class AndroidAutomation:
             print(f"✅ Приложение {TRUEGAMERS_PACKAGE} закрыто")
         
         # Даем время на закрытие
-        time.sleep(2)
+        self._sleep(2)
         
         # Проверяем, что приложение действительно закрыто
         if not self.is_app_running():
@@ -401,11 +746,12 @@ class AndroidAutomation:
             stdout, stderr = self._run_adb_command([
                 'shell', 'am', 'force-stop', TRUEGAMERS_PACKAGE
             ])
-            time.sleep(2)
+            self._sleep(2)
             return not self.is_app_running()
     
     def launch_app(self) -> bool:
         """Запускает приложение"""
+        self.invalidate_ui()
         # Если активность указана, используем её
         if TRUEGAMERS_ACTIVITY:
             stdout, stderr = self._run_adb_command([
@@ -424,29 +770,18 @@ class AndroidAutomation:
                     'shell', 'monkey', '-p', self.package, '-c', 'android.intent.category.LAUNCHER', '1'
                 ])
         
-        time.sleep(2)  # Ждем запуска
-        
-        # Проверяем, действительно ли приложение запустилось
+        # Ждём появления процесса вместо фиксированной паузы
         # Не полагаемся только на stderr, так как он может быть не пустым даже при успешном запуске
-        is_running = self.is_app_running()
-        
-        if is_running:
+        if self.wait_for('процесс приложения', self.is_app_running, 6, 3):
             print(f"✅ Приложение {self.package} успешно запущено")
             return True
-        else:
-            # Если stderr пустой, но приложение не запущено, возможно нужно больше времени
-            time.sleep(1)
-            is_running = self.is_app_running()
-            if is_running:
-                print(f"✅ Приложение {self.package} запущено (после дополнительной задержки)")
-                return True
-            else:
-                print(f"⚠️ Не удалось подтвердить запуск приложения. stderr: {stderr[:100] if stderr else 'пусто'}")
-                # Если stderr пустой, считаем что запуск успешен (приложение может уже быть запущено)
-                return stderr == "" or "Error" not in stderr
+        print(f"⚠️ Не удалось подтвердить запуск приложения. stderr: {stderr[:100] if stderr else 'пусто'}")
+        # Если stderr пустой, считаем что запуск успешен (приложение может уже быть запущено)
+        return stderr == "" or "Error" not in stderr
     
     def close_app(self) -> bool:
         """Закрывает приложение TrueGamers"""
+        self.invalidate_ui()
         print("🔴 Закрываю приложение...")
         
         # Force stop через am force-stop
@@ -459,21 +794,13 @@ class AndroidAutomation:
         else:
             print(f"✅ Приложение {self.package} закрыто")
         
-        # Даем время на закрытие
-        time.sleep(2)
-        
-        # Проверяем, что приложение действительно закрыто
-        if not self.is_app_running():
+        # Ждём завершения процесса вместо фиксированной паузы
+        if self.wait_for('приложение закрыто', lambda: not self.is_app_running(), 4, 2):
             print("✅ Приложение успешно закрыто")
             return True
-        else:
-            print("⚠️ Приложение все еще запущено, пробую еще раз...")
-            # Пробуем еще раз
-            stdout, stderr = self._run_adb_command([
-                'shell', 'am', 'force-stop', self.package
-            ])
-            time.sleep(2)
-            return not self.is_app_running()
+        print("⚠️ Приложение все еще запущено, пробую еще раз...")
+        self._run_adb_command(['shell', 'am', 'force-stop', self.package])
+        return bool(self.wait_for('приложение закрыто (повтор)', lambda: not self.is_app_running(), 4, 2))
     
     def get_current_activity(self) -> str:
         """Получает текущую активность"""
@@ -515,7 +842,7 @@ class AndroidAutomation:
         if not self.launch_app():
             return ""
         
-        time.sleep(2)  # Ждем запуска
+        self._sleep(2)  # Ждем запуска
         
         activity = self.get_current_activity()
         return activity
@@ -528,23 +855,23 @@ class AndroidAutomation:
         if not self.launch_app():
             return False
         
-        time.sleep(3)  # Ждем загрузки
+        self._sleep(3)  # Ждем загрузки
         
         # Вводим телефон
         self.tap(*LOGIN_COORDINATES['phone_input'])
-        time.sleep(0.5)
+        self._sleep(0.5)
         self.input_text(phone)
-        time.sleep(1)
+        self._sleep(1)
         
         # Вводим пароль
         self.tap(*LOGIN_COORDINATES['password_input'])
-        time.sleep(0.5)
+        self._sleep(0.5)
         self.input_text(password)
-        time.sleep(1)
+        self._sleep(1)
         
         # Нажимаем кнопку входа
         self.tap(*LOGIN_COORDINATES['login_button'])
-        time.sleep(3)  # Ждем входа
+        self._sleep(3)  # Ждем входа
         
         return True
     
@@ -552,86 +879,285 @@ class AndroidAutomation:
         """Выбирает клуб"""
         from config import CLUB_SELECTION
         
-        time.sleep(2)
+        self._sleep(2)
         
         # Нажимаем на список клубов
         self.tap(*CLUB_SELECTION['club_list'])
-        time.sleep(2)
+        self._sleep(2)
         
         # Если указано имя клуба, можно добавить поиск
         # Пока просто выбираем первый
         self.tap(*CLUB_SELECTION['select_club'])
-        time.sleep(2)
+        self._sleep(2)
         
         return True
     
+    def _pin_keypad(self, pin: str, xml: str) -> Dict:
+        """Клавиши PIN из калибровки или из дампа экрана; {} - координаты из config"""
+        key = self.calibration_key()
+        cached = self.calibration.get(key, 'keypad')
+        if cached and all(digit in cached for digit in pin):
+            self._keypad = ('cache', cached)
+            return cached
+        # Клавиатура, нарисованная без элементов с цифрами, уже не принимала PIN по дампу
+        tree = self.ui_tree(xml) if xml and self.calibration.get(key, 'keypad_source') != 'config' else None
+        found = find_keypad(tree) if tree is not None else {}
+        if all(digit in found for digit in pin):
+            print(f"🎯 Клавиши PIN найдены в UI dump ({len(found)} из 10)")
+            self._keypad = ('dump', found)
+            return found
+        self._keypad = ('config', {})
+        return {}
+    
+    def _confirm_keypad(self, accepted: bool) -> None:
+        """PIN принят - клавиши из дампа сохраняются в калибровку; не принят - калибровка клавиш сбрасывается"""
+        source, keypad = self._keypad
+        key = self.calibration_key()
+        if accepted and self._pin_fingerprint:
+            self.screens.learn(self._pin_fingerprint, PIN, self.app_version or '')
+        if accepted and source == 'dump':
+            self.calibration.put(key, 'keypad', keypad)
+        elif not accepted and source == 'cache':
+            self.calibration.forget(key, 'keypad')
+        elif not accepted and source == 'dump':
+            self.calibration.put(key, 'keypad_source', 'config')
+    
     def input_pin(self, pin: str) -> bool:
         """Вводит PIN-код через цифровую клавиатуру"""
         from config import PIN_KEYPAD
         
         print(f"🔐 Начинаю ввод PIN: {pin}")
-        time.sleep(2)  # Ждем появления клавиатуры и загрузки экрана
-        
-        # Вводим каждую цифру PIN-кода
-        for i, digit in enumerate(pin, 1):
-            if digit in PIN_KEYPAD:
-                x, y = PIN_KEYPAD[digit]
-                print(f"  Нажимаю цифру {digit} ({i}/{len(pin)}) на координатах ({x}, {y})")
-                success = self.tap(x, y)
-                if not success:
-                    print(f"  ⚠️ Не удалось нажать на цифру {digit}")
-                time.sleep(0.5)  # Увеличиваем задержку между нажатиями
+        # Клавиатура появилась, когда экран перестал меняться
+        stable = self.wait_screen_stable(timeout=6, budget=2)
+        self._pin_fingerprint = None
+        if stable:
+            state = self.screen_state(stable.value)
+            tree = self._ui_tree
+            # Пропуск PIN - только по известному отпечатку: текст 'Места' бывает и под окном PIN
+            if tree is not None and self.screens.label(tree.fingerprint()) in (HOME, PLACES):
+                print(f"ℹ️ PIN не требуется: открыт экран '{state}'")
+                self._keypad = ('config', {})
+                return True
+            if state in (PIN, UNKNOWN) and tree is not None:
+                self._pin_fingerprint = tree.fingerprint()
+        keypad = self._pin_keypad(pin, stable.value if stable else '')
+        
+        # Все цифры PIN-кода нажимаются одним сценарием на устройстве
+        script = GestureScript()
+        for digit in pin:
+            if digit in keypad:
+                script.tap(*keypad[digit]).wait(PIN_TAP_INTERVAL)
+            elif digit in PIN_KEYPAD:
+                script.tap(*self.scaled(*PIN_KEYPAD[digit])).wait(PIN_TAP_INTERVAL)
             else:
                 print(f"⚠️ Неизвестная цифра в PIN: {digit}")
                 return False
+        result = self.run_gestures(script)
+        if not result['ok']:
+            print(f"  ⚠️ Не все цифры PIN нажаты ({result['completed']}/{len(script.steps)} шагов)")
         
-        time.sleep(1.5)  # Ждем обработки PIN
+        # Обработку PIN дожидается вызывающий код по появлению следующего экрана
         print("✅ PIN введен")
         return True
     
     def open_app_and_places(self) -> bool:
-        """Открывает приложение, вводит PIN и нажимает кнопку 'Места'"""
-        from config import PLACES_BUTTON, PIN_CODE
+        """Перезапускает приложение и проходит PIN и кнопку 'Места' до экрана мест"""
+        # Паузы заменены ожиданием условий; итог сравнивается с прежними фиксированными паузами
+        self.wait_log = WaitLog()
         
         # Сначала закрываем приложение для получения актуальных данных
         print("🔄 Перезапускаю приложение для получения актуальных данных...")
         self.close_app()
-        time.sleep(1)  # Небольшая задержка после закрытия
+        return bool(self.navigate_to_places(STOPPED))
+    
+    def navigation_state(self) -> str:
+        """Состояние для навигации: stopped, launcher, splash, error, pin, home, places или unknown.
         
+        Используется последний снимок экрана, если после него не было ввода:
+        переходы заканчиваются дампом, который уже показывает новое состояние.
+        """
+        if not self.is_app_running():
+            return STOPPED
+        if not self.is_app_focused():
+            return LAUNCHER
+        tree = self.ui_tree()
+        if tree is None or not any(node.text or node.desc for node in tree.nodes):
+            return SPLASH
+        label = self.screens.label(tree.fingerprint())
+        if label:
+            return label
+        # Окно ошибки поверх экрана - раньше проверки текстов, которые видны под ним
+        if tree.first(ERROR_BUTTON) is not None and tree.contains_any(ERROR_TEXTS):
+            return ERROR
+        state = self.screen_state()
+        if state == UNKNOWN and len(find_keypad(tree)) == 10:
+            return PIN
+        return state
+    
+    def _navigation_edges(self) -> Dict[str, Edge]:
+        """Переходы к экрану мест: действие, таймаут и число повторов для каждого состояния.
+        
+        После запуска приложения экран в фокусе, который не узнан ни как главный,
+        ни как экран мест, считается экраном PIN: отпечаток PIN ещё не известен,
+        а клавиатура не всегда находится в дампе - тогда клавиши берутся
+        из калибровки или config.
+        """
+        after_launch = {UNKNOWN: PIN}
+        return {
+            STOPPED: Edge('запуск приложения', self._nav_launch, timeout=12, retries=1, assume=after_launch),
+            LAUNCHER: Edge('приложение на передний план', self._nav_launch, timeout=12, retries=1, assume=after_launch),
+            SPLASH: Edge('ожидание загрузки', self._nav_wait_splash, timeout=15, retries=1),
+            UNKNOWN: Edge('ожидание известного экрана', self._nav_wait_loaded, timeout=8, retries=0),
+            PIN: Edge('ввод PIN', self._nav_pin, timeout=20, retries=1),
+            HOME: Edge("кнопка 'Места'", self._nav_places, timeout=20, retries=1),
+            ERROR: Edge('закрытие окна ошибки', self._nav_dismiss_error, timeout=5, retries=1),
+            RESTART: Edge('перезапуск приложения', self._nav_restart, timeout=8, retries=0),
+        }
+    
+    def navigate_to_places(self, state: Optional[str] = None) -> NavigationResult:
+        """Доводит приложение до экрана мест из текущего состояния (state - уже определённое)"""
+        self.invalidate_ui()
+        # Версия приложения (часть ключа калибровки) перечитывается при каждой навигации
+        self.app_version = None
+        self._home_fingerprint = None
+        if self.debug_ring is not None:
+            self.debug_ring.start_run(state or 'navigation')
+        navigator = Navigator(self.navigation_state, self._navigation_edges(), self.nav_stats)
+        result = navigator.run(PLACES, state)
+        print(f"🧭 Навигация: {result!r}")
+        
+        if result:
+            # Экран мест открыт - ждём, пока он перестанет меняться
+            self.wait_screen_stable(timeout=8, budget=5)
+            if STOPPED in result.path or not self.cold_started_at:
+                self.cold_started_at = time.time()
+        else:
+            self.cold_started_at = 0.0
+        
+        # Делаем финальный скриншот
+        self.debug_screenshot('places_screen.png')
+        print(f"⏱ Навигация: {self.wait_log.summary()}")
+        print(f"🧭 Переходы: {self.nav_stats.summary()}")
+        print(f"📄 {self.ui_dumper.stats.summary()}")
+        print(f"🧩 Известные экраны: {self.screens.summary()}")
+        return result
+    
+    def _nav_launch(self, timeout: float) -> bool:
+        """Запуск приложения (или вывод на передний план) и ожидание фокуса"""
         print("📱 Запускаю приложение...")
-        # Запускаем приложение
         if not self.launch_app():
             print("⚠️ Не удалось подтвердить запуск, но продолжаю...")
-            # Продолжаем, так как приложение может быть уже запущено
-        
         print("⏳ Жду загрузки приложения...")
-        time.sleep(5)  # Увеличиваем время ожидания загрузки
+        return bool(self.wait_app_focused(timeout=timeout, budget=1 + 5))
+    
+    def _nav_wait_splash(self, timeout: float) -> bool:
+        """Ждёт, пока на экране заставки появятся элементы (какой это экран - решает навигация)"""
+        def probe():
+            self.invalidate_ui()
+            return self.navigation_state() != SPLASH
+        return bool(self.wait_for('заставка закрылась', probe, timeout))
+    
+    def _nav_wait_loaded(self, timeout: float) -> bool:
+        """Ждёт, пока на экране появятся элементы известного экрана (заставка, загрузка)"""
+        def probe():
+            self.invalidate_ui()
+            return self.navigation_state() not in (SPLASH, UNKNOWN)
+        return bool(self.wait_for('экран загружен', probe, timeout))
+    
+    def _nav_pin(self, timeout: float) -> bool:
+        """Ввод PIN и ожидание главного экрана (или сразу экрана мест)"""
+        from config import PIN_CODE
         
         # Делаем скриншот для отладки
-        self.get_screenshot('before_pin.png')
-        print("📸 Скриншот до ввода PIN сохранен: before_pin.png")
+        self.debug_screenshot('before_pin.png')
         
-        # Вводим PIN-код
         print("🔐 Ввожу PIN-код...")
         if not self.input_pin(PIN_CODE):
             print("❌ Ошибка при вводе PIN")
             return False
         
-        # Делаем скриншот после ввода PIN
-        time.sleep(3)  # Увеличиваем задержку после ввода PIN
-        self.get_screenshot('after_pin.png')
-        print("📸 Скриншот после ввода PIN сохранен: after_pin.png")
+        # Ждём появления кнопки 'Места' после обработки PIN (раньше - 1.5 + 3 + 5 с пауз)
+        print("⏳ Жду экран с кнопкой 'Места'...")
+        home = self.wait_screen((HOME, PLACES), "кнопка 'Места'", timeout=timeout, budget=1.5 + 3 + 5)
+        self._confirm_keypad(bool(home))
+        self.debug_screenshot('after_pin.png')
+        return bool(home)
+    
+    def _nav_places(self, timeout: float) -> bool:
+        """С главного экрана - на экран мест: кнопка из калибровки, из дампа, затем перебор способов"""
+        ui_xml = self._ui_xml or self.get_ui_dump(save_to_file=True)
+        tree = self.ui_tree(ui_xml) if ui_xml else None
+        # Отпечаток главного экрана запоминается, когда на открытом с него экране найдены места
+        home_fingerprint = tree.fingerprint() if tree is not None else None
+        
+        # Кнопка 'Места' из калибровки: одно нажатие и проверка экрана мест
+        key = self.calibration_key()
+        opened = None
+        button = self.calibration.get(key, 'places_button')
+        if button:
+            print(f"🎯 Нажимаю кнопку 'Места' из калибровки ({button[0]}, {button[1]})")
+            opened = self.tap(*button) and self._wait_places_opened(timeout=min(timeout, 10))
+            if not opened:
+                self.calibration.forget(key, 'places_button')
+                ui_xml = self.get_ui_dump(save_to_file=True)
+                tree = self.ui_tree(ui_xml) if ui_xml else None
+        
+        if not opened:
+            # Калибровка: кнопка ищется в уже полученном дампе экрана, без новых дампов и перебора
+            found = find_places_button(tree, PLACES_TEXTS) if tree is not None else None
+            if found:
+                print(f"🎯 Кнопка 'Места' найдена в UI dump: ({found[0]}, {found[1]})")
+                opened = self.tap(*found) and self._wait_places_opened(timeout=timeout)
+                if opened:
+                    self.calibration.put(key, 'places_button', found)
+        
+        if not opened:
+            print("🪑 Калибровка не помогла, перебираю способы нажатия кнопки 'Места'...")
+            if self._search_places_button(ui_xml):
+                print(f"✅ Кнопка 'Места' нажата, жду экран с местами...")
+                opened = self._wait_places_opened(timeout=timeout)
+            else:
+                print(f"❌ Не удалось нажать кнопку 'Места' после всех попыток")
+                print(f"💡 Проверьте скриншоты и убедитесь, что координаты правильные")
+                print(f"💡 Используйте /debug_clickable для просмотра всех кликабельных элементов")
         
+        if opened:
+            self._home_fingerprint = home_fingerprint
+        return bool(opened)
+    
+    def _nav_dismiss_error(self, timeout: float) -> bool:
+        """Закрывает окно ошибки: кнопка 'Повторить'/'OK' или 'Назад'"""
+        tree = self.ui_tree()
+        button = tree.first(ERROR_BUTTON) if tree is not None else None
+        if button is not None:
+            print(f"⚠️ Окно ошибки, нажимаю '{button.text or button.desc}'")
+            self.tap(*button.center)
+        else:
+            print("⚠️ Окно ошибки, нажимаю 'Назад'")
+            self.input_key('KEYCODE_BACK')
+        return bool(self.wait_screen_stable(timeout=timeout))
+    
+    def _nav_restart(self, timeout: float) -> bool:
+        """Запасной переход: приложение закрывается, навигация продолжается с запуска"""
+        print("🔄 Переход не помог, перезапускаю приложение...")
+        return self.close_app()
+    
+    def _wait_places_opened(self, timeout: float = 20) -> WaitResult:
+        """Ждёт экран с местами после нажатия кнопки 'Места' (раньше - 3 + 3 с пауз)"""
+        opened = self.wait_screen((PLACES,), 'экран с местами', timeout=timeout, budget=3 + 3)
+        if opened:
+            print("✅ Экран с местами открыт!")
+        else:
+            print("⚠️ Не найдено индикаторов экрана с местами, возможно нажатие не сработало")
+        return opened
+    
+    def _search_places_button(self, ui_xml: str) -> bool:
+        """Поиск кнопки 'Места' перебором: по тексту, UI Automator и координатам из config"""
         # Нажимаем кнопку "Места" через поиск по тексту
         print("🪑 Ищу кнопку 'Места' через UI Automator...")
         
-        # Ждем, чтобы экран стабилизировался после ввода PIN
-        print("⏳ Жду стабилизации экрана...")
-        time.sleep(5)  # Даем время на загрузку
-        
         # Делаем скриншот перед поиском
-        self.get_screenshot('before_places_search.png')
-        print("📸 Скриншот перед поиском кнопки сохранен")
+        self.debug_screenshot('before_places_search.png')
         
         # Для отладки: находим все кликабельные элементы
         print("🔍 Ищу все кликабельные элементы на экране (для отладки)...")
@@ -642,40 +1168,20 @@ class AndroidAutomation:
                 print(f"  {i}. text='{elem['text']}', content-desc='{elem['content_desc']}', "
                       f"resource-id='{elem['resource_id']}', center={elem['center']}")
         
-        # Пробуем найти кнопку по разным вариантам текста
-        places_texts = ['Места', 'места', 'МЕСТА', 'Places', 'places', 'Место', 'место']
         success = False
         
-        # Сначала получаем UI dump один раз
-        print("📄 Получаю UI dump...")
-        ui_xml = self.get_ui_dump(save_to_file=True)
-        
         if ui_xml:
             print(f"✅ UI dump получен ({len(ui_xml)} символов)")
-            # Сохраняем для отладки
-            with open('ui_dump_debug.xml', 'w', encoding='utf-8') as f:
-                f.write(ui_xml)
-            print("📄 UI dump сохранен в ui_dump_debug.xml для отладки")
+            self.debug_dump('ui_dump_debug.xml', ui_xml)
         else:
             print("⚠️ Не удалось получить UI dump")
         
-        for text in places_texts:
+        for text in PLACES_TEXTS:
             print(f"🔍 Ищу элемент с текстом '{text}'...")
             # Используем улучшенный метод tap_by_text
             success = self.tap_by_text(text)
             if success:
-                time.sleep(3)
-                self.get_screenshot('after_places_tap_by_text.png')
-                print("📸 Скриншот после нажатия сохранен")
-                
-                # Проверяем, изменился ли экран - получаем новый UI dump
-                new_ui_xml = self.get_ui_dump()
-                if new_ui_xml and new_ui_xml != ui_xml:
-                    print("✅ Экран изменился после нажатия!")
-                else:
-                    print("⚠️ Экран не изменился, возможно нажатие не сработало")
                 break
-            time.sleep(1)
         
         # Если не нашли по тексту, пробуем старый метод с координатами
         if not success:
@@ -685,22 +1191,22 @@ class AndroidAutomation:
             importlib.reload(config)
             from config import PLACES_BUTTON
             
-            x, y = PLACES_BUTTON
+            x, y = self.scaled(*PLACES_BUTTON)
             print(f"🪑 Нажимаю кнопку 'Места' на координатах ({x}, {y})")
             
             # Делаем скриншот перед нажатием
-            self.get_screenshot('before_places_tap_coords.png')
+            self.debug_screenshot('before_places_tap_coords.png')
             
             # Метод 1: Обычное нажатие несколько раз
             for attempt in range(5):
                 print(f"Попытка {attempt + 1}/5 на ({x}, {y})...")
                 if self.tap(x, y):
-                    time.sleep(2)
+                    self._sleep(2)
                     # Проверяем, изменился ли экран (делаем скриншот)
-                    self.get_screenshot('after_places_tap_coords.png')
+                    self.debug_screenshot('after_places_tap_coords.png')
                     success = True
                     break
-                time.sleep(0.5)
+                self._sleep(0.5)
             
             # Метод 2: Нажатие в нескольких точках вокруг кнопки
             if not success:
@@ -721,12 +1227,11 @@ class AndroidAutomation:
                     tap_x, tap_y = x + offset_x, y + offset_y
                     print(f"Попытка нажатия на ({tap_x}, {tap_y})...")
                     if self.tap(tap_x, tap_y):
-                        time.sleep(2)
-                        self.get_screenshot(f'after_tap_offset_{offset_x}_{offset_y}.png')
-                        print(f"📸 Скриншот после нажатия на ({tap_x}, {tap_y}) сохранен")
+                        self._sleep(2)
+                        self.debug_screenshot(f'after_tap_offset_{offset_x}_{offset_y}.png')
                         success = True
                         break
-                    time.sleep(0.5)
+                    self._sleep(0.5)
             
             # Метод 3: Долгое нажатие
             if not success:
@@ -734,11 +1239,11 @@ class AndroidAutomation:
                 for attempt in range(3):
                     print(f"Попытка {attempt + 1}/3 долгого нажатия на ({x}, {y})...")
                     if self.long_tap(x, y, duration=800):
-                        time.sleep(2)
-                        self.get_screenshot(f'after_long_tap_attempt_{attempt + 1}.png')
+                        self._sleep(2)
+                        self.debug_screenshot(f'after_long_tap_attempt_{attempt + 1}.png')
                         success = True
                         break
-                    time.sleep(1)
+                    self._sleep(1)
             
             # Метод 4: Комбинация - свайп к кнопке и нажатие
             if not success:
@@ -746,226 +1251,277 @@ class AndroidAutomation:
                 # Свайп от центра экрана к кнопке
                 screen_size = self.get_screen_size()
                 center_x, center_y = screen_size[0] // 2, screen_size[1] // 2
-                self.swipe(center_x, center_y, x, y, duration=200)
-                time.sleep(1)
-                if self.tap(x, y):
-                    time.sleep(2)
-                    self.get_screenshot('after_swipe_and_tap.png')
+                script = GestureScript().swipe(center_x, center_y, x, y, duration=200).wait(1).tap(x, y)
+                if self.run_gestures(script)['ok']:
+                    self._sleep(2)
+                    self.debug_screenshot('after_swipe_and_tap.png')
                     success = True
         
-        # Проверяем, действительно ли экран изменился
-        if success:
-            print(f"✅ Кнопка 'Места' нажата, проверяю изменение экрана...")
-            time.sleep(3)
-            
-            # Получаем новый UI dump для проверки
-            new_ui_xml = self.get_ui_dump()
-            if new_ui_xml:
-                # Ищем индикаторы того, что мы на экране с местами
-                # Ключевые слова: место, seat, занято, свободно, бронирование
-                indicators = ['место', 'seat', 'занято', 'свободно', 'бронирование', 'booking']
-                found_indicator = False
-                for indicator in indicators:
-                    if indicator.lower() in new_ui_xml.lower():
-                        found_indicator = True
-                        print(f"✅ Найден индикатор '{indicator}' - экран с местами открыт!")
-                        break
-                
-                if not found_indicator:
-                    print("⚠️ Не найдено индикаторов экрана с местами, возможно нажатие не сработало")
+        return success
+    
+    def is_on_places_screen(self, xml: Optional[str] = None) -> bool:
+        """Приложение в фокусе и открыт экран с местами (по отпечатку или индикаторам)"""
+        if not self.is_app_focused():
+            return False
+        xml = self.get_ui_dump() if xml is None else xml
+        return bool(xml) and self.screen_state(xml) == PLACES
+    
+    def current_seat_layout(self) -> Optional[SeatLayout]:
+        """Раскладка мест последнего поиска по дампу на этом устройстве, если она ещё в кэше"""
+        if not self.seat_layouts.enabled or not self._seat_layout_key:
+            return None
+        return self.seat_layouts.get(self._seat_layout_key)
+    
+    def check_places_frame(self, layout: SeatLayout) -> Optional[str]:
+        """Экран мест по кадру и раскладке из кэша, без UI dump: None - подтверждён, иначе причина"""
+        frame = self.capture_frame(self.calibration.get(self.calibration_key(), 'seat_region'))
+        if frame is None:
+            return 'кадр не получен'
+        return layout.check(frame, classify_seats(frame, layout.centers))
+    
+    def wait_refreshed(self, layout: Optional[SeatLayout], before: Optional[Frame], before_xml: str,
+                       timeout: float) -> WaitResult:
+        """Ждёт подтверждения обновления на месте: сначала признак обновления, затем устойчивый экран мест.
+        
+        Признак - кадр, заметно отличный от кадра before до жеста (индикатор обновления,
+        сдвиг схемы, другие статусы мест), а с раскладкой layout ещё и другие статусы мест
+        или кадр, который не подошёл к раскладке; без раскладки - UI dump, отличный от before_xml.
+        Устойчивый экран - два кадра подряд без заметной разницы с одинаковыми статусами мест
+        (без раскладки - с одинаковым UI dump экрана мест). Без признака обновления
+        экран до жеста (приложение ещё не начало загрузку) за обновлённый не принимается.
+        """
+        skip_top = int((self.calibrate() or REFERENCE_SCREEN)[1] * STATUS_BAR_SHARE)
+        before_statuses = None
+        if layout is not None and before is not None:
+            before_statuses = [v['status'] for v in classify_seats(before, layout.centers)]
+        state = {'changed': False, 'frame': None, 'signature': None}
+        
+        def probe():
+            frame = self.capture_frame()
+            if frame is None:
+                return None
+            changed = before is None or frames_differ(frame, before, skip_top)
+            if layout is not None:
+                verdicts = classify_seats(frame, layout.centers)
+                signature = [v['status'] for v in verdicts]
+                on_places = layout.check(frame, verdicts) is None
+                changed = changed or not on_places or signature != before_statuses
             else:
-                print("⚠️ Не удалось получить UI dump для проверки")
-        else:
-            print(f"❌ Не удалось нажать кнопку 'Места' после всех попыток")
-            print(f"💡 Проверьте скриншоты и убедитесь, что координаты правильные")
-            print(f"💡 Используйте /debug_clickable для просмотра всех кликабельных элементов")
-        
-        time.sleep(5)  # Время ожидания открытия экрана с местами
+                signature = self.get_ui_dump()
+                on_places = bool(signature) and self.screen_state(signature) == PLACES
+                changed = changed or signature != before_xml
+            state['changed'] = state['changed'] or changed
+            settled = (on_places and state['changed'] and signature == state['signature']
+                       and state['frame'] is not None and not frames_differ(frame, state['frame'], skip_top))
+            state['frame'], state['signature'] = frame, (signature if on_places else None)
+            return settled
+        result = self.wait_for('обновление экрана мест', probe, timeout)
+        if not result:
+            print("⚠️ Признаков обновления экрана мест нет" if not state['changed']
+                  else "⚠️ Экран мест после обновления не устоялся")
+        return result
+    
+    def refresh_places(self) -> bool:
+        """Обновляет данные экрана мест на месте: потянуть вниз (swipe) или повторно открыть вкладку (tab).
         
-        # Делаем финальный скриншот
-        self.get_screenshot('places_screen.png')
-        print("📸 Скриншот экрана с местами сохранен: places_screen.png")
+        Обновление принимается только с признаком, что экран действительно обновился
+        (wait_refreshed); с раскладкой мест в кэше проверка идёт по кадрам, без неё -
+        по кадрам и UI dump. Без признака - False, вызывающий перезапускает приложение.
+        """
+        from config import PLACES_BUTTON
         
-        return True
+        if self.debug_ring is not None:
+            self.debug_ring.start_run('warm')
+        if WARM_REFRESH == 'tab':
+            button = self.calibration.get(self.calibration_key(), 'places_button') or self.scaled(*PLACES_BUTTON)
+            script = GestureScript().tap(*button)
+        else:
+            width, height = self.calibrate() or REFERENCE_SCREEN
+            script = GestureScript().swipe(width // 2, height * 3 // 10, width // 2, height * 7 // 10, 400)
+        layout = self.current_seat_layout()
+        # Экран до жеста - для сравнения; дамп без раскладки обычно уже есть после navigation_state
+        before = self.capture_frame()
+        before_xml = '' if layout is not None else (self._ui_xml or self.get_ui_dump())
+        if not self.run_gestures(script)['ok']:
+            return False
+        if not self.wait_refreshed(layout, before, before_xml, timeout=10):
+            return False
+        # Без раскладки последний снимок - устоявшийся UI dump экрана мест
+        return self.is_app_focused() if layout is not None else self.is_on_places_screen(self._ui_xml)
+    
+    def ensure_places_screen(self) -> str:
+        """Открывает экран мест с актуальными данными.
+        
+        В тёплом режиме навигация идёт из текущего состояния приложения:
+        экран мест обновляется на месте ('warm'), с другого экрана выполняются
+        только недостающие переходы ('resumed', или 'cold', если приложение
+        пришлось запускать). Полный перезапуск с PIN ('cold') - без тёплого
+        режима, при неудачном обновлении, перезапуске старше WARM_MAX_AGE
+        и на экране мест неизвестной давности.
+        
+        Если на устройстве есть раскладка мест из кэша, экран мест узнаётся
+        по кадру (SeatLayout.check): установившийся захват обходится без UI dump.
+        """
+        self.wait_log = WaitLog()
+        if not WARM_APP_MODE:
+            self.open_app_and_places()
+            return 'cold'
+        if self.cold_started_at and time.time() - self.cold_started_at >= WARM_MAX_AGE:
+            print(f"ℹ️ Последний перезапуск старше {WARM_MAX_AGE} с, перезапускаю приложение")
+            self.open_app_and_places()
+            return 'cold'
+        self.invalidate_ui()
+        state = None
+        layout = self.current_seat_layout() if self.cold_started_at else None
+        if layout is not None and self.is_app_focused():
+            problem = self.check_places_frame(layout)
+            if problem is None:
+                state = PLACES
+            else:
+                # Раскладка не подходит к экрану - дальше экран и места определяются по дампу
+                self.seat_layouts.count('rejected')
+                self.seat_layouts.forget(layout.key)
+                print(f"🗺 Экран мест по кадру не подтвердился: {problem}")
+        if state is None:
+            state = self.navigation_state()
+        if state == PLACES:
+            if not self.cold_started_at:
+                print("ℹ️ Экран мест открыт неизвестно когда, перезапускаю приложение")
+            elif self.refresh_places():
+                print("🔥 Экран мест обновлён без перезапуска приложения")
+                return 'warm'
+            else:
+                print("⚠️ Обновление на месте не подтвердилось, перезапускаю приложение")
+            self.open_app_and_places()
+            return 'cold'
+        print(f"ℹ️ Приложение в состоянии '{state}', выполняю только нужные переходы")
+        result = self.navigate_to_places(state)
+        return 'cold' if STOPPED in result.path else 'resumed'
     
     def open_places(self) -> bool:
         """Открывает экран с местами (если приложение уже открыто)"""
         from config import PLACES_BUTTON
         
-        time.sleep(1)
-        self.tap(*PLACES_BUTTON)
-        time.sleep(2)
-        return True
+        button = self.calibration.get(self.calibration_key(), 'places_button') or self.scaled(*PLACES_BUTTON)
+        return self.run_gestures(GestureScript().wait(1).tap(*button).wait(2))['ok']
     
-    def analyze_place_color(self, screenshot_path: str, center_x: int, center_y: int, place_number: str = '') -> str:
-        """Анализирует цвет места на скриншоте для определения статуса
+    def analyze_place_color(self, frame: Frame, center_x: int, center_y: int, place_number: str = '') -> str:
+        """Статус одного места на кадре: 'occupied' (серый фон), 'free' (белый) или 'unknown'.
         
-        Args:
-            screenshot_path: Путь к скриншоту
-            center_x, center_y: Координаты центра места
-            place_number: Номер места для логирования
-            
-        Returns:
-            'occupied' если серое (занято), 'free' если белое (свободно), 'unknown' если не определено
+        Для всех мест сразу - classify_seats (get_places_status).
         """
-        try:
-            from PIL import Image
-            import numpy as np
-            
-            # Открываем скриншот
-            img = Image.open(screenshot_path)
-            img_array = np.array(img)
-            
-            # Получаем цвет пикселя в центре места
-            width, height = img.size
-            
-            # Проверяем границы
-            if center_x < 0 or center_x >= width or center_y < 0 or center_y >= height:
-                return 'unknown'
-            
-            # Анализируем ФОН места, избегая текста и рамок
-            # Берем несколько точек по краям места (где обычно фон, а не текст)
-            # Избегаем центра, где может быть текст с номером
-            sample_points = []
-            # Анализируем края места (фон), а не центр (где текст)
-            offsets = [
-                (-12, -12),  # Левый верхний угол (фон)
-                (12, -12),   # Правый верхний угол (фон)
-                (-12, 12),   # Левый нижний угол (фон)
-                (12, 12),    # Правый нижний угол (фон)
-                (-15, 0),    # Левая сторона (фон)
-                (15, 0),     # Правая сторона (фон)
-                (0, -15),   # Верхняя сторона (фон)
-                (0, 15),    # Нижняя сторона (фон)
-            ]
-            
-            brightnesses = []
-            color_diffs = []
-            
-            for offset_x, offset_y in offsets:
-                x = center_x + offset_x
-                y = center_y + offset_y
-                
-                if x < 0 or x >= width or y < 0 or y >= height:
-                    continue
-                
-                # Берем область побольше для анализа фона (7x7 пикселей)
-                x_start = max(0, x - 3)
-                x_end = min(width, x + 4)
-                y_start = max(0, y - 3)
-                y_end = min(height, y + 4)
-                
-                region = img_array[y_start:y_end, x_start:x_end]
-                
-                if len(region) == 0 or len(region[0]) == 0:
-                    continue
-                
-                # Вычисляем средний цвет для этой области
-                avg_color = np.mean(region, axis=(0, 1))
-                
-                if len(avg_color) >= 3:
-                    r, g, b = avg_color[0], avg_color[1], avg_color[2]
-                    brightness = np.mean([r, g, b])
-                    color_diff = max(r, g, b) - min(r, g, b)
-                    
-                    brightnesses.append(brightness)
-                    color_diffs.append(color_diff)
-            
-            if not brightnesses:
-                return 'unknown'
-            
-            # Используем медиану для более устойчивого определения
-            median_brightness = np.median(brightnesses)
-            median_color_diff = np.median(color_diffs)
-            avg_brightness = np.mean(brightnesses)
-            avg_color_diff = np.mean(color_diffs)
-            
-            # Используем комбинацию медианы и среднего для более точного определения
-            final_brightness = (median_brightness * 0.6 + avg_brightness * 0.4)
-            final_color_diff = (median_color_diff * 0.6 + avg_color_diff * 0.4)
-            
-            # ТОЧНЫЕ пороги на основе анализа ФОНА места
-            # Занятые места: серый фон (темный, низкая насыщенность)
-            # Свободные места: белый фон (светлый, низкая насыщенность)
-            # Используем строгие пороги для минимизации ошибок
-            is_occupied = False
-            is_free = False
-            
-            # Критерии для занятого места (серый фон)
-            # Серый фон обычно имеет яркость 100-160 и очень низкую насыщенность
-            if final_brightness < 155:
-                # Низкая яркость - проверяем насыщенность
-                if final_color_diff < 32:  # Серый цвет (низкая разница между RGB)
-                    is_occupied = True
-                elif final_brightness < 110:
-                    # Очень темное - точно занято
-                    is_occupied = True
-                elif final_brightness < 135 and final_color_diff < 20:
-                    # Темное и очень однородное - занято
-                    is_occupied = True
-            
-            # Критерии для свободного места (белый фон)
-            # Белый фон обычно имеет яркость > 180 и низкую насыщенность
-            if final_brightness > 180:
-                # Высокая яркость - свободно
-                is_free = True
-            elif final_brightness > 165:
-                # Средняя-высокая яркость - свободно
-                is_free = True
-            
-            # Пограничная зона (155-180) - используем консервативный подход
-            if not is_occupied and not is_free:
-                # Консервативный подход - только явно темные и однородные считаем занятыми
-                if final_brightness < 150:
-                    # Ближе к темному - занято (но только если очень однородное)
-                    if final_color_diff < 25:
-                        is_occupied = True
-                    else:
-                        # Цветное темное - свободно
-                        is_free = True
-                else:
-                    # Все что >= 150 - свободно
-                    is_free = True
-            
-            result = 'occupied' if is_occupied else ('free' if is_free else 'unknown')
-            
-            # Детальное логирование для отладки (для всех мест)
-            if place_number and place_number.isdigit():
-                status_emoji = '🔴' if result == 'occupied' else '🟢' if result == 'free' else '⚪'
-                print(f"  {status_emoji} Место {place_number:>2}: яркость={final_brightness:5.1f} (мед={median_brightness:5.1f}), "
-                      f"разница={final_color_diff:4.1f} (мед={median_color_diff:4.1f}) -> {result}")
-                # Дополнительная информация для отладки
-                if result == 'occupied':
-                    print(f"      ⚠️ Определено как занятое: яркость < 155 или (яркость < 150 и разница < 25)")
-                elif result == 'free':
-                    print(f"      ✅ Определено как свободное: яркость >= 150 или яркость > 165")
+        verdict = classify_seats(frame, [(center_x, center_y)])[0]
+        if place_number and place_number.isdigit():
+            self._log_seat_verdict(place_number, verdict)
+        return verdict['status']
+    
+    @staticmethod
+    def _log_seat_verdict(place_number: str, verdict: Dict) -> None:
+        """Строка лога по месту: яркость и разница каналов фона, статус и уверенность"""
+        status = verdict['status']
+        status_emoji = '🔴' if status == 'occupied' else '🟢' if status == 'free' else '⚪'
+        if verdict['brightness'] is None:
+            print(f"  {status_emoji} Место {place_number:>2}: вне кадра -> {status}")
+            return
+        print(f"  {status_emoji} Место {place_number:>2}: яркость={verdict['brightness']:5.1f}, "
+              f"разница={verdict['color_diff']:4.1f} -> {status} (уверенность {verdict['confidence']:.2f})")
+    
+    @staticmethod
+    def _place_record(node, place_type: str) -> Dict:
+        """Запись о месте из узла снимка (без ссылок на разобранное дерево)"""
+        return {
+            'text': node.text,
+            'content_desc': node.desc,
+            'resource_id': node.resource_id,
+            'bounds': node.bounds,
+            'center': node.center,
+            'size': node.size,
+            'type': place_type,
+            'clickable': node.clickable
+        }
+    
+    def _find_seat_elements(self, tree: UITree, region: Optional[List[int]]) -> List[Dict]:
+        """Места на снимке экрана: элементы с номерами и элементы размера места в области схемы"""
+        # Сначала ищем элементы с номерами (1-25 для ПК, TV1 для телевизора)
+        # Места без номера: размер 50-300 пикселей в области схемы
+        # (без калибровки - 800 < y < 2000 для разрешения 1440x2560); кнопки навигации и шапка исключаются
+        seat_area = in_region(*region) if region else in_region(0, 801, 10 ** 6, 1999)
+        all_elements = []
+        for node in tree.nodes:
+            width, height = node.size
+            text_combined = (node.text + ' ' + node.desc).lower()
             
-            return result
+            # Ищем элементы с номерами от 1 до 25 (ПК места) или TV
+            num_match = re.search(r'\d+', node.text + node.desc)
+            place_type = None
+            if num_match and 1 <= int(num_match.group()) <= 25:
+                place_type = 'tv' if 'tv' in text_combined or 'тв' in text_combined else 'pc'
+            elif 50 < width < 300 and 50 < height < 300 and seat_area.match(node):
+                place_type = 'pc'
             
-        except Exception as e:
-            print(f"⚠️ Ошибка при анализе цвета места {place_number} на ({center_x}, {center_y}): {e}")
-            import traceback
-            traceback.print_exc()
-            return 'unknown'
+            if place_type:
+                all_elements.append(self._place_record(node, place_type))
+        
+        print(f"🔍 Найдено {len(all_elements)} потенциальных мест для анализа")
+        
+        if len(all_elements) == 0:
+            print("⚠️ Не найдено мест в UI dump. Пробую альтернативный поиск...")
+            # Альтернативный поиск - номера мест в content-desc (как в логах: '4', '8', '12', '16', '19', '20', '3')
+            for node in tree.find(number_desc(1, 25)):
+                all_elements.append(self._place_record(node, 'pc'))
+                print(f"  ✅ Найдено место по номеру: {node.desc} на {node.center}")
+        return all_elements
+    
+    def _cached_seat_layout(self, frame: Frame) -> Optional[SeatLayout]:
+        """Раскладка мест для текущего экрана без нового дампа.
+        
+        Ключ - отпечаток текущего снимка (навигация и обновление на месте уже
+        подтвердили экран мест по дампу), без снимка - ключ последнего поиска мест.
+        """
+        if not self.seat_layouts.enabled:
+            return None
+        tree = self.ui_tree() if self._ui_xml else None
+        key = layout_key(tree.fingerprint(), frame.screen_size) if tree is not None and len(tree) else self._seat_layout_key
+        return self.seat_layouts.get(key) if key else None
     
     def get_places_status(self) -> Dict:
-        """Получает статус мест (занято/свободно) через UI Automator и анализ скриншота"""
-        import xml.etree.ElementTree as ET
-        import re
+        """Получает статус мест (занято/свободно) через UI Automator и анализ скриншота.
         
-        # Делаем скриншот для анализа цветов
-        screenshot_path = 'places_analysis.png'
-        if not self.get_screenshot(screenshot_path):
+        Раскладка мест (номер, тип, центр, размер) берётся из кэша по отпечатку экрана
+        мест и разрешению: повторный захват - только кадр и классификация. Раскладка,
+        которая не подтвердилась по кадру (SeatLayout.check), ищется заново по UI dump.
+        """
+        # Кадр для анализа цветов: сырой framebuffer в памяти, в области мест из калибровки
+        region = self.calibration.get(self.calibration_key(), 'seat_region')
+        frame = self.capture_frame(region)
+        if frame is None:
             return {'error': 'Не удалось сделать скриншот'}
+        screenshot_path = self.debug_screenshot('places_analysis.png', frame)
+        
+        all_elements, verdicts, tree = None, None, None
+        layout = self._cached_seat_layout(frame)
+        if layout is not None:
+            self._check('classify')
+            verdicts = classify_seats(frame, layout.centers)
+            problem = layout.check(frame, verdicts)
+            if problem is None:
+                self.seat_layouts.count('hits')
+                all_elements = layout.places
+                print(f"🗺 Раскладка мест из кэша ({len(all_elements)} мест), без UI dump")
+            else:
+                self.seat_layouts.count('rejected')
+                self.seat_layouts.forget(layout.key)
+                print(f"🗺 Раскладка мест из кэша не подтвердилась: {problem}. Ищу места по UI dump")
         
-        # Получаем UI dump
-        ui_xml = self.get_ui_dump()
-        if not ui_xml:
-            return {'error': 'Не удалось получить UI dump', 'screenshot': screenshot_path}
+        if all_elements is None:
+            # Получаем UI dump - снимок экрана мест, по которому идут все запросы
+            ui_xml = self.get_ui_dump()
+            if not ui_xml:
+                return {'error': 'Не удалось получить UI dump', 'screenshot': screenshot_path}
         
         try:
-            # Парсим XML
-            root = ET.fromstring(ui_xml)
+            # Область мест из калибровки; без неё - полоса экрана для разрешения 1440x2560
+            key = self.calibration_key()
             
             places_info = {
                 'timestamp': time.time(),
@@ -978,138 +1534,37 @@ class AndroidAutomation:
                 'free_pc': 0,
                 'occupied_tv': 0,
                 'free_tv': 0,
-                'screenshot': screenshot_path
+                'screenshot': screenshot_path,
+                'layout': 'cache' if all_elements is not None else 'scan'
             }
             
-            # Ищем все элементы, которые могут быть местами
-            # Сначала ищем элементы с номерами (1-25 для ПК, TV1 для телевизора)
-            all_elements = []
-            for elem in root.iter():
-                text = elem.get('text', '')
-                content_desc = elem.get('content-desc', '')
-                resource_id = elem.get('resource-id', '')
-                bounds = elem.get('bounds', '')
-                clickable = elem.get('clickable', 'false').lower() == 'true'
+            if all_elements is None:
+                self.seat_layouts.count('scans')
+                tree = self._ui_tree = UITree.from_xml(ui_xml)
+                # Ищем все элементы, которые могут быть местами
+                all_elements = self._find_seat_elements(tree, region)
+                print(f"📊 Всего найдено {len(all_elements)} мест для анализа")
                 
-                if not bounds:
-                    continue
-                
-                # Извлекаем координаты
-                match = re.search(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds)
-                if not match:
-                    continue
-                
-                x1, y1 = int(match.group(1)), int(match.group(2))
-                x2, y2 = int(match.group(3)), int(match.group(4))
-                center_x = (x1 + x2) // 2
-                center_y = (y1 + y2) // 2
-                width = x2 - x1
-                height = y2 - y1
-                
-                # Сохраняем все элементы с номерами или подходящим размером
-                text_combined = (text + ' ' + content_desc).lower()
-                
-                # Ищем элементы с номерами от 1 до 25 (ПК места) или TV
-                num_match = re.search(r'\d+', text + content_desc)
-                is_place = False
-                place_type = None
-                
-                if num_match:
-                    num = int(num_match.group())
-                    if 1 <= num <= 25:
-                        # Проверяем, не TV ли это
-                        if 'tv' in text_combined or 'тв' in text_combined:
-                            place_type = 'tv'
-                            is_place = True
-                        else:
-                            place_type = 'pc'
-                            is_place = True
-                    elif num == 1 and ('tv' in text_combined or 'тв' in text_combined):
-                        place_type = 'tv'
-                        is_place = True
-                
-                # Если не нашли по номеру, проверяем размер и расположение
-                # Места обычно небольшие квадратные элементы в определенной области экрана
-                if not is_place:
-                    # Места обычно находятся в нижней части экрана (y > 800 для разрешения 1440x2560)
-                    # и имеют размер примерно 50-200 пикселей
-                    if 50 < width < 300 and 50 < height < 300 and center_y > 800:
-                        # Проверяем, не является ли это кнопкой навигации или другим UI элементом
-                        # Исключаем большие элементы и элементы в верхней части
-                        if center_y < 2000:  # Не слишком низко
-                            place_type = 'pc'
-                            is_place = True
-                
-                if is_place and place_type:
-                    all_elements.append({
-                        'elem': elem,
-                        'text': text,
-                        'content_desc': content_desc,
-                        'resource_id': resource_id,
-                        'bounds': bounds,
-                        'center': (center_x, center_y),
-                        'size': (width, height),
-                        'type': place_type,
-                        'clickable': clickable
-                    })
+                # Статус всех мест - одной пакетной классификацией по кадру
+                self._check('classify')
+                verdicts = classify_seats(frame, [elem_data['center'] for elem_data in all_elements])
             
-            print(f"🔍 Найдено {len(all_elements)} потенциальных мест для анализа")
-            
-            if len(all_elements) == 0:
-                print("⚠️ Не найдено мест в UI dump. Пробую альтернативный поиск...")
-                # Альтернативный поиск - ищем все элементы с номерами
-                for elem in root.iter():
-                    text = elem.get('text', '')
-                    content_desc = elem.get('content-desc', '')
-                    bounds = elem.get('bounds', '')
-                    
-                    if not bounds:
-                        continue
-                    
-                    # Ищем элементы с номерами в content-desc (как в логах: '4', '8', '12', '16', '19', '20', '3')
-                    if content_desc and content_desc.strip().isdigit():
-                        num = int(content_desc.strip())
-                        if 1 <= num <= 25:
-                            match = re.search(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]', bounds)
-                            if match:
-                                x1, y1 = int(match.group(1)), int(match.group(2))
-                                x2, y2 = int(match.group(3)), int(match.group(4))
-                                center_x = (x1 + x2) // 2
-                                center_y = (y1 + y2) // 2
-                                width = x2 - x1
-                                height = y2 - y1
-                                
-                                all_elements.append({
-                                    'elem': elem,
-                                    'text': text,
-                                    'content_desc': content_desc,
-                                    'resource_id': '',
-                                    'bounds': bounds,
-                                    'center': (center_x, center_y),
-                                    'size': (width, height),
-                                    'type': 'pc',
-                                    'clickable': elem.get('clickable', 'false').lower() == 'true'
-                                })
-                                print(f"  ✅ Найдено место по номеру: {content_desc} на ({center_x}, {center_y})")
-            
-            print(f"📊 Всего найдено {len(all_elements)} мест для анализа")
-            
-            # Анализируем каждый элемент
-            for elem_data in all_elements:
+            for elem_data, verdict in zip(all_elements, verdicts):
                 center_x, center_y = elem_data['center']
                 place_type = elem_data['type']
                 
                 # Получаем номер места для логирования
                 place_number = elem_data.get('content_desc', '').strip() or elem_data.get('text', '').strip()
-                
-                # Анализируем цвет для определения статуса
-                status = self.analyze_place_color(screenshot_path, center_x, center_y, place_number)
+                status = verdict['status']
+                if place_number.isdigit():
+                    self._log_seat_verdict(place_number, verdict)
                 
                 place_data = {
                     'text': elem_data['text'],
                     'content_desc': elem_data['content_desc'],
                     'type': place_type,
                     'status': status,
+                    'confidence': verdict['confidence'],
                     'bounds': elem_data['bounds'],
                     'center': (center_x, center_y),
                     'size': elem_data['size'],
@@ -1147,6 +1602,28 @@ class AndroidAutomation:
                     # Место без номера - пропускаем в подсчете, но логируем
                     print(f"  ⚠️ Пропущено место без номера: type={place_type}, text='{elem_data.get('text', '')}', content_desc='{elem_data.get('content_desc', '')}', status={status}")
             
+            # Калибровка области мест по местам с номерами; места не нашлись - область будет найдена заново
+            counted = places_info['pc_places'] + places_info['tv_places']
+            if counted:
+                self.calibration.put(key, 'seat_region', seat_region(counted))
+            elif region:
+                self.calibration.forget(key, 'seat_region')
+            
+            # Экран мест подтверждён найденными местами: отпечатки экрана мест и главного экрана,
+            # с которого он открылся, запоминаются, раскладка - для следующих захватов этого экрана
+            if tree is not None and counted and self.screen_state() == PLACES:
+                places_fingerprint = self.remember_screen(PLACES)
+                if self._home_fingerprint and self._home_fingerprint != places_fingerprint:
+                    self.screens.learn(self._home_fingerprint, HOME, self.app_version or '')
+                self._home_fingerprint = None
+                self._seat_layout_key = layout_key(places_fingerprint, frame.screen_size)
+                self.seat_layouts.put(SeatLayout.from_frame(self._seat_layout_key, all_elements, frame))
+            
+            # Места у порога яркости или с разнородными пробами фона (текст, рамка, анимация)
+            places_info['low_confidence'] = [p['place_number'] for p in counted if p['confidence'] < 0.5]
+            if places_info['low_confidence']:
+                print(f"⚪ Статус под вопросом (уверенность < 0.5): {', '.join(places_info['low_confidence'])}")
+            
             print(f"📊 Найдено мест: ПК={places_info['total_pc']} (занято={places_info['occupied_pc']}, свободно={places_info['free_pc']}), "
                   f"TV={places_info['total_tv']} (занято={places_info['occupied_tv']}, свободно={places_info['free_tv']})")
             
@@ -1167,6 +1644,8 @@ class AndroidAutomation:
             
             return places_info
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"⚠️ Ошибка при парсинге UI dump для мест: {e}")
             import traceback
@@ -0,0 +1,226 @@
+"""
+Снимок UI: дамп разбирается один раз в компактные узлы с индексами, запросы выполняются селекторами
+"""
+import hashlib
+import re
+import xml.etree.ElementTree as ET
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_BOUNDS = re.compile(r'\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]')
+
+
+class UINode:
+    """Элемент экрана: атрибуты дампа и границы, разобранные один раз"""
+
+    __slots__ = ('index', 'depth', 'parent', 'cls', 'package', 'resource_id', 'text', 'desc',
+                 'clickable', 'x1', 'y1', 'x2', 'y2', 'label')
+
+    def __init__(self, index: int, depth: int, parent: int, cls: str, package: str, resource_id: str, text: str,
+                 desc: str, clickable: bool, bounds: Tuple[int, int, int, int]):
+        self.index = index
+        self.depth = depth
+        self.parent = parent  # Индекс родителя в UITree.nodes (-1 - корень)
+        self.cls = cls
+        self.package = package
+        self.resource_id = resource_id
+        self.text = text
+        self.desc = desc
+        self.clickable = clickable
+        self.x1, self.y1, self.x2, self.y2 = bounds
+        # text, content-desc и resource-id в нижнем регистре - для поиска подстрок
+        self.label = f"{text}\n{desc}\n{resource_id}".lower()
+
+    @property
+    def bounds(self) -> str:
+        """Границы в формате дампа: [x1,y1][x2,y2]"""
+        return f"[{self.x1},{self.y1}][{self.x2},{self.y2}]"
+
+    @property
+    def center(self) -> Tuple[int, int]:
+        return (self.x1 + self.x2) // 2, (self.y1 + self.y2) // 2
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.x2 - self.x1, self.y2 - self.y1
+
+    def __repr__(self) -> str:
+        return f"UINode({self.cls.rsplit('.', 1)[-1]}, text={self.text!r}, desc={self.desc!r}, {self.bounds})"
+
+
+class Selector:
+    """Условие на узел. Селекторы объединяются через & и |.
+
+    index - подсказка для UITree: ('clickable', None) или (поле, точное значение)
+    сужает перебор до индекса вместо всех узлов.
+    """
+
+    __slots__ = ('name', 'match', 'index')
+
+    def __init__(self, name: str, match: Callable[[UINode], bool], index: Optional[Tuple[str, Optional[str]]] = None):
+        self.name = name
+        self.match = match
+        self.index = index
+
+    def __and__(self, other: 'Selector') -> 'Selector':
+        first, second = self.match, other.match
+        return Selector(f"{self.name} & {other.name}", lambda n: first(n) and second(n), self.index or other.index)
+
+    def __or__(self, other: 'Selector') -> 'Selector':
+        first, second = self.match, other.match
+        return Selector(f"({self.name} | {other.name})", lambda n: first(n) or second(n))
+
+    def __repr__(self) -> str:
+        return f"Selector({self.name})"
+
+
+def contains(*needles: str) -> Selector:
+    """Подстрока (без учёта регистра) в text, content-desc или resource-id"""
+    lowered = [n.lower() for n in needles]
+    return Selector(f"contains{tuple(needles)}", lambda n: any(s in n.label for s in lowered))
+
+
+def text_is(text: str) -> Selector:
+    """Точное совпадение text (через индекс)"""
+    return Selector(f"text={text!r}", lambda n: n.text == text, ('text', text))
+
+
+def desc_is(desc: str) -> Selector:
+    """Точное совпадение content-desc (через индекс)"""
+    return Selector(f"desc={desc!r}", lambda n: n.desc == desc, ('desc', desc))
+
+
+def resource_id_is(resource_id: str) -> Selector:
+    return Selector(f"id={resource_id!r}", lambda n: n.resource_id == resource_id, ('resource_id', resource_id))
+
+
+def matches(pattern: str, flags: int = re.IGNORECASE) -> Selector:
+    """Регулярное выражение (компилируется один раз) по text или content-desc"""
+    regex = re.compile(pattern, flags)
+    return Selector(f"re({pattern!r})", lambda n: bool(regex.search(n.text) or regex.search(n.desc)))
+
+
+def number_desc(low: int, high: int) -> Selector:
+    """content-desc - целое число в диапазоне [low, high] (номера мест)"""
+    def match(node: UINode) -> bool:
+        desc = node.desc.strip()
+        return desc.isdigit() and low <= int(desc) <= high
+    return Selector(f"desc in {low}..{high}", match)
+
+
+def in_region(x1: int, y1: int, x2: int, y2: int) -> Selector:
+    """Центр узла внутри прямоугольника"""
+    def match(node: UINode) -> bool:
+        cx, cy = node.center
+        return x1 <= cx <= x2 and y1 <= cy <= y2
+    return Selector(f"in[{x1},{y1}][{x2},{y2}]", match)
+
+
+def clickable() -> Selector:
+    return Selector("clickable", lambda n: n.clickable, ('clickable', None))
+
+
+def iter_nodes(xml: str, chunk_size: int = 64 * 1024) -> Iterator[UINode]:
+    """Потоковый разбор дампа: узлы выдаются по мере чтения XML.
+
+    Дерево ElementTree целиком не строится: закрытый элемент очищается
+    и удаляется из родителя, в памяти остаются только открытые предки
+    и компактные записи UINode. ET.ParseError - дамп повреждён.
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    # Стек открытых элементов: (элемент, индекс узла для потомков)
+    stack: List[Tuple[ET.Element, int]] = []
+    count = 0
+    for start in range(0, len(xml), chunk_size):
+        parser.feed(xml[start:start + chunk_size])
+        for event, elem in parser.read_events():
+            if event == 'start':
+                parent = stack[-1][1] if stack else -1
+                index = parent
+                match = _BOUNDS.search(elem.get('bounds', ''))
+                if match:
+                    index = count
+                    count += 1
+                    get = elem.attrib.get
+                    yield UINode(index, len(stack), parent, get('class', ''), get('package', ''), get('resource-id', ''),
+                                 get('text', ''), get('content-desc', ''), get('clickable') == 'true',
+                                 tuple(map(int, match.groups())))
+                stack.append((elem, index))
+            else:
+                stack.pop()
+                elem.clear()
+                if stack:
+                    # Закрытые потомки уже удалены, поэтому элемент - первый у родителя
+                    stack[-1][0].remove(elem)
+    parser.close()
+
+
+class UITree:
+    """Разобранный дамп UI: узлы в порядке обхода и индексы по атрибутам.
+
+    Снимок неизменяем: после нажатия или смены экрана нужен новый снимок
+    (в AndroidAutomation - invalidate_ui() и ui_tree()).
+    """
+
+    def __init__(self, nodes: List[UINode]):
+        self.nodes = nodes
+        self._fingerprint: Optional[str] = None
+        self.by_text: Dict[str, List[UINode]] = {}
+        self.by_desc: Dict[str, List[UINode]] = {}
+        self.by_resource_id: Dict[str, List[UINode]] = {}
+        self.clickable: List[UINode] = []
+        for node in nodes:
+            if node.text:
+                self.by_text.setdefault(node.text, []).append(node)
+            if node.desc:
+                self.by_desc.setdefault(node.desc, []).append(node)
+            if node.resource_id:
+                self.by_resource_id.setdefault(node.resource_id, []).append(node)
+            if node.clickable:
+                self.clickable.append(node)
+
+    @classmethod
+    def from_xml(cls, xml: str) -> 'UITree':
+        """Снимок из XML дампа; ET.ParseError - дамп повреждён"""
+        return cls(list(iter_nodes(xml)))
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def package(self) -> str:
+        """Пакет приложения на переднем плане (по корневому узлу)"""
+        return self.nodes[0].package if self.nodes else ''
+
+    def fingerprint(self) -> str:
+        """Структурный отпечаток экрана: хэш набора (глубина, класс, пакет, resource-id).
+
+        Текст, content-desc и координаты не учитываются, повторяющиеся элементы
+        списков дают одну запись - данные на экране и число строк отпечаток
+        не меняют, а другой экран или новая вёрстка приложения - меняют.
+        """
+        if self._fingerprint is None:
+            skeleton = sorted({(n.depth, n.cls, n.package, n.resource_id) for n in self.nodes})
+            self._fingerprint = hashlib.blake2b(repr(skeleton).encode('utf-8'), digest_size=8).hexdigest()
+        return self._fingerprint
+
+    def _candidates(self, selector: Selector) -> Iterable[UINode]:
+        if selector.index is None:
+            return self.nodes
+        field, value = selector.index
+        if field == 'clickable':
+            return self.clickable
+        return {'text': self.by_text, 'desc': self.by_desc, 'resource_id': self.by_resource_id}[field].get(value, ())
+
+    def find(self, selector: Selector) -> List[UINode]:
+        """Все узлы, подходящие под селектор, в порядке дампа"""
+        return [node for node in self._candidates(selector) if selector.match(node)]
+
+    def first(self, selector: Selector) -> Optional[UINode]:
+        for node in self._candidates(selector):
+            if selector.match(node):
+                return node
+        return None
+
+    def contains_any(self, texts: Iterable[str]) -> bool:
+        """Есть ли на экране любой из текстов (подстрока без учёта регистра)"""
+        return self.first(contains(*texts)) is not None
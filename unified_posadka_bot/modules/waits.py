@@ -0,0 +1,74 @@
+"""
+Ожидание условий вместо фиксированных пауз: дешёвые проверки с нарастающим интервалом и таймаутом
+"""
+import time
+from typing import Any, Callable, List, Optional
+
+
+class WaitResult:
+    """Итог ожидания: выполнено ли условие, за сколько и за сколько проверок"""
+
+    __slots__ = ('name', 'ok', 'value', 'elapsed', 'polls', 'budget')
+
+    def __init__(self, name: str, ok: bool, value: Any, elapsed: float, polls: int, budget: Optional[float]):
+        self.name = name
+        self.ok = ok
+        self.value = value
+        self.elapsed = elapsed
+        self.polls = polls
+        self.budget = budget  # Прежняя фиксированная пауза (с), с которой сравнивается ожидание
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    def __repr__(self) -> str:
+        budget = f" вместо {self.budget:g} с" if self.budget is not None else ""
+        outcome = "" if self.ok else ", таймаут"
+        return f"{self.name}: {self.elapsed:.1f} с{budget} (проверок: {self.polls}{outcome})"
+
+
+def wait_until(probe: Callable[[], Any], timeout: float, name: str = '', budget: Optional[float] = None,
+               interval: float = 0.25, factor: float = 1.5, max_interval: float = 2.0,
+               sleep: Callable[[float], None] = time.sleep) -> WaitResult:
+    """Вызывает probe(), пока он не вернёт истинное значение или не истечёт timeout.
+
+    Первая проверка - сразу; паузы между проверками растут от interval
+    в factor раз до max_interval. sleep можно заменить паузой, которая
+    учитывает дедлайн (и бросает DeadlineExceeded).
+    """
+    started = time.monotonic()
+    polls = 0
+    delay = interval
+    while True:
+        polls += 1
+        value = probe()
+        elapsed = time.monotonic() - started
+        if value:
+            return WaitResult(name, True, value, elapsed, polls, budget)
+        if elapsed >= timeout:
+            return WaitResult(name, False, value, elapsed, polls, budget)
+        sleep(min(delay, timeout - elapsed))
+        delay = min(delay * factor, max_interval)
+
+
+class WaitLog:
+    """Ожидания одного сценария и сравнение с прежними фиксированными паузами"""
+
+    def __init__(self):
+        self.results: List[WaitResult] = []
+
+    def add(self, result: WaitResult) -> WaitResult:
+        self.results.append(result)
+        print(f"{'⏱' if result.ok else '⌛'} Ожидание {result!r}")
+        return result
+
+    def total(self) -> float:
+        return sum(r.elapsed for r in self.results)
+
+    def budget(self) -> float:
+        return sum(r.budget or 0.0 for r in self.results)
+
+    def summary(self) -> str:
+        timeouts = sum(1 for r in self.results if not r.ok)
+        return (f"ожидания {self.total():.1f} с вместо {self.budget():.1f} с фиксированных пауз "
+                f"(условий: {len(self.results)}, по таймауту: {timeouts})")
@@ -0,0 +1,138 @@
+"""
+Режим webhook: локальный HTTP приёмник обновлений Telegram на aiohttp
+
+Один и тот же файл в двух пакетах (modules/webhook.py объединённого бота и
+truegamers_monitor/webhook.py): пакеты разворачиваются по отдельности, поэтому
+копия намеренная - правки вносятся в обе (tests/test_shared_modules.py)
+"""
+import asyncio
+import hmac
+import json
+import logging
+import secrets
+import signal
+from typing import Iterable, Optional
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+# Сигналы штатной остановки, как у Application.run_polling
+STOP_SIGNALS = (signal.SIGINT, signal.SIGTERM, signal.SIGABRT)
+
+
+class WebhookReceiver:
+    """Принимает POST запросы от Bot API и кладёт обновления в очередь приложения.
+
+    Запросы без правильного секретного токена отклоняются (403),
+    обновления неразрешённых типов подтверждаются и отбрасываются.
+    """
+
+    def __init__(self, application: Application, path: str, secret_token: str,
+                 allowed_updates: Iterable[str]):
+        self.application = application
+        self.path = path if path.startswith("/") else f"/{path}"
+        self.secret_token = secret_token
+        self.allowed_updates = set(allowed_updates)
+        self.received = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        return app
+
+    async def handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token, self.secret_token):
+            self.rejected += 1
+            logger.warning("🚫 Webhook: неверный секретный токен от %s", request.remote)
+            return web.Response(status=403)
+
+        try:
+            data = await request.json()
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            self.rejected += 1
+            return web.Response(status=400)
+
+        if not isinstance(data, dict) or not self.allowed_updates.intersection(data.keys()):
+            # Bot API не должен присылать такие обновления (allowed_updates), но на всякий случай
+            self.dropped += 1
+            return web.Response()
+
+        update = Update.de_json(data, self.application.bot)
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return web.Response()
+
+
+async def serve_webhook(application: Application, url: str, listen: str, port: int, path: str,
+                        secret_token: Optional[str], allowed_updates: Iterable[str],
+                        stop_event: Optional[asyncio.Event] = None) -> None:
+    """Запускает приложение в режиме webhook до установки stop_event"""
+    allowed_updates = list(allowed_updates)
+    secret_token = secret_token or secrets.token_urlsafe(32)
+    receiver = WebhookReceiver(application, path, secret_token, allowed_updates)
+    runner = web.AppRunner(receiver.make_app())
+    stop_event = stop_event or asyncio.Event()
+
+    # Жизненный цикл повторяет run_polling: post_init / post_stop / post_shutdown
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        await runner.setup()
+        site = web.TCPSite(runner, listen, port)
+        await site.start()
+        try:
+            await application.bot.set_webhook(
+                url=url.rstrip("/") + receiver.path,
+                secret_token=secret_token,
+                allowed_updates=allowed_updates,
+            )
+            logger.info("🌐 Webhook слушает %s:%s%s (обновления: %s)", listen, port, receiver.path, ", ".join(allowed_updates))
+            await stop_event.wait()
+        finally:
+            await runner.cleanup()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+
+def run_webhook(application: Application, url: str, listen: str, port: int, path: str,
+                secret_token: Optional[str], allowed_updates: Iterable[str]) -> None:
+    """Блокирующий запуск webhook режима (аналог application.run_polling)
+
+    Как и run_polling, работает в текущем event loop, чтобы задачи
+    AsyncIOScheduler, запущенного до старта бота, выполнялись в том же цикле.
+    SIGINT, SIGTERM (pm2, systemd) и SIGABRT останавливают приложение штатно:
+    post_stop и post_shutdown выполняются (отправка очереди сообщений, остановка
+    фоновых задач). Где обработчиков сигналов нет (Windows), то же делает Ctrl-C.
+    """
+    loop = asyncio.get_event_loop()
+    stop_event = asyncio.Event()
+    installed = []
+    for sig in STOP_SIGNALS:
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+            installed.append(sig)
+        except (NotImplementedError, RuntimeError):
+            pass
+    task = loop.create_task(serve_webhook(application, url, listen, port, path, secret_token, allowed_updates, stop_event))
+    try:
+        try:
+            loop.run_until_complete(task)
+        except KeyboardInterrupt:
+            # Прерван сам цикл, корутина приостановлена: доводим её до штатной остановки
+            stop_event.set()
+            loop.run_until_complete(task)
+        logger.info("Webhook остановлен")
+    finally:
+        for sig in installed:
+            loop.remove_signal_handler(sig)
@@ -0,0 +1,104 @@
+"""
+Клиент протокола adb сервера (modules/adb_protocol.py) против фейкового сервера
+(tools/fake_adb_server.py): shell v2, exec-out, sync RECV и track-devices.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import asyncio
+import os
+import struct
+import sys
+import tempfile
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+sys.path.insert(0, os.path.join(BOT_DIR, "tools"))
+
+from fake_adb_server import FakeAdbServer
+from modules.adb_protocol import AdbClient, AdbError
+from modules.deadline import DeadlineExceeded
+
+SERIAL = "emulator-5554"
+BINARY = bytes(range(256)) * 4
+
+
+@unittest.skipUnless(os.path.exists('/bin/sh'), 'команды фейкового устройства выполняет /bin/sh')
+class AdbClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.root = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.root.name, 'sdcard'))
+        with open(os.path.join(self.root.name, 'sdcard', 'binary.bin'), 'wb') as f:
+            f.write(BINARY)
+        self.server = FakeAdbServer(self.root.name, serial=SERIAL, screen_size=(4, 3))
+        await self.server.start()
+        self.client = AdbClient(port=self.server.port, serial=SERIAL, timeout=5)
+
+    async def asyncTearDown(self):
+        await self.server.stop()
+        self.root.cleanup()
+
+    async def call(self, method, *args, **kwargs):
+        """Клиент синхронный - вызывается из потока, пока цикл обслуживает сервер"""
+        return await asyncio.to_thread(method, *args, **kwargs)
+
+    async def test_version_and_devices(self):
+        self.assertEqual(await self.call(self.client.version), 0x29)
+        self.assertEqual(await self.call(self.client.devices), [(SERIAL, 'device')])
+
+    async def test_shell_v2_exit_codes(self):
+        self.assertEqual(await self.call(self.client.shell, "echo out; echo err >&2; exit 3"), ("out\n", "err\n", 3))
+        self.assertEqual(await self.call(self.client.shell, "true"), ("", "", 0))
+        self.assertEqual((await self.call(self.client.shell, "exit 255"))[2], 255)
+        self.assertEqual(self.server.requests.get('shell,v2,raw'), 3)
+
+    async def test_exec_out_binary(self):
+        self.assertEqual(await self.call(self.client.exec_out, "cat sdcard/binary.bin"), BINARY)
+        raw = await self.call(self.client.exec_out, "screencap")
+        self.assertEqual(struct.unpack('<IIII', raw[:16]), (4, 3, 1, 1))
+        self.assertEqual(len(raw), 16 + 4 * 3 * 4)
+
+    async def test_sync_pull(self):
+        self.assertEqual(await self.call(self.client.pull, "/sdcard/binary.bin"), BINARY)
+        # Файл больше одного пакета DATA (64 КБ)
+        large = os.urandom(200 * 1024)
+        with open(os.path.join(self.root.name, 'sdcard', 'large.bin'), 'wb') as f:
+            f.write(large)
+        self.assertEqual(await self.call(self.client.pull, "/sdcard/large.bin"), large)
+        with self.assertRaises(AdbError):
+            await self.call(self.client.pull, "/sdcard/missing.xml")
+
+    async def test_track_devices(self):
+        stream = await self.call(self.client.track_devices)
+        lists = iter(stream)
+        try:
+            self.assertEqual(await self.call(next, lists), [(SERIAL, 'device')])
+            self.server.set_state('offline')
+            self.assertEqual(await self.call(next, lists), [(SERIAL, 'offline')])
+            self.server.set_state('')
+            self.assertEqual(await self.call(next, lists), [])
+            self.server.set_state('device')
+            self.assertEqual(await self.call(next, lists), [(SERIAL, 'device')])
+        finally:
+            stream.close()
+
+    async def test_unknown_serial(self):
+        other = AdbClient(port=self.server.port, serial="other", timeout=5)
+        with self.assertRaises(AdbError):
+            await self.call(other.shell, "true")
+
+    async def test_zero_timeout_is_deadline(self):
+        # Остаток дедлайна 0 не заменяется таймаутом по умолчанию
+        for timeout in (0, -1.0):
+            with self.assertRaises(DeadlineExceeded):
+                await self.call(self.client.shell, "true", timeout)
+            with self.assertRaises(DeadlineExceeded):
+                await self.call(self.client.exec_out, "true", timeout)
+        # Соединение с сервером даже не открывалось
+        self.assertEqual(self.server.requests, {})
+        self.assertEqual((await self.call(self.client.shell, "true", None))[2], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+"""
+Отмена AsyncAndroidAutomation.capture(): после отмены или ошибки одной из операций
+не остаётся процессов adb. Вместо adb - скрипт, который записывает свой PID и ждёт.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from modules.async_automation import AdbCommandError, AsyncAndroidAutomation
+
+FAKE_ADB = """#!/bin/sh
+echo $$ >> "{pids}"
+case "$*" in
+  *screencap*) if [ -n "$FAKE_SCREENCAP_FAIL" ]; then echo "screencap failed" >&2; exit 1; fi ;;
+esac
+exec sleep 30
+"""
+
+
+def alive(pid: int) -> bool:
+    """Процесс существует и не зомби"""
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().rsplit(')', 1)[1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
+
+@unittest.skipUnless(sys.platform.startswith('linux'), 'нужны /bin/sh и /proc')
+class CaptureCancelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.pids = os.path.join(self.dir.name, 'pids')
+        self.adb = os.path.join(self.dir.name, 'adb')
+        with open(self.adb, 'w') as f:
+            f.write(FAKE_ADB.format(pids=self.pids))
+        os.chmod(self.adb, os.stat(self.adb).st_mode | stat.S_IEXEC)
+        self.automation = AsyncAndroidAutomation(adb_path=self.adb, device_id='', timeout=30)
+
+    def tearDown(self):
+        os.environ.pop('FAKE_SCREENCAP_FAIL', None)
+        self.dir.cleanup()
+
+    def started(self):
+        if not os.path.exists(self.pids):
+            return []
+        with open(self.pids) as f:
+            return [int(line) for line in f if line.strip()]
+
+    def alive(self):
+        return [pid for pid in self.started() if alive(pid)]
+
+    async def wait_started(self, count: int):
+        deadline = time.monotonic() + 5
+        while len(self.started()) < count and time.monotonic() < deadline:
+            await asyncio.sleep(0.02)
+        self.assertGreaterEqual(len(self.started()), count)
+
+    def test_cancel_kills_both_processes(self):
+        async def scenario():
+            task = asyncio.create_task(self.automation.capture())
+            # UI dump и скриншот запущены одновременно
+            await self.wait_started(2)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertEqual(len(self.started()), 2)
+            self.assertEqual(self.alive(), [])
+        asyncio.run(scenario())
+
+    def test_failed_screenshot_kills_dump(self):
+        os.environ['FAKE_SCREENCAP_FAIL'] = '1'
+
+        async def scenario():
+            started = time.monotonic()
+            with self.assertRaises(AdbCommandError):
+                await self.automation.capture()
+            # Ошибка скриншота не ждёт UI dump (30 с): он отменён, его adb завершён
+            # (проверка внутри цикла: asyncio.run при выходе сам отменил бы оставшиеся задачи)
+            self.assertLess(time.monotonic() - started, 5)
+            self.assertEqual(self.alive(), [])
+        asyncio.run(scenario())
+
+    def test_timeout_kills_process(self):
+        async def scenario():
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.automation.shell('getprop ro.product.model', timeout=0.2)
+            self.assertEqual(self.alive(), [])
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+"""
+Навигация Navigator.run без устройства: состояния выдаёт сценарий, переходы - заглушки.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import os
+import sys
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from modules.navigator import RESTART, SPLASH, STOPPED, Edge, Navigator, TransitionStats
+from modules.screen_states import HOME, LAUNCHER, PIN, PLACES, UNKNOWN
+
+
+class Script:
+    """detect() по очереди возвращает состояния; переходы записывают, из какого состояния вызваны"""
+
+    def __init__(self, states):
+        self.states = list(states)
+        self.calls = []
+
+    def detect(self):
+        return self.states.pop(0) if len(self.states) > 1 else self.states[0]
+
+    def action(self, name, ok=True):
+        def run(timeout):
+            self.calls.append(name)
+            return ok
+        return run
+
+
+def edges(script, retries=1):
+    after_launch = {UNKNOWN: PIN}
+    return {
+        STOPPED: Edge('launch', script.action('launch'), timeout=1, retries=retries, assume=after_launch),
+        LAUNCHER: Edge('launch', script.action('launch'), timeout=1, retries=retries, assume=after_launch),
+        SPLASH: Edge('splash', script.action('splash'), timeout=1, retries=retries),
+        UNKNOWN: Edge('wait', script.action('wait'), timeout=1, retries=0),
+        PIN: Edge('pin', script.action('pin'), timeout=1, retries=retries),
+        HOME: Edge('places', script.action('places'), timeout=1, retries=retries),
+        RESTART: Edge('restart', script.action('restart'), timeout=1, retries=0),
+    }
+
+
+def navigate(states, start, **kwargs):
+    script = Script(states)
+    navigator = Navigator(script.detect, edges(script, **kwargs), TransitionStats(), log=lambda message: None)
+    return navigator.run(PLACES, start), script
+
+
+class ColdStartTest(unittest.TestCase):
+
+    def test_unknown_after_launch_is_pin(self):
+        result, script = navigate([UNKNOWN, HOME, PLACES], STOPPED)
+        self.assertTrue(result)
+        self.assertEqual(result.path, [STOPPED, PIN, HOME, PLACES])
+        self.assertEqual(script.calls, ['launch', 'pin', 'places'])
+
+    def test_assumption_survives_splash(self):
+        result, script = navigate([SPLASH, UNKNOWN, HOME, PLACES], STOPPED)
+        self.assertTrue(result)
+        self.assertEqual(result.path, [STOPPED, SPLASH, PIN, HOME, PLACES])
+        self.assertEqual(script.calls, ['launch', 'splash', 'pin', 'places'])
+
+    def test_pin_straight_to_places(self):
+        result, script = navigate([UNKNOWN, PLACES], LAUNCHER)
+        self.assertEqual(result.path, [LAUNCHER, PIN, PLACES])
+        self.assertEqual(script.calls, ['launch', 'pin'])
+
+    def test_no_pin_when_home_opens(self):
+        result, script = navigate([HOME, PLACES], STOPPED)
+        self.assertTrue(result)
+        self.assertEqual(script.calls, ['launch', 'places'])
+
+    def test_pin_retried_on_same_screen(self):
+        # PIN не принят: экран остаётся нераспознанным и по-прежнему считается PIN
+        result, script = navigate([UNKNOWN, UNKNOWN, HOME, PLACES], STOPPED)
+        self.assertTrue(result)
+        self.assertEqual(result.path, [STOPPED, PIN, HOME, PLACES])
+        self.assertEqual(script.calls, ['launch', 'pin', 'pin', 'places'])
+
+    def test_pin_not_accepted_restarts(self):
+        result, script = navigate([UNKNOWN, UNKNOWN, UNKNOWN, STOPPED, UNKNOWN, PLACES], STOPPED)
+        self.assertTrue(result)
+        self.assertEqual(script.calls, ['launch', 'pin', 'pin', 'restart', 'launch', 'pin'])
+
+
+class AssumptionScopeTest(unittest.TestCase):
+
+    def test_unknown_without_launch_is_not_pin(self):
+        result, script = navigate([HOME, PLACES], UNKNOWN)
+        self.assertTrue(result)
+        self.assertEqual(script.calls, ['wait', 'places'])
+
+    def test_unknown_after_home_is_not_pin(self):
+        # Нераспознанный экран после главного - не PIN: предположение снято узнанным экраном
+        result, script = navigate([HOME, UNKNOWN, PLACES], STOPPED)
+        self.assertTrue(result)
+        self.assertEqual(result.path, [STOPPED, HOME, UNKNOWN, PLACES])
+        self.assertEqual(script.calls, ['launch', 'places', 'wait'])
+
+    def test_unknown_after_restart_without_launch(self):
+        # Нераспознанный экран без запуска ждётся, затем перезапуск; после запуска он уже PIN
+        result, script = navigate([UNKNOWN, UNKNOWN, STOPPED, UNKNOWN, PLACES], HOME, retries=0)
+        self.assertTrue(result)
+        self.assertEqual(result.path, [HOME, UNKNOWN, STOPPED, PIN, PLACES])
+        self.assertEqual(script.calls, ['places', 'wait', 'restart', 'launch', 'pin'])
+
+
+class RestartTest(unittest.TestCase):
+
+    def test_restart_after_retries(self):
+        # Главный экран не уходит: два нажатия, перезапуск, запуск, PIN, главный экран, места
+        result, script = navigate([HOME, HOME, STOPPED, UNKNOWN, HOME, PLACES], HOME)
+        self.assertTrue(result)
+        self.assertEqual(script.calls, ['places', 'places', 'restart', 'launch', 'pin', 'places'])
+        self.assertEqual(result.path, [HOME, STOPPED, PIN, HOME, PLACES])
+
+    def test_restart_once(self):
+        result, script = navigate([HOME], HOME, retries=0)
+        self.assertFalse(result)
+        self.assertEqual(script.calls, ['places', 'restart', 'places'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+"""
+Модули, которые лежат копиями в обоих пакетах (объединённый бот и truegamers_monitor
+разворачиваются по отдельности): копии должны совпадать побайтно.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import os
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MONITOR_DIR = os.path.join(os.path.dirname(BOT_DIR), "truegamers_monitor")
+
+SHARED = ["device_tracker.py", "ui_dump.py", "webhook.py"]
+
+
+@unittest.skipUnless(os.path.isdir(MONITOR_DIR), "truegamers_monitor рядом не развёрнут")
+class SharedModulesTest(unittest.TestCase):
+
+    def test_copies_identical(self):
+        for name in SHARED:
+            with self.subTest(module=name):
+                with open(os.path.join(BOT_DIR, "modules", name), "rb") as f:
+                    bot_copy = f.read()
+                with open(os.path.join(MONITOR_DIR, name), "rb") as f:
+                    monitor_copy = f.read()
+                self.assertEqual(bot_copy, monitor_copy,
+                                 f"modules/{name} и truegamers_monitor/{name} разошлись - правка внесена не в обе копии")
+
+
+if __name__ == "__main__":
+    unittest.main()
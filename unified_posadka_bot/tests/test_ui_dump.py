@@ -0,0 +1,70 @@
+"""
+UI dump (modules/ui_dump.py): выбор способа дампа и его понижение; в сессии adb shell
+без терминала способы через /dev/tty не пробуются.
+
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import os
+import sys
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+import modules.truegamers_automation as automation
+from modules.ui_dump import DEMOTE_AFTER, UiDumper
+
+XML = '<?xml version="1.0"?><hierarchy rotation="0"><node index="0" /></hierarchy>'
+
+
+class Device:
+    """exec_out устройства без терминала: /dev/tty не открывается, файл - работает"""
+
+    def __init__(self, tty: bool):
+        self.tty = tty
+        self.commands = []
+
+    def exec_out(self, command: str, timeout: float) -> bytes:
+        self.commands.append(command)
+        if '/dev/tty' in command and not self.tty:
+            return b'ERROR: could not open /dev/tty\n'
+        return XML.encode() + b'UI hierchary dumped to: /dev/tty\n'
+
+
+class UiDumperTest(unittest.TestCase):
+
+    def test_tty_mode_first(self):
+        device = Device(tty=True)
+        dumper = UiDumper(device.exec_out)
+        self.assertEqual(dumper.dump(), XML)
+        self.assertEqual(device.commands, ['uiautomator dump --compressed /dev/tty'])
+
+    def test_demoted_after_repeated_misses(self):
+        device = Device(tty=False)
+        dumper = UiDumper(device.exec_out)
+        for _ in range(DEMOTE_AFTER):
+            self.assertEqual(dumper.dump(), XML)
+        self.assertEqual(dumper.mode, 'compressed-file')
+        self.assertEqual(len(device.commands), 2 * DEMOTE_AFTER)
+
+    def test_no_tty_modes_in_shell_session(self):
+        device = Device(tty=False)
+        dumper = UiDumper(device.exec_out, tty=False)
+        self.assertEqual(dumper.modes, ['compressed-file', 'file'])
+        self.assertEqual(dumper.dump(), XML)
+        self.assertEqual(len(device.commands), 1)
+        self.assertNotIn('/dev/tty', device.commands[0])
+
+    def test_automation_with_shell_session(self):
+        previous = automation.ADB_SHELL_SESSION, automation.ADB_BACKEND
+        automation.ADB_SHELL_SESSION, automation.ADB_BACKEND = True, 'cli'
+        try:
+            device = automation.AndroidAutomation('stub')
+        finally:
+            automation.ADB_SHELL_SESSION, automation.ADB_BACKEND = previous
+        self.assertIsNotNone(device.shell_session)
+        self.assertFalse([mode for mode in device.ui_dumper.modes if mode.endswith('tty')])
+
+
+if __name__ == '__main__':
+    unittest.main()
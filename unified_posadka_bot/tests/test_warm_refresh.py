@@ -0,0 +1,169 @@
+"""
+Тёплый режим: обновление экрана мест на месте принимается только с признаком обновления
+(индикатор, другие статусы мест или другой кадр), иначе приложение перезапускается.
+
+Устройство заменено заглушкой: кадры и UI dump синтетического экрана мест.
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import contextlib
+import io
+import os
+import sys
+import time
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+import numpy as np
+
+import modules.truegamers_automation as automation
+from modules.calibration import CalibrationCache
+from modules.framebuffer import Frame
+from modules.screen_states import ScreenStates
+from modules.seat_layout import SeatLayoutCache
+
+W, H = 1440, 2560
+PACKAGE = 'com.truegamers.true_gamers'
+
+
+def places_screen(occupied, spinner=False):
+    """Кадр и UI dump экрана мест: 20 мест, занятые - серые; spinner - индикатор обновления сверху"""
+    pixels = np.full((H, W, 3), 245, np.uint8)
+    nodes = []
+    for i in range(20):
+        x, y = 150 + (i % 8) * 160, 900 + (i // 8) * 160
+        pixels[y - 50:y + 50, x - 50:x + 50] = (128, 128, 132) if i + 1 in occupied else (252, 252, 252)
+        nodes.append(f'<node index="{i}" text="" resource-id="seat" class="android.view.View" package="{PACKAGE}" '
+                     f'content-desc="{i + 1}" clickable="true" bounds="[{x - 50},{y - 50}][{x + 50},{y + 50}]" />')
+    if spinner:
+        pixels[300:400, 670:770] = (30, 120, 200)
+    xml = (f'<?xml version="1.0"?><hierarchy rotation="0"><node index="0" text="Свободно" '
+           f'class="android.widget.FrameLayout" package="{PACKAGE}" content-desc="" bounds="[0,0][{W},{H}]">'
+           + ''.join(nodes) + '</node></hierarchy>')
+    return pixels, xml
+
+
+class DeviceStub(automation.AndroidAutomation):
+    """Устройство без adb: экран меняется по списку after_gesture после жеста обновления"""
+
+    def __init__(self, layout_cache: bool = True):
+        super().__init__('stub')
+        self.package = PACKAGE
+        self.calibration = CalibrationCache('')
+        self.screens = ScreenStates('')
+        self.seat_layouts = SeatLayoutCache(900 if layout_cache else 0)
+        self.screen = places_screen({1, 5})
+        self.after_gesture = []
+        self.queue = []
+        self.dumps = 0
+        self.restarts = 0
+
+    def calibration_key(self):
+        return 'test'
+
+    def calibrate(self):
+        return W, H
+
+    def is_app_focused(self):
+        return True
+
+    def is_app_running(self):
+        return True
+
+    def wait_for(self, name, probe, timeout, budget=None):
+        return super().wait_for(name, probe, min(timeout, 1.5), budget)
+
+    def run_gestures(self, script):
+        self.invalidate_ui()
+        self.queue = list(self.after_gesture)
+        return {'ok': True, 'completed': len(script.steps)}
+
+    def _next_screen(self):
+        if self.queue:
+            self.screen = self.queue.pop(0)
+        return self.screen
+
+    def capture_frame(self, region=None, step=1):
+        pixels = self._next_screen()[0]
+        if region:
+            x1, y1, x2, y2 = region
+            return Frame(pixels[y1:y2, x1:x2], x1, y1, 1, (W, H))
+        return Frame(pixels, 0, 0, 1, (W, H))
+
+    def get_ui_dump(self, save_to_file=False):
+        self.dumps += 1
+        self._ui_xml, self._ui_tree = self.screen[1], None
+        return self.screen[1]
+
+    def open_app_and_places(self):
+        self.restarts += 1
+        return True
+
+
+class WarmRefreshTest(unittest.TestCase):
+
+    def setUp(self):
+        self.warm = automation.WARM_APP_MODE
+        automation.WARM_APP_MODE = True
+
+    def tearDown(self):
+        automation.WARM_APP_MODE = self.warm
+
+    def device(self, **kwargs):
+        device = DeviceStub(**kwargs)
+        with contextlib.redirect_stdout(io.StringIO()):
+            status = device.get_places_status()
+        self.assertEqual(status['occupied_pc'], 2)
+        device.cold_started_at = time.time()
+        return device
+
+    def capture(self, device, after_gesture):
+        device.after_gesture = after_gesture
+        with contextlib.redirect_stdout(io.StringIO()):
+            mode = device.ensure_places_screen()
+            status = device.get_places_status() if mode == 'warm' else None
+        return mode, status
+
+    @staticmethod
+    def occupied(status):
+        return sorted(int(p['place_number']) for p in status['pc_places'] if p['status'] == 'occupied')
+
+    def test_unchanged_screen_is_not_a_refresh(self):
+        # Приложение ещё не начало загрузку: тот же экран - не обновление, перезапуск
+        device = self.device()
+        mode, _ = self.capture(device, [])
+        self.assertEqual(mode, 'cold')
+        self.assertEqual(device.restarts, 1)
+
+    def test_status_change_then_stable(self):
+        device = self.device()
+        dumps = device.dumps
+        mode, status = self.capture(device, [places_screen({2, 7})])
+        self.assertEqual(mode, 'warm')
+        self.assertEqual(self.occupied(status), [2, 7])
+        self.assertEqual(device.restarts, 0)
+        # Раскладка из кэша: ни одного UI dump
+        self.assertEqual(device.dumps, dumps)
+
+    def test_indicator_appears_and_goes_away(self):
+        device = self.device()
+        mode, status = self.capture(device, [places_screen({1, 5}, spinner=True)] * 2 + [places_screen({1, 5})])
+        self.assertEqual(mode, 'warm')
+        self.assertEqual(self.occupied(status), [1, 5])
+
+    def test_unchanged_screen_without_layout(self):
+        device = self.device(layout_cache=False)
+        mode, _ = self.capture(device, [])
+        self.assertEqual(mode, 'cold')
+
+    def test_status_change_without_layout(self):
+        # UI dump статусов не показывает - обновление видно по кадру
+        device = self.device(layout_cache=False)
+        mode, status = self.capture(device, [places_screen({3})])
+        self.assertEqual(mode, 'warm')
+        self.assertEqual(self.occupied(status), [3])
+
+
+if __name__ == '__main__':
+    unittest.main()
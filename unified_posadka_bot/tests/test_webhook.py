@@ -0,0 +1,168 @@
+"""
+Режим webhook: проверка секретного токена и типов обновлений в WebhookReceiver,
+штатная остановка run_webhook по SIGINT/SIGTERM с фейковым Bot API (tools/fake_bot_api.py).
+
+Запуск: python -m pytest tests (или python -m unittest discover tests) из каталога бота
+"""
+import asyncio
+import os
+import signal
+import socket
+import sys
+import unittest
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+sys.path.insert(0, os.path.join(BOT_DIR, "tools"))
+
+from aiohttp.test_utils import TestClient, TestServer
+from telegram.ext import ApplicationBuilder, MessageHandler, filters
+
+from fake_bot_api import FakeBotApi
+from modules.webhook import SECRET_HEADER, WebhookReceiver, run_webhook
+
+SECRET = "s3cret-token"
+ALLOWED = ["message", "callback_query"]
+
+
+class FakeApplication:
+    """Из приложения приёмнику нужны только bot и update_queue"""
+
+    def __init__(self):
+        self.bot = None
+        self.update_queue = asyncio.Queue()
+
+
+def message_update(update_id: int, text: str = "/start") -> dict:
+    return {"update_id": update_id,
+            "message": {"message_id": update_id, "date": 0, "text": text,
+                        "chat": {"id": 42, "type": "private"}}}
+
+
+class WebhookReceiverTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.application = FakeApplication()
+        self.receiver = WebhookReceiver(self.application, "hook", SECRET, ALLOWED)
+        self.client = TestClient(TestServer(self.receiver.make_app()))
+        await self.client.start_server()
+
+    async def asyncTearDown(self):
+        await self.client.close()
+
+    async def post(self, data, token=SECRET):
+        headers = {SECRET_HEADER: token} if token is not None else {}
+        async with self.client.post("/hook", json=data, headers=headers) as resp:
+            return resp.status
+
+    async def test_right_token_queues_update(self):
+        self.assertEqual(await self.post(message_update(1)), 200)
+        update = self.application.update_queue.get_nowait()
+        self.assertEqual(update.update_id, 1)
+        self.assertEqual(update.message.text, "/start")
+        self.assertEqual(self.receiver.received, 1)
+
+    async def test_wrong_token_rejected(self):
+        self.assertEqual(await self.post(message_update(1), token="wrong"), 403)
+        self.assertTrue(self.application.update_queue.empty())
+        self.assertEqual(self.receiver.rejected, 1)
+
+    async def test_missing_token_rejected(self):
+        self.assertEqual(await self.post(message_update(1), token=None), 403)
+        self.assertTrue(self.application.update_queue.empty())
+        self.assertEqual(self.receiver.rejected, 1)
+
+    async def test_filtered_update_type_dropped(self):
+        edited = {"update_id": 2, "edited_message": message_update(2)["message"]}
+        self.assertEqual(await self.post(edited), 200)
+        self.assertTrue(self.application.update_queue.empty())
+        self.assertEqual(self.receiver.dropped, 1)
+
+    async def test_invalid_json_rejected(self):
+        async with self.client.post("/hook", data=b"{not json", headers={SECRET_HEADER: SECRET}) as resp:
+            self.assertEqual(resp.status, 400)
+        self.assertTrue(self.application.update_queue.empty())
+
+    async def test_other_path_not_found(self):
+        async with self.client.post("/other", json=message_update(1), headers={SECRET_HEADER: SECRET}) as resp:
+            self.assertEqual(resp.status, 404)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@unittest.skipUnless(hasattr(asyncio.AbstractEventLoop, "add_signal_handler") and sys.platform != "win32",
+                     "нужны обработчики сигналов event loop")
+class RunWebhookShutdownTest(unittest.TestCase):
+    """run_webhook по сигналу останавливает приёмник и вызывает post_stop и post_shutdown"""
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.previous = {sig: signal.getsignal(sig) for sig in (signal.SIGINT, signal.SIGTERM)}
+        # Без обработчика run_webhook сигнал не убьёт процесс тестов, а будет записан здесь
+        self.guarded = []
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.guarded.append(signum))
+
+    def tearDown(self):
+        for sig, handler in self.previous.items():
+            signal.signal(sig, handler)
+        asyncio.set_event_loop(None)
+        self.loop.close()
+
+    def run_until_signal(self, signum):
+        api = FakeBotApi()
+        self.loop.run_until_complete(api.start())
+        events, tasks = [], []
+        port = free_port()
+
+        async def on_message(update, context):
+            events.append(("message", update.message.text))
+
+        async def post_init(application):
+            async def deliver_and_stop():
+                while not api.webhook_url:
+                    await asyncio.sleep(0.01)
+                await api.push_update(api.make_message_update(42, "hello"))
+                while ("message", "hello") not in events:
+                    await asyncio.sleep(0.01)
+                os.kill(os.getpid(), signum)
+                # Сигнал не остановил приложение - тест не должен зависнуть
+                await asyncio.sleep(5)
+                asyncio.get_running_loop().stop()
+            tasks.append(asyncio.get_running_loop().create_task(deliver_and_stop()))
+
+        async def post_stop(application):
+            events.append(("post_stop", None))
+
+        async def post_shutdown(application):
+            events.append(("post_shutdown", None))
+
+        application = (ApplicationBuilder().token("123456:FAKE").base_url(api.base_url)
+                       .post_init(post_init).post_stop(post_stop).post_shutdown(post_shutdown).build())
+        application.add_handler(MessageHandler(filters.TEXT, on_message))
+        try:
+            run_webhook(application, f"http://127.0.0.1:{port}", "127.0.0.1", port, "/hook", SECRET, ALLOWED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*tasks, api.stop(), return_exceptions=True))
+        self.assertEqual(self.guarded, [])
+        self.assertEqual(api.webhook_secret, SECRET)
+        self.assertEqual(events, [("message", "hello"), ("post_stop", None), ("post_shutdown", None)])
+        # Приёмник закрыт (runner.cleanup)
+        with socket.socket() as sock:
+            self.assertNotEqual(sock.connect_ex(("127.0.0.1", port)), 0)
+
+    def test_sigterm_stops_cleanly(self):
+        self.run_until_signal(signal.SIGTERM)
+
+    def test_sigint_stops_cleanly(self):
+        self.run_until_signal(signal.SIGINT)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Стоимость команды adb shell: отдельный процесс adb на команду против постоянной сессии.
+
+Обе схемы выполняют одни и те же команды через AndroidAutomation, поэтому
+замер включает весь путь, которым пользуются сценарии бота. Без устройства
+можно запустить с заменителем adb: --adb tools/fake_adb.py
+
+Запуск: python tools/bench_adb_shell.py --count 50
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from modules.adb_shell import AdbShellSession  # noqa: E402
+from modules.truegamers_automation import AndroidAutomation  # noqa: E402
+
+COMMANDS = [
+    ['shell', 'getprop', 'ro.product.model'],
+    ['shell', 'wm', 'size'],
+    ['shell', 'pidof', 'com.truegamers.true_gamers'],
+    ['shell', 'echo', 'ok'],
+]
+
+
+def measure(android: AndroidAutomation, count: int) -> list:
+    timings = []
+    for i in range(count):
+        command = COMMANDS[i % len(COMMANDS)]
+        started = time.perf_counter()
+        android._run_adb_command(command)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def describe(values: list) -> str:
+    ms = sorted(v * 1000 for v in values)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"p50={statistics.median(ms):7.2f} ms  p95={p95:7.2f} ms  всего={sum(ms):8.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=50, help="число команд в каждой схеме")
+    parser.add_argument("--adb", default=None, help="путь к adb (по умолчанию ADB_PATH из config)")
+    parser.add_argument("--serial", default=None, help="серийный номер устройства")
+    args = parser.parse_args()
+
+    android = AndroidAutomation()
+    if args.adb:
+        android.adb_path = args.adb
+    if args.serial is not None:
+        android.device_id = args.serial
+
+    android.shell_session = None
+    per_process = measure(android, args.count)
+
+    android.shell_session = AdbShellSession(android.adb_path, android.device_id)
+    # Первая команда открывает сессию - считаем её отдельно
+    started = time.perf_counter()
+    android._run_adb_command(['shell', 'true'])
+    connect = time.perf_counter() - started
+    session = measure(android, args.count)
+    android.shell_session.close()
+
+    print(f"процесс на команду:  {describe(per_process)}")
+    print(f"постоянная сессия:   {describe(session)}  (открытие {connect * 1000:.1f} ms)")
+    print(f"ускорение p50: x{statistics.median(per_process) / statistics.median(session):.1f}")
+
+
+if __name__ == "__main__":
+    main()
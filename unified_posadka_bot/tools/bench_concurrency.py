@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Задержка обработчиков объединённого бота под смешанной нагрузкой.
+
+Реальные обработчики bot.py подключаются к локальному фейковому Bot API
+(tools/fake_bot_api.py). Эмулятор заменён медленным устройством (time.sleep),
+API COLIZEUM — медленной корутиной, чтобы замерить, ждут ли дешёвые команды
+(/start, «Итог смены») долгие сценарии, и сколько HTTP запросов COLIZEUM
+объединяет single-flight.
+
+Запуск: python tools/bench_concurrency.py --capture 3 --cheap 30
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from fake_bot_api import FakeBotApi
+
+# bot.py пишет bot.log и stats.json в текущую папку
+os.chdir(tempfile.mkdtemp(prefix="bench_concurrency_"))
+import bot  # noqa: E402
+from modules.outbox import SubscriberStore  # noqa: E402
+from modules.truegamers_automation import AndroidAutomation  # noqa: E402
+from modules.device_pool import DevicePool  # noqa: E402
+
+TARGET_CHAT = -100
+CHEAP_TEXTS = ["/start", "📈 Итог смены"]
+# Этим значком начинается мгновенное подтверждение приёма ("⏳ Проверяю посадку..."), а не результат
+ACK_PREFIX = "⏳"
+
+
+def is_result(message: dict) -> bool:
+    """Ответ с результатом команды, а не подтверждение приёма"""
+    return not message["text"].startswith(ACK_PREFIX)
+
+
+class SlowDevice(AndroidAutomation):
+    """Устройство, у которого навигация и анализ занимают заданное время"""
+
+    def __init__(self, capture_seconds: float):
+        super().__init__()
+        self.capture_seconds = capture_seconds
+
+    def list_devices(self) -> list:
+        time.sleep(0.05)
+        return [("emulator-5554", "device")]
+
+    def navigation_state(self) -> str:
+        return 'places'
+
+    def open_app_and_places(self) -> bool:
+        self._sleep(self.capture_seconds * 0.8, 'navigation')
+        return True
+
+    def get_places_status(self) -> dict:
+        self._sleep(self.capture_seconds * 0.2, 'capture')
+        return {'total_pc': 25, 'occupied_pc': 10, 'free_pc': 15, 'total_tv': 1, 'occupied_tv': 0, 'free_tv': 1}
+
+
+def make_slow_colizeum(seconds: float, calls: list):
+    async def compute_posadka_async(*args, **kwargs):
+        calls.append(time.perf_counter())
+        await asyncio.sleep(seconds)
+        return {"busy_pc": ["1", "2"], "total_pc": 30, "free_pc": 28,
+                "busy_tv": [], "total_tv": 2, "free_tv": 2}
+    return compute_posadka_async
+
+
+async def run_load(concurrency: int, capture: float, cheap_count: int) -> dict:
+    api = FakeBotApi()
+    await api.start()
+    colizeum_calls = []
+    bot.CONCURRENT_UPDATES = concurrency
+    bot.TARGET_CHAT_ID = TARGET_CHAT
+    bot.subscribers = SubscriberStore(os.path.join(os.getcwd(), f"subscribers_{concurrency}.json"), [TARGET_CHAT])
+    bot.PREWARM_ENABLED = False
+    bot.device_pool = DevicePool([SlowDevice(capture)], default_venue=bot.TRUEGAMERS_VENUE)
+    bot.compute_posadka_async = make_slow_colizeum(capture / 2, colizeum_calls)
+
+    app = bot.build_application(token="123456:FAKE", base_url=api.base_url, with_scheduler=False)
+    pushed = {}
+    chat_id = 1
+    async with app:
+        # post_init (очередь исходящих) при ручном запуске вызывается явно
+        await app.post_init(app)
+        await app.start()
+        await app.updater.start_polling(poll_interval=0.0, timeout=10)
+        try:
+            # Долгие сценарии: TrueGamers и два одновременных запроса COLIZEUM
+            for text in ["📊 Посадка TrueGamers", "📊 Посадка COLIZEUM", "📊 Посадка COLIZEUM"]:
+                pushed[chat_id] = ("slow", time.perf_counter())
+                await api.push_update(api.make_message_update(chat_id, text))
+                chat_id += 1
+            # Дешёвые команды от других пользователей, пока идут долгие
+            interval = capture / max(1, cheap_count)
+            for i in range(cheap_count):
+                pushed[chat_id] = ("cheap", time.perf_counter())
+                await api.push_update(api.make_message_update(chat_id, CHEAP_TEXTS[i % len(CHEAP_TEXTS)]))
+                chat_id += 1
+                await asyncio.sleep(interval)
+            # Ждём результатов всем пользователям (подтверждения "⏳" не в счёт)
+            until = time.perf_counter() + capture * 10
+            while time.perf_counter() < until:
+                answered = {m["chat_id"] for m in api.sent if is_result(m)}
+                if all(c in answered for c in pushed):
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await app.updater.stop()
+            await app.stop()
+            await app.post_shutdown(app)
+    await api.stop()
+
+    # Первый ответ - обычно подтверждение "⏳", результат - первое сообщение после него
+    first_reply, result_reply = {}, {}
+    for message in api.sent:
+        first_reply.setdefault(message["chat_id"], message["time"])
+        if is_result(message):
+            result_reply.setdefault(message["chat_id"], message["time"])
+    latencies = {"cheap": [], "slow": [], "cheap_result": [], "slow_result": []}
+    for cid, (kind, started) in pushed.items():
+        if cid in first_reply:
+            latencies[kind].append(first_reply[cid] - started)
+        if cid in result_reply:
+            latencies[f"{kind}_result"].append(result_reply[cid] - started)
+    latencies["colizeum_http_calls"] = len(colizeum_calls)
+    return latencies
+
+
+def describe(values: list) -> str:
+    if not values:
+        return "нет ответов"
+    ms = sorted(v * 1000 for v in values)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    return f"n={len(ms):<3} p50={statistics.median(ms):8.1f} ms  p95={p95:8.1f} ms  max={ms[-1]:8.1f} ms"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--capture", type=float, default=3.0, help="длительность сценария TrueGamers, с")
+    parser.add_argument("--cheap", type=int, default=20, help="число дешёвых команд во время сценария")
+    args = parser.parse_args()
+
+    for concurrency in (1, 16):
+        result = await run_load(concurrency, args.capture, args.cheap)
+        print(f"concurrent_updates={concurrency}")
+        print(f"  дешёвые команды (первый ответ): {describe(result['cheap'])}")
+        print(f"  дешёвые команды (результат):    {describe(result['cheap_result'])}")
+        print(f"  долгие сценарии (первый ответ): {describe(result['slow'])}")
+        print(f"  долгие сценарии (результат):    {describe(result['slow_result'])}")
+        print(f"  HTTP запросов COLIZEUM на 2 одновременных запроса: {result['colizeum_http_calls']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Статус мест: прежний анализ по одному месту (PNG открывается и переводится в массив
+для каждого места, восемь проб 7x7 в цикле) против пакетного classify_seats по одному кадру.
+
+Статусы обоих способов сверяются; время - медиана повторов.
+Запуск: python tools/bench_seat_classifier.py [--seats 25] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import struct
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from modules.framebuffer import parse_screencap  # noqa: E402
+from modules.seat_classifier import SAMPLE_OFFSETS, classify_seats  # noqa: E402
+
+WIDTH, HEIGHT = 1440, 2560
+
+
+def synthetic_screen(seats: int, seed: int = 1):
+    """Экран со схемой мест: серые (заняты), белые, цветные и светло-серые у порога (свободны), номер в центре"""
+    rng = random.Random(seed)
+    pixels = np.full((HEIGHT, WIDTH, 3), 245, dtype=np.uint8)
+    centers, expected = [], []
+    for i in range(seats):
+        x, y = 150 + (i % 8) * 160, 900 + (i // 8) * 160
+        kind = rng.choice(['occupied', 'free', 'free-color', 'free-pale'])
+        color = {'occupied': (128, 128, 132), 'free': (252, 252, 252), 'free-color': (90, 160, 230),
+                 'free-pale': (160, 160, 163)}[kind]
+        pixels[y - 50:y + 50, x - 50:x + 50] = color
+        pixels[y - 6:y + 6, x - 10:x + 10] = 30  # номер места
+        noise = np.random.default_rng(i).integers(-6, 7, size=(100, 100, 3))
+        pixels[y - 50:y + 50, x - 50:x + 50] = np.clip(pixels[y - 50:y + 50, x - 50:x + 50] + noise, 0, 255)
+        centers.append((x, y))
+        expected.append(kind.split('-')[0])
+    return pixels, centers, expected
+
+
+def legacy_status(png_path: str, center_x: int, center_y: int) -> str:
+    """Прежний analyze_place_color: открытие PNG на каждое место и цикл по пробам"""
+    img = Image.open(png_path)
+    img_array = np.array(img)
+    width, height = img.size
+    if center_x < 0 or center_x >= width or center_y < 0 or center_y >= height:
+        return 'unknown'
+    brightnesses, color_diffs = [], []
+    for offset_x, offset_y in SAMPLE_OFFSETS.tolist():
+        x, y = center_x + offset_x, center_y + offset_y
+        if x < 0 or x >= width or y < 0 or y >= height:
+            continue
+        region = img_array[max(0, y - 3):min(height, y + 4), max(0, x - 3):min(width, x + 4)]
+        r, g, b = np.mean(region, axis=(0, 1))[:3]
+        brightnesses.append(np.mean([r, g, b]))
+        color_diffs.append(max(r, g, b) - min(r, g, b))
+    if not brightnesses:
+        return 'unknown'
+    brightness = np.median(brightnesses) * 0.6 + np.mean(brightnesses) * 0.4
+    diff = np.median(color_diffs) * 0.6 + np.mean(color_diffs) * 0.4
+    if brightness < 155 and (diff < 32 or brightness < 110):
+        return 'occupied'
+    return 'free'
+
+
+def median_time(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--seats", type=int, default=25, help="мест на схеме")
+    parser.add_argument("--repeat", type=int, default=5, help="повторов для замера времени")
+    args = parser.parse_args()
+
+    pixels, centers, expected = synthetic_screen(args.seats)
+    png_path = os.path.join(os.getcwd(), 'bench_seats.png')
+    Image.fromarray(pixels).save(png_path)
+    raw = struct.pack('<IIII', WIDTH, HEIGHT, 1, 1) + np.dstack([pixels, np.full(pixels.shape[:2], 255, np.uint8)]).tobytes()
+    try:
+        legacy = [legacy_status(png_path, x, y) for x, y in centers]
+        frame = parse_screencap(raw)
+        batch = classify_seats(frame, centers)
+        mismatches = [i + 1 for i, (old, new) in enumerate(zip(legacy, batch)) if old != new['status']]
+        wrong = [i + 1 for i, (want, new) in enumerate(zip(expected, batch)) if want != new['status']]
+
+        old_seconds = median_time(lambda: [legacy_status(png_path, x, y) for x, y in centers], args.repeat)
+        new_seconds = median_time(lambda: classify_seats(parse_screencap(raw), centers), args.repeat)
+    finally:
+        os.remove(png_path)
+
+    print(f"мест {args.seats}, кадр {WIDTH}x{HEIGHT}")
+    print(f"  по одному месту (PNG на место)  {old_seconds * 1000:8.1f} ms")
+    print(f"  classify_seats (один кадр)      {new_seconds * 1000:8.1f} ms  (x{old_seconds / max(new_seconds, 1e-9):.0f})")
+    print(f"  расхождений со старым анализом: {mismatches or 'нет'}, ошибок по разметке: {wrong or 'нет'}")
+    print(f"  уверенность: мин {min(v['confidence'] for v in batch):.2f}, "
+          f"медиана {statistics.median(v['confidence'] for v in batch):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Разбор UI dump: полное дерево ElementTree (как раньше в get_places_status) против потокового UITree.
+
+Старая схема - ET.fromstring и записи мест со ссылкой на элемент ('elem'),
+поэтому всё дерево живёт, пока анализируются скриншоты. Новая - iter_nodes:
+XMLPullParser, закрытые элементы очищаются, остаются записи UINode.
+Пиковая память - tracemalloc, время - медиана повторов.
+
+Запуск: python tools/bench_ui_parse.py [дамп.xml ...] [--repeat 20]
+Без файлов используется синтетический дамп экрана мест (--seats, --depth).
+"""
+import argparse
+import gc
+import os
+import re
+import statistics
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+BOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BOT_DIR)
+
+from modules.ui_tree import UITree  # noqa: E402
+
+_BOUNDS = re.compile(r'\[(\d+),(\d+)\]\[(\d+),(\d+)\]')
+
+
+def synthetic_dump(seats: int, depth: int) -> str:
+    """Экран мест: вложенные контейнеры, схема из seats мест, подписи и навигация"""
+    def node(attrs: str, children: str = '') -> str:
+        return f'<node {attrs}>{children}</node>' if children else f'<node {attrs} />'
+
+    def attrs(index: int, cls: str, bounds: str, text: str = '', desc: str = '', clickable: bool = False) -> str:
+        return (f'index="{index}" text="{text}" resource-id="com.truegamers.true_gamers:id/n{index}" '
+                f'class="android.{cls}" package="com.truegamers.true_gamers" content-desc="{desc}" '
+                f'checkable="false" checked="false" clickable="{str(clickable).lower()}" enabled="true" '
+                f'focusable="{str(clickable).lower()}" focused="false" scrollable="false" long-clickable="false" '
+                f'password="false" selected="false" bounds="{bounds}"')
+
+    cells = []
+    for i in range(seats):
+        x, y = 100 + (i % 10) * 120, 900 + (i // 10) * 120
+        label = node(attrs(1, 'widget.TextView', f'[{x},{y}][{x + 100},{y + 30}]', text=f'{i % 25 + 1}'))
+        cells.append(node(attrs(i, 'view.View', f'[{x},{y}][{x + 100},{y + 100}]', desc=f'{i % 25 + 1}',
+                                clickable=True), label))
+    content = node(attrs(0, 'view.ViewGroup', '[0,800][1440,2300]'), ''.join(cells))
+    for level in range(depth):
+        content = node(attrs(level, 'widget.FrameLayout', '[0,0][1440,2560]'), content)
+    tabs = ''.join(node(attrs(i, 'widget.Button', f'[{i * 288},2400][{i * 288 + 288},2560]', text=t, clickable=True))
+                   for i, t in enumerate(['Главная', 'Места', 'Бронь', 'Профиль', 'Ещё']))
+    root = node(attrs(0, 'widget.FrameLayout', '[0,0][1440,2560]'), content + tabs)
+    return f"<?xml version='1.0' encoding='UTF-8' standalone='yes' ?><hierarchy rotation=\"0\">{root}</hierarchy>"
+
+
+def parse_tree(xml: str) -> list:
+    """Прежняя схема: всё дерево и записи со ссылкой на элемент"""
+    root = ET.fromstring(xml)
+    records = []
+    for elem in root.iter():
+        match = _BOUNDS.search(elem.get('bounds', ''))
+        if match:
+            x1, y1, x2, y2 = (int(v) for v in match.groups())
+            records.append({'elem': elem, 'text': elem.get('text', ''), 'content_desc': elem.get('content-desc', ''),
+                            'bounds': elem.get('bounds', ''), 'center': ((x1 + x2) // 2, (y1 + y2) // 2)})
+    return records
+
+
+def parse_stream(xml: str) -> UITree:
+    return UITree.from_xml(xml)
+
+
+def measure(parse, xml: str, repeat: int):
+    """(медиана времени, пиковая память при разборе, память результата)"""
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        started = time.perf_counter()
+        parse(xml)
+        times.append(time.perf_counter() - started)
+    gc.collect()
+    tracemalloc.start()
+    result = parse(xml)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return statistics.median(times), peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("dumps", nargs="*", help="файлы UI dump (например, ui_dump.xml с устройства)")
+    parser.add_argument("--repeat", type=int, default=20, help="повторов для замера времени")
+    parser.add_argument("--seats", type=int, default=400, help="мест в синтетическом дампе")
+    parser.add_argument("--depth", type=int, default=30, help="вложенность контейнеров в синтетическом дампе")
+    args = parser.parse_args()
+
+    samples = []
+    for path in args.dumps:
+        with open(path, encoding='utf-8') as f:
+            samples.append((os.path.basename(path), f.read()))
+    if not samples:
+        samples.append((f"синтетический ({args.seats} мест)", synthetic_dump(args.seats, args.depth)))
+
+    for name, xml in samples:
+        nodes = len(parse_stream(xml))
+        print(f"{name}: {len(xml.encode('utf-8')) / 1024:.0f} КБ, узлов {nodes}")
+        results = {}
+        for label, parse in (("ET.fromstring + elem", parse_tree), ("iter_nodes (UITree)", parse_stream)):
+            seconds, peak, retained = measure(parse, xml, args.repeat)
+            results[label] = (seconds, peak, retained)
+            print(f"  {label:22} время {seconds * 1000:7.2f} ms  пик {peak / 1024:8.0f} КБ  результат {retained / 1024:8.0f} КБ")
+        (old_s, old_peak, old_kept), (new_s, new_peak, new_kept) = results.values()
+        print(f"  пик памяти x{old_peak / max(new_peak, 1):.1f} меньше, удерживается x{old_kept / max(new_kept, 1):.1f} меньше, "
+              f"время x{old_s / max(new_s, 1e-9):.2f}")
+
+
+if __name__ == "__main__":
+    main()
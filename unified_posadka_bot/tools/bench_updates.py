@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Сравнение задержки доставки обновлений: long polling против webhook.
+
+Бот-эхо подключается к локальному фейковому Bot API (tools/fake_bot_api.py);
+задержка считается от подачи обновления до получения ответа sendMessage.
+
+Запуск: python tools/bench_updates.py --count 100 --poll-interval 0.5
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telegram import Update
+from telegram.ext import ApplicationBuilder, ContextTypes, MessageHandler, filters
+
+from fake_bot_api import FakeBotApi
+from modules.webhook import serve_webhook
+
+CHAT_ID = 1000
+
+
+async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await update.message.reply_text(update.message.text)
+
+
+def build_app(api: FakeBotApi):
+    app = ApplicationBuilder().token("123456:FAKE").base_url(api.base_url).build()
+    app.add_handler(MessageHandler(filters.TEXT, echo))
+    return app
+
+
+async def measure(api: FakeBotApi, count: int, interval: float) -> list:
+    latencies = []
+    for i in range(count):
+        sent_before = len(api.sent)
+        started = time.perf_counter()
+        await api.push_update(api.make_message_update(CHAT_ID, f"ping {i}"))
+        await api.wait_sent(sent_before + 1)
+        latencies.append(api.sent[sent_before]["time"] - started)
+        await asyncio.sleep(interval)
+    return latencies
+
+
+async def bench_polling(count: int, interval: float, poll_interval: float) -> list:
+    api = FakeBotApi()
+    await api.start()
+    app = build_app(api)
+    try:
+        async with app:
+            await app.start()
+            await app.updater.start_polling(poll_interval=poll_interval, timeout=10, allowed_updates=["message"])
+            try:
+                return await measure(api, count, interval)
+            finally:
+                await app.updater.stop()
+                await app.stop()
+    finally:
+        await api.stop()
+
+
+async def bench_webhook(count: int, interval: float, port: int) -> list:
+    api = FakeBotApi()
+    await api.start()
+    app = build_app(api)
+    stop_event = asyncio.Event()
+    task = asyncio.create_task(serve_webhook(
+        app, f"http://127.0.0.1:{port}", "127.0.0.1", port, "/telegram",
+        "bench-secret", ["message"], stop_event
+    ))
+    try:
+        while not api.webhook_url:
+            if task.done():
+                task.result()
+            await asyncio.sleep(0.01)
+        return await measure(api, count, interval)
+    finally:
+        stop_event.set()
+        await task
+        await api.stop()
+
+
+def report(name: str, latencies: list) -> None:
+    ms = sorted(x * 1000 for x in latencies)
+    p95 = ms[min(len(ms) - 1, int(len(ms) * 0.95))]
+    print(f"{name:<22} n={len(ms):<4} mean={statistics.mean(ms):7.2f} ms  "
+          f"p50={statistics.median(ms):7.2f} ms  p95={p95:7.2f} ms  max={ms[-1]:7.2f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.05, help="пауза между обновлениями, с")
+    parser.add_argument("--poll-interval", type=float, default=0.0, help="poll_interval для long polling, с")
+    parser.add_argument("--port", type=int, default=8089, help="порт локального webhook приёмника")
+    args = parser.parse_args()
+
+    report(f"polling (interval={args.poll_interval})", await bench_polling(args.count, args.interval, args.poll_interval))
+    report("webhook", await bench_webhook(args.count, args.interval, args.port))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
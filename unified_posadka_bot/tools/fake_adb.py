@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Минимальный заменитель клиента adb для проверок без устройства.
+
+Поддерживает `[-s SERIAL] devices`, `[-s SERIAL] shell [команда]` и
+`[-s SERIAL] exec-out команда`, а также `track-devices` (список один раз, затем
+поток ждёт без изменений): команды выполняются локальным /bin/sh, без
+аргументов shell читает команды из stdin (как `adb shell` без терминала).
+
+Пример: python tools/bench_adb_shell.py --adb tools/fake_adb.py
+"""
+import os
+import sys
+import time
+
+
+def main(argv):
+    if len(argv) >= 2 and argv[0] == '-s':
+        argv = argv[2:]
+    if not argv:
+        sys.stderr.write("usage: fake_adb.py [-s SERIAL] devices|track-devices|shell [command]|exec-out command\n")
+        return 1
+    if argv[0] == 'devices':
+        sys.stdout.write("List of devices attached\nemulator-5554\tdevice\n\n")
+        return 0
+    if argv[0] == 'track-devices':
+        data = b"emulator-5554\tdevice\n"
+        sys.stdout.buffer.write(b'%04x' % len(data) + data)
+        sys.stdout.flush()
+        while True:
+            time.sleep(3600)
+    if argv[0] == 'shell':
+        if len(argv) > 1:
+            os.execv('/bin/sh', ['sh', '-c', ' '.join(argv[1:])])
+        os.execv('/bin/sh', ['sh'])
+    if argv[0] == 'exec-out' and len(argv) > 1:
+        os.execv('/bin/sh', ['sh', '-c', ' '.join(argv[1:])])
+    sys.stderr.write(f"fake_adb: unsupported command {argv[0]}\n")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
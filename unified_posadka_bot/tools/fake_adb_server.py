@@ -0,0 +1,280 @@
+#!/usr/bin/env python3
+"""
+Локальный фейковый adb сервер для проверки клиента протокола (modules/adb_protocol.py).
+
+Поддерживает host:version, host:devices, host:track-devices, host:transport[-any],
+shell,v2,raw:, shell:, exec: и sync: (RECV). Подключение и отключение устройства
+эмулируется set_state(). Файловая система устройства - папка root:
+путь /sdcard/x соответствует root/sdcard/x. Команды выполняются локальным
+/bin/sh в папке root; screencap и uiautomator эмулируются (сырой кадр или PNG экрана
+заданного размера и XML дамп из файла или встроенного примера).
+
+Проверка: python tools/fake_adb_server.py --selftest
+"""
+import argparse
+import asyncio
+import io
+import os
+import shlex
+import struct
+import sys
+import tempfile
+import time
+from typing import Dict, Optional, Tuple
+
+SAMPLE_DUMP = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>"
+    '<hierarchy rotation="0">'
+    '<node index="0" text="" resource-id="" class="android.widget.FrameLayout" package="com.truegamers.true_gamers" '
+    'content-desc="" clickable="false" bounds="[0,0][1440,2560]">'
+    '<node index="0" text="" resource-id="" class="android.widget.Button" package="com.truegamers.true_gamers" '
+    'content-desc="Места" clickable="true" bounds="[300,820][514,944]" />'
+    '</node></hierarchy>'
+)
+
+
+class FakeAdbServer:
+    """Минимальный adb сервер на asyncio с одним устройством"""
+
+    def __init__(self, root: str, serial: str = "emulator-5554", host: str = "127.0.0.1", port: int = 0,
+                 screen_size: Tuple[int, int] = (1440, 2560), ui_dump: Optional[str] = None):
+        self.root = root
+        self.serial = serial
+        self.host = host
+        self.port = port
+        self.screen_size = screen_size
+        self.ui_dump = ui_dump or SAMPLE_DUMP
+        self.requests: Dict[str, int] = {}
+        # Состояние устройства в списке adb ('' - устройства нет)
+        self.state = 'device'
+        self._changed = asyncio.Event()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    def set_state(self, state: str) -> None:
+        """Меняет состояние устройства и оповещает подписчиков host:track-devices"""
+        self.state = state
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _device_list(self) -> bytes:
+        return f"{self.serial}\t{self.state}\n".encode() if self.state else b''
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._server:
+            server, self._server = self._server, None
+            server.close()
+            # Подписчики track-devices завершают поток
+            self._changed.set()
+            await server.wait_closed()
+
+    def local_path(self, remote: str) -> str:
+        return os.path.join(self.root, remote.lstrip('/'))
+
+    # ---------- протокол ----------
+    @staticmethod
+    async def _okay(writer) -> None:
+        writer.write(b'OKAY')
+        await writer.drain()
+
+    @staticmethod
+    async def _fail(writer, message: str) -> None:
+        data = message.encode()
+        writer.write(b'FAIL' + b'%04x' % len(data) + data)
+        await writer.drain()
+
+    @staticmethod
+    def _prefixed(data: bytes) -> bytes:
+        return b'%04x' % len(data) + data
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                size = int(await reader.readexactly(4), 16)
+                request = (await reader.readexactly(size)).decode()
+                service = request.split(':', 1)[0]
+                self.requests[service] = self.requests.get(service, 0) + 1
+                if request == "host:version":
+                    await self._okay(writer)
+                    writer.write(self._prefixed(b'0029'))
+                    break
+                if request == "host:devices":
+                    await self._okay(writer)
+                    writer.write(self._prefixed(self._device_list()))
+                    break
+                if request == "host:track-devices":
+                    await self._okay(writer)
+                    while self._server is not None:
+                        writer.write(self._prefixed(self._device_list()))
+                        await writer.drain()
+                        await self._changed.wait()
+                    break
+                if request in ("host:transport-any", f"host:transport:{self.serial}"):
+                    # Дальше по этому же соединению идёт запрос к устройству
+                    await self._okay(writer)
+                    continue
+                if request.startswith("host:transport:"):
+                    await self._fail(writer, f"device '{request.split(':', 2)[2]}' not found")
+                    break
+                if request.startswith("shell,v2,raw:"):
+                    await self._okay(writer)
+                    stdout, stderr, code = await self._run(request.split(':', 1)[1])
+                    for packet_id, data in ((1, stdout), (2, stderr)):
+                        if data:
+                            writer.write(struct.pack('<BI', packet_id, len(data)) + data)
+                    writer.write(struct.pack('<BI', 3, 1) + bytes([code & 0xFF]))
+                    break
+                if request.startswith("shell:") or request.startswith("exec:"):
+                    await self._okay(writer)
+                    stdout, stderr, _ = await self._run(request.split(':', 1)[1])
+                    writer.write(stdout + (stderr if request.startswith("shell:") else b''))
+                    break
+                if request == "sync:":
+                    await self._okay(writer)
+                    await self._sync(reader, writer)
+                    break
+                await self._fail(writer, f"unknown service {request}")
+                break
+            await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError, BrokenPipeError):
+            pass
+        finally:
+            writer.close()
+
+    async def _sync(self, reader, writer) -> None:
+        while True:
+            packet_id, size = struct.unpack('<4sI', await reader.readexactly(8))
+            if packet_id == b'QUIT':
+                return
+            path = (await reader.readexactly(size)).decode()
+            if packet_id != b'RECV':
+                message = f"unsupported sync request {packet_id!r}".encode()
+                writer.write(b'FAIL' + struct.pack('<I', len(message)) + message)
+                return
+            try:
+                with open(self.local_path(path), 'rb') as f:
+                    data = f.read()
+            except OSError as e:
+                message = f"remote object '{path}' does not exist ({e.strerror})".encode()
+                writer.write(b'FAIL' + struct.pack('<I', len(message)) + message)
+                await writer.drain()
+                continue
+            for start in range(0, len(data), 64 * 1024):
+                chunk = data[start:start + 64 * 1024]
+                writer.write(b'DATA' + struct.pack('<I', len(chunk)) + chunk)
+            writer.write(b'DONE' + struct.pack('<I', 0))
+            await writer.drain()
+
+    # ---------- эмуляция команд устройства ----------
+    async def _run(self, command: str) -> Tuple[bytes, bytes, int]:
+        args = shlex.split(command) if command.strip() else []
+        if args[:1] == ['screencap']:
+            return await asyncio.to_thread(self._screencap, args[1:])
+        if args[:2] == ['uiautomator', 'dump']:
+            return self._uiautomator_dump(args[2:])
+        proc = await asyncio.create_subprocess_exec(
+            '/bin/sh', '-c', command, cwd=self.root,
+            stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+        stdout, stderr = await proc.communicate()
+        return stdout, stderr, proc.returncode
+
+    def _screencap(self, args) -> Tuple[bytes, bytes, int]:
+        paths = [a for a in args if not a.startswith('-')]
+        width, height = self.screen_size
+        if '-p' not in args and not (paths and paths[0].endswith('.png')):
+            # Без -p - сырой кадр: ширина, высота, формат RGBA_8888, color space и пиксели
+            data = struct.pack('<IIII', width, height, 1, 1) + b'\xff' * (width * height * 4)
+            return data, b'', 0
+        from PIL import Image
+        img = Image.new('RGB', self.screen_size, (255, 255, 255))
+        out = io.BytesIO()
+        img.save(out, format='PNG')
+        data = out.getvalue()
+        if paths:
+            with open(self.local_path(paths[0]), 'wb') as f:
+                f.write(data)
+            return b'', b'', 0
+        return data, b'', 0
+
+    def _uiautomator_dump(self, args) -> Tuple[bytes, bytes, int]:
+        paths = [a for a in args if not a.startswith('-')]
+        path = paths[0] if paths else '/sdcard/window_dump.xml'
+        if path == '/dev/tty':
+            return self.ui_dump.encode() + b'UI hierchary dumped to: /dev/tty\n', b'', 0
+        local = self.local_path(path)
+        os.makedirs(os.path.dirname(local), exist_ok=True)
+        with open(local, 'w', encoding='utf-8') as f:
+            f.write(self.ui_dump)
+        return f"UI hierchary dumped to: {path}\n".encode(), b'', 0
+
+
+async def selftest() -> None:
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from modules.adb_protocol import AdbClient, AdbError
+    from modules.framebuffer import parse_screencap
+
+    root = tempfile.mkdtemp(prefix="fake_adb_")
+    os.makedirs(os.path.join(root, 'sdcard'))
+    server = FakeAdbServer(root)
+    await server.start()
+    client = AdbClient(port=server.port)
+    try:
+        def check():
+            assert client.version() == 0x29
+            assert client.devices() == [("emulator-5554", "device")]
+            assert client.shell("echo out; echo err >&2; exit 3") == ("out\n", "err\n", 3)
+            assert client.shell("uiautomator dump /sdcard/ui_dump.xml")[2] == 0
+            dump = client.pull("/sdcard/ui_dump.xml").decode()
+            assert 'Места' in dump
+            assert 'Места' in client.exec_out("uiautomator dump --compressed /dev/tty").decode()
+            png = client.exec_out("screencap -p")
+            assert png[:8] == b'\x89PNG\r\n\x1a\n'
+            frame = parse_screencap(client.exec_out("screencap"), region=[0, 100, 200, 300], step=2)
+            assert frame.pixels.shape == (100, 100, 3) and frame.pixels.min() == 255
+            try:
+                client.pull("/sdcard/missing.xml")
+                raise AssertionError("ожидалась ошибка sync")
+            except AdbError:
+                pass
+            try:
+                AdbClient(port=server.port, serial="other").shell("true")
+                raise AssertionError("ожидалась ошибка transport")
+            except AdbError:
+                pass
+            started = time.perf_counter()
+            for _ in range(20):
+                client.shell("true")
+            return (time.perf_counter() - started) / 20, len(png), len(dump)
+
+        per_shell, png_size, dump_size = await asyncio.to_thread(check)
+        print(f"OK: shell {per_shell * 1000:.1f} ms/команда, screencap {png_size} байт, dump {dump_size} байт")
+        print(f"запросы к серверу: {server.requests}")
+    finally:
+        await server.stop()
+
+
+async def serve(port: int, root: str) -> None:
+    server = FakeAdbServer(root, port=port)
+    await server.start()
+    print(f"Фейковый adb сервер: 127.0.0.1:{server.port}, файлы устройства в {root}")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=5038, help="порт сервера (настоящий adb - 5037)")
+    parser.add_argument("--root", default=None, help="папка с файлами устройства")
+    parser.add_argument("--selftest", action="store_true", help="проверить клиент протокола и выйти")
+    args = parser.parse_args()
+    if args.selftest:
+        asyncio.run(selftest())
+    else:
+        asyncio.run(serve(args.port, args.root or tempfile.mkdtemp(prefix="fake_adb_")))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Локальный фейковый Telegram Bot API для проверки polling/webhook режимов без сети.
+
+Поддерживает getMe, getUpdates (long polling), setWebhook, deleteWebhook,
+getWebhookInfo и sendMessage. Обновления подаются через push_update():
+при установленном webhook они отправляются POST запросом с секретным токеном,
+иначе отдаются через getUpdates.
+"""
+import asyncio
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+import aiohttp
+from aiohttp import web
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class FakeBotApi:
+    """Минимальный Bot API сервер на aiohttp"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.webhook_url = ""
+        self.webhook_secret = ""
+        self.allowed_updates: Optional[List[str]] = None
+        self.sent: List[Dict[str, Any]] = []
+        self._pending: List[Dict[str, Any]] = []
+        self._update_id = 0
+        self._message_id = 0
+        self._new_update = asyncio.Event()
+        self._sent_event = asyncio.Event()
+        self._runner: Optional[web.AppRunner] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def base_url(self) -> str:
+        """Значение для ApplicationBuilder().base_url(...)"""
+        return f"http://{self.host}:{self.port}/bot"
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._dispatch)
+        app.router.add_get("/bot{token}/{method}", self._dispatch)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._session = aiohttp.ClientSession()
+
+    async def stop(self) -> None:
+        if self._session:
+            await self._session.close()
+        if self._runner:
+            await self._runner.cleanup()
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        params = {}
+        for key, value in (await request.post()).items():
+            try:
+                params[key] = json.loads(value)
+            except (TypeError, ValueError):
+                params[key] = value
+        return params
+
+    async def _dispatch(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = await self._params(request)
+        handler = getattr(self, f"_api_{method}", None)
+        if handler is None:
+            return web.json_response({"ok": False, "error_code": 404, "description": f"Not Found: {method}"})
+        result = await handler(params)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _api_getMe(self, params):
+        return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+
+    async def _api_setWebhook(self, params):
+        self.webhook_url = params.get("url", "")
+        self.webhook_secret = params.get("secret_token", "")
+        self.allowed_updates = params.get("allowed_updates")
+        return True
+
+    async def _api_deleteWebhook(self, params):
+        self.webhook_url = ""
+        self.webhook_secret = ""
+        return True
+
+    async def _api_getWebhookInfo(self, params):
+        return {"url": self.webhook_url, "has_custom_certificate": False, "pending_update_count": len(self._pending)}
+
+    async def _api_getUpdates(self, params):
+        offset = int(params.get("offset") or 0)
+        timeout = float(params.get("timeout") or 0)
+        self._pending = [u for u in self._pending if u["update_id"] >= offset]
+        if not self._pending and timeout > 0:
+            self._new_update.clear()
+            try:
+                await asyncio.wait_for(self._new_update.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return [u for u in self._pending if u["update_id"] >= offset]
+
+    async def _api_sendMessage(self, params):
+        self._message_id += 1
+        chat_id = int(params["chat_id"])
+        self.sent.append({"chat_id": chat_id, "text": params.get("text", ""), "time": time.perf_counter()})
+        self._sent_event.set()
+        return {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "text": params.get("text", ""),
+        }
+
+    def make_message_update(self, chat_id: int, text: str) -> Dict[str, Any]:
+        self._update_id += 1
+        self._message_id += 1
+        message = {
+            "message_id": self._message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": chat_id, "is_bot": False, "first_name": "Tester"},
+            "text": text,
+        }
+        if text.startswith("/"):
+            # CommandHandler распознаёт команды только по сущности bot_command
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+        return {"update_id": self._update_id, "message": message}
+
+    async def push_update(self, update: Dict[str, Any]) -> None:
+        """Доставляет обновление боту через webhook или очередь getUpdates"""
+        if self.webhook_url:
+            headers = {SECRET_HEADER: self.webhook_secret} if self.webhook_secret else {}
+            async with self._session.post(self.webhook_url, json=update, headers=headers) as resp:
+                resp.raise_for_status()
+        else:
+            self._pending.append(update)
+            self._new_update.set()
+
+    async def wait_sent(self, count: int, timeout: float = 10.0) -> None:
+        """Ждёт, пока бот отправит count сообщений"""
+        loop = asyncio.get_running_loop()
+        until = loop.time() + timeout
+        while True:
+            self._sent_event.clear()
+            if len(self.sent) >= count:
+                return
+            await asyncio.wait_for(self._sent_event.wait(), max(0.0, until - loop.time()))